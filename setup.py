@@ -5,4 +5,10 @@ setup(
     version="0.1",
     packages=find_packages(where="src"),
     package_dir={"": "src"},
+    py_modules=["fipe_cli", "insert_api_automacao"],
+    entry_points={
+        "console_scripts": [
+            "fipe=fipe_cli:main",
+        ],
+    },
 )
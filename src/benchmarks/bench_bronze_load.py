@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da carga do bronze: um INSERT por linha x execute_values x COPY.
+
+Uso (a partir da raiz do projeto, com o Postgres do docker-compose no ar):
+    PYTHONPATH=src python -m benchmarks.bench_bronze_load --tamanhos 1000 10000 100000
+
+Roda em um banco descartável (BENCH_DB_NAME, padrão "fipe_bench"), criado
+se não existir, para não apagar os dados de fipe_banco.
+"""
+import argparse
+import os
+import random
+import time
+
+import psycopg2
+
+from services.bronze_loader import BronzeLoader, METODOS, criar_tabela_bronze
+from services.fipe_api_client import TIPOS_VEICULO
+from services.registro import RegistroFipe
+from services.db_connection import DBConnection
+
+
+def gerar_registros(n, seed=42):
+    rnd = random.Random(seed)
+    marcas = ["HONDA", "YAMAHA", "SUZUKI", "KAWASAKI", "BMW"]
+    registros = []
+    for i in range(n):
+        ano = 2000 + i % 26
+        valor = rnd.randint(5000, 90000)
+        registros.append(RegistroFipe(
+            tipo_veiculo=TIPOS_VEICULO[i % len(TIPOS_VEICULO)],
+            marca=marcas[i % len(marcas)],
+            modelo=f"MODELO {i // 26}",
+            cod_marca=i % len(marcas),
+            cod_modelo=i // 26,
+            cod_ano=f"{ano}-1",
+            valor_str=f"R$ {valor:,}".replace(",", ".") + ",00",
+            mes_referencia="outubro de 2026 ",
+            codigo_fipe=f"{800000 + i // 26}-{i % 10}",
+        ))
+    return registros
+
+
+def garantir_banco(host, port, dbname, user, password):
+    admin = psycopg2.connect(host=host, port=port, dbname="postgres", user=user, password=password)
+    admin.autocommit = True
+    cur = admin.cursor()
+    cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+    if not cur.fetchone():
+        cur.execute(f'CREATE DATABASE "{dbname}"')
+    admin.close()
+
+
+def medir(conn, registros, metodo, batch_size):
+    cur = conn.cursor()
+    cur.execute("TRUNCATE bronze.fipe_raw RESTART IDENTITY;")
+    conn.commit()
+
+    inicio = time.perf_counter()
+    BronzeLoader(conn, batch_size=batch_size, metodo=metodo).carregar(registros)
+    conn.commit()
+    return time.perf_counter() - inicio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tamanhos", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--metodos", nargs="+", choices=METODOS, default=list(METODOS))
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    params = dict(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        dbname=os.getenv("BENCH_DB_NAME", "fipe_bench"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASS", "postgres"),
+    )
+    garantir_banco(**params)
+
+    conn = DBConnection(**params).connect()
+    if not conn:
+        return
+
+    criar_tabela_bronze(conn.cursor())
+    conn.commit()
+
+    print(f"\n{'linhas':>8} | {'método':>6} | {'segundos':>9} | {'linhas/s':>10}")
+    print("-" * 44)
+    for n in args.tamanhos:
+        registros = gerar_registros(n)
+        for metodo in args.metodos:
+            segundos = medir(conn, registros, metodo, args.batch_size)
+            print(f"{n:>8} | {metodo:>6} | {segundos:>9.3f} | {n / segundos:>10.0f}")
+
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark da camada de consulta (services.consulta_fipe) sob carga concorrente.
+
+Carrega registros sintéticos no bronze, recalcula as tabelas de consulta e
+dispara consultas de preço, faixa e busca por nome em várias threads,
+medindo p50/p99 com e sem o cache em memória.
+
+Uso (a partir da raiz do projeto, com o Postgres do docker-compose no ar):
+    PYTHONPATH=src python -m benchmarks.bench_consulta --linhas 100000 --threads 16 --consultas 20000
+
+Roda em um banco descartável (BENCH_DB_NAME, padrão "fipe_bench").
+"""
+import argparse
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.bench_bronze_load import garantir_banco, gerar_registros
+from services.bronze_loader import BronzeLoader, criar_tabela_bronze
+from services.consulta_fipe import CacheTTL, ConsultaFipe, atualizar_tabelas_consulta
+from services.db_connection import DBConnection
+
+
+def percentil(valores, p):
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p / 100))]
+
+
+def preparar(banco, linhas):
+    with banco.conexao() as conn:
+        cur = conn.cursor()
+        criar_tabela_bronze(cur)
+        cur.execute("TRUNCATE bronze.fipe_raw RESTART IDENTITY;")
+        conn.commit()
+
+        registros = gerar_registros(linhas)
+        BronzeLoader(conn, batch_size=5000).carregar(registros)
+        conn.commit()
+        atualizar_tabelas_consulta(conn)
+    return registros
+
+
+def medir(consulta, registros, consultas, threads, seed=42):
+    rnd = random.Random(seed)
+    # Distribuição concentrada (poucos modelos "quentes"), como num serviço real
+    quentes = rnd.sample(registros, min(len(registros), 500))
+    tarefas = []
+    for _ in range(consultas):
+        r = rnd.choice(quentes)
+        tipo = rnd.random()
+        if tipo < 0.7:
+            tarefas.append(lambda r=r: consulta.preco(r["marca"], r["modelo"], r["ano"], r["tipo_veiculo"]))
+        elif tipo < 0.9:
+            base = rnd.randrange(5000, 90000, 1000)
+            tarefas.append(lambda b=base, r=r: consulta.modelos_na_faixa(b, b + 2000, r["tipo_veiculo"], limite=50))
+        else:
+            tarefas.append(lambda r=r: consulta.buscar_modelos(r["modelo"][-3:], r["tipo_veiculo"]))
+
+    def cronometrar(tarefa):
+        inicio = time.perf_counter()
+        tarefa()
+        return time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(threads) as pool:
+        latencias = list(pool.map(cronometrar, tarefas))
+    total = time.perf_counter() - inicio
+    return total, latencias
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--linhas", type=int, default=100000, help="registros sintéticos no bronze")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--consultas", type=int, default=20000)
+    args = parser.parse_args()
+
+    params = dict(
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        dbname=os.getenv("BENCH_DB_NAME", "fipe_bench"),
+        user=os.getenv("DB_USER", "postgres"),
+        password=os.getenv("DB_PASS", "postgres"),
+    )
+    garantir_banco(**params)
+    banco = DBConnection(**params, maxconn=args.threads)
+
+    try:
+        registros = preparar(banco, args.linhas)
+
+        print(f"\n{'cache':>6} | {'consultas/s':>11} | {'p50 (ms)':>9} | {'p99 (ms)':>9} | {'acertos':>8}")
+        print("-" * 56)
+        for nome, cache in (("sem", CacheTTL(max_entradas=0)), ("com", CacheTTL())):
+            consulta = ConsultaFipe(banco, cache=cache)
+            total, latencias = medir(consulta, registros, args.consultas, args.threads)
+            acertos = cache.acertos / max(1, cache.acertos + cache.falhas)
+            print(f"{nome:>6} | {len(latencias) / total:>11.0f} | {percentil(latencias, 50) * 1000:>9.2f} | "
+                  f"{percentil(latencias, 99) * 1000:>9.2f} | {acertos:>7.0%}")
+    finally:
+        banco.closeall()
+
+
+if __name__ == "__main__":
+    main()
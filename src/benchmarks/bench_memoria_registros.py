@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark de memória por registro do crawl: dict antigo x RegistroFipe.
+
+Gera respostas no formato da API (cada uma decodificada de JSON, como
+chegam do requests, então nenhuma string é compartilhada por acaso) e mede
+com tracemalloc quanto ocupam N registros montados de cada jeito.
+
+Uso (a partir da raiz do projeto):
+    PYTHONPATH=src python -m benchmarks.bench_memoria_registros --registros 100000 200000
+"""
+import argparse
+import gc
+import json
+import tracemalloc
+
+from benchmarks.mock_fipe_server import CatalogoSintetico
+from services.registro import RegistroFipe
+
+
+def respostas_api(n, seed=42):
+    """(nome_marca, marca, modelo, ano, preco) como o crawl recebe, n vezes."""
+    modelos_por_marca = max(1, n // (8 * 10))
+    catalogo = CatalogoSintetico(marcas=8, modelos_por_marca=modelos_por_marca, anos_por_modelo=10, seed=seed)
+    gerados = 0
+    while True:
+        for m in catalogo.marcas:
+            for mod in catalogo.modelos[m["codigo"]]:
+                for ano in catalogo.anos[(m["codigo"], str(mod["codigo"]))]:
+                    if gerados == n:
+                        return
+                    partes = ["marcas", m["codigo"], "modelos", str(mod["codigo"]), "anos", ano["codigo"]]
+                    preco = json.loads(json.dumps(catalogo.resposta(partes), ensure_ascii=False))
+                    marca = json.loads(json.dumps(m))
+                    modelo = json.loads(json.dumps(mod))
+                    yield marca["nome"], marca, modelo, json.loads(json.dumps(ano)), preco
+                    gerados += 1
+
+
+def registro_dict(nome_marca, marca, modelo, ano, preco, tipo_veiculo="motos"):
+    """Formato anterior (um dict de 10 chaves por preço)."""
+    return {
+        "tipo_veiculo": tipo_veiculo,
+        "marca": nome_marca,
+        "modelo": modelo["nome"],
+        "ano": ano["codigo"],
+        "cod_marca": marca["codigo"],
+        "cod_modelo": modelo["codigo"],
+        "cod_ano": ano["codigo"],
+        "valor_str": preco.get("Valor"),
+        "mes_referencia": preco.get("MesReferencia"),
+        "codigo_fipe": preco.get("CodigoFipe"),
+    }
+
+
+def medir(montar, n):
+    gc.collect()
+    tracemalloc.start()
+    registros = [montar(*args) for args in respostas_api(n)]
+    gc.collect()
+    atual, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(registros) == n
+    return atual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--registros", type=int, nargs="+", default=[100000])
+    args = parser.parse_args()
+
+    print(f"\n{'registros':>9} | {'formato':>12} | {'MiB':>8} | {'bytes/registro':>14}")
+    print("-" * 52)
+    for n in args.registros:
+        for nome, montar in (("dict", registro_dict), ("RegistroFipe", RegistroFipe.da_api)):
+            total = medir(montar, n)
+            print(f"{n:>9} | {nome:>12} | {total / 2**20:>8.1f} | {total / n:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
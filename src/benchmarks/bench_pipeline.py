@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark do pipeline por cenário: crawl → bronze → silver/gold → export.
+
+O crawl roda contra a API FIPE local (benchmarks.mock_fipe_server), com
+catálogo, latência e taxa de erro controlados; as etapas de banco usam um
+Postgres descartável (BENCH_DB_NAME, padrão "fipe_bench") e o export grava
+os Parquet em um diretório temporário (ou no MinIO com --minio).
+
+Uso (a partir da raiz do projeto):
+    PYTHONPATH=src python -m benchmarks.bench_pipeline --marcas 5 --modelos 40
+    PYTHONPATH=src python -m benchmarks.bench_pipeline --cenarios crawl --latencia 0.02 --taxa-erro 0.05
+    PYTHONPATH=src python -m benchmarks.bench_pipeline --comparar src/benchmarks/resultados/anterior.json
+
+Cada execução grava um JSON em src/benchmarks/resultados/ (tempo, vazão e
+parâmetros por cenário). Com --comparar, imprime a variação percentual em
+relação a uma execução anterior e sai com código 1 se algum cenário ficar
+mais lento que --limite-regressao.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from benchmarks.bench_bronze_load import garantir_banco
+from benchmarks.mock_fipe_server import MockFipeServer, catalogos_sinteticos
+from services.bronze_loader import BronzeLoader, criar_tabela_bronze
+from services.fipe_api_client import TIPOS_VEICULO, EstatisticasHttp, FipeApiClient
+from services.medallion_refresh import MedallionRefresher
+from services.parquet_export import ParquetExporter
+from services.rate_limiter import TokenBucket
+from services.db_connection import DBConnection
+
+CENARIOS = ("crawl", "bronze", "refresh", "export")
+PASTA_RESULTADOS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "resultados")
+
+
+class _ObjetoLocal:
+    def __init__(self, metadata=None, object_name=None):
+        self.metadata = metadata
+        self.object_name = object_name
+
+
+class DiretorioObjetos:
+    def __init__(self, raiz):
+        """Object store em disco com a parte da API do Minio usada pelo ParquetExporter."""
+        self.raiz = raiz
+
+    def _caminho(self, bucket, nome):
+        return os.path.join(self.raiz, bucket, nome)
+
+    def stat_object(self, bucket, nome):
+        caminho = self._caminho(bucket, nome)
+        with open(caminho + ".meta.json", encoding="utf-8") as f:
+            return _ObjetoLocal(json.load(f))
+
+    def put_object(self, bucket, nome, dados, tamanho, content_type=None, metadata=None, part_size=0):
+        caminho = self._caminho(bucket, nome)
+        os.makedirs(os.path.dirname(caminho), exist_ok=True)
+        with open(caminho, "wb") as f:
+            f.write(dados.read(tamanho))
+        with open(caminho + ".meta.json", "w", encoding="utf-8") as f:
+            json.dump({f"x-amz-meta-{k}": v for k, v in (metadata or {}).items()}, f)
+
+    def list_objects(self, bucket, prefix="", recursive=False):
+        base = os.path.join(self.raiz, bucket)
+        for pasta, _, arquivos in os.walk(base):
+            for arquivo in arquivos:
+                nome = os.path.relpath(os.path.join(pasta, arquivo), base).replace(os.sep, "/")
+                if nome.startswith(prefix) and not nome.endswith(".meta.json"):
+                    yield _ObjetoLocal(object_name=nome)
+
+    def remove_object(self, bucket, nome):
+        caminho = self._caminho(bucket, nome)
+        for arquivo in (caminho, caminho + ".meta.json"):
+            if os.path.exists(arquivo):
+                os.remove(arquivo)
+
+
+def _commit_git():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def cenario_crawl(args):
+    catalogos = catalogos_sinteticos(args.tipos, marcas=args.marcas, modelos_por_marca=args.modelos,
+                                     anos_por_modelo=args.anos, seed=args.seed)
+    servidor = MockFipeServer(catalogos, latencia=args.latencia, jitter=args.jitter,
+                              taxa_erro=args.taxa_erro, seed=args.seed)
+
+    with servidor:
+        # Como no pipeline: um cliente por tipo, com limite e contadores compartilhados
+        limite = TokenBucket(args.req_por_segundo, args.workers) if args.req_por_segundo else None
+        estatisticas = EstatisticasHttp()
+        apis = [
+            FipeApiClient(
+                retries=args.retries,
+                delay=0.0,
+                rate_limiter=limite,
+                pool_size=args.workers,
+                base_url=servidor.base_url,
+                tipo_veiculo=tipo,
+                estatisticas=estatisticas
+            )
+            for tipo in args.tipos
+        ]
+        inicio = time.perf_counter()
+        # O crawl imprime uma linha por preço; fora da medição
+        with contextlib.redirect_stdout(io.StringIO()), ThreadPoolExecutor(len(apis)) as pool:
+            partes = pool.map(lambda api: list(api.crawl(max_modelos=None, max_workers=args.workers)), apis)
+            registros = [r for parte in partes for r in parte]
+        segundos = time.perf_counter() - inicio
+
+    estat = estatisticas.resumo()
+    resultado = {
+        "segundos": segundos,
+        "linhas": len(registros),
+        "linhas_por_s": len(registros) / segundos if segundos else None,
+        "requisicoes": servidor.requisicoes,
+        "req_por_s": servidor.requisicoes / segundos if segundos else None,
+        "erros_injetados": servidor.erros_injetados,
+        "retries": sum(e["retries"] for e in estat.values()),
+        "precos_no_catalogo": sum(c.total_precos for c in catalogos.values()),
+    }
+    return resultado, registros
+
+
+def cenario_bronze(conn, registros, args):
+    cur = conn.cursor()
+    criar_tabela_bronze(cur)
+    cur.execute("TRUNCATE bronze.fipe_raw RESTART IDENTITY;")
+    conn.commit()
+
+    loader = BronzeLoader(conn, batch_size=args.batch_size)
+    inicio = time.perf_counter()
+    total, _ = loader.carregar(registros)
+    conn.commit()
+    segundos = time.perf_counter() - inicio
+
+    # Recarga completa dos mesmos preços (espelho): nenhuma linha deve mudar
+    espelho = BronzeLoader(conn, batch_size=args.batch_size, espelho=True)
+    inicio = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        _, alterados = espelho.carregar(registros)
+        alterados |= espelho.remover_nao_vistos()
+    conn.commit()
+    segundos_sem_mudanca = time.perf_counter() - inicio
+
+    return {
+        "segundos": segundos,
+        "segundos_sem_mudanca": segundos_sem_mudanca,
+        "modelos_alterados_sem_mudanca": len(alterados),
+        "linhas": total,
+        "linhas_por_s": total / segundos if segundos else None,
+        "bytes": loader.bytes_enviados,
+    }
+
+
+def cenario_refresh(conn, args):
+    inicio = time.perf_counter()
+    MedallionRefresher(conn).refresh()
+    segundos = time.perf_counter() - inicio
+
+    cur = conn.cursor()
+    cur.execute("SELECT (SELECT COUNT(*) FROM silver.fipe_limited), (SELECT COUNT(*) FROM gold.fipe_summary);")
+    silver, gold = cur.fetchone()
+    conn.commit()
+    return {"segundos": segundos, "linhas_silver": silver, "linhas_gold": gold}
+
+
+def cenario_export(conn, args):
+    if args.minio:
+        from services.export_to_minio import MinioUploader
+        uploader = MinioUploader()
+        cliente, bucket, pasta = uploader.minio_client, uploader.bucket_name, None
+    else:
+        pasta = tempfile.mkdtemp(prefix="fipe_bench_export_")
+        cliente, bucket = DiretorioObjetos(pasta), "fipe"
+
+    try:
+        exporter = ParquetExporter(conn, cliente, bucket=bucket, max_workers=args.workers)
+        inicio = time.perf_counter()
+        resultado = exporter.exportar()
+        segundos = time.perf_counter() - inicio
+
+        # Segunda passada: nada mudou, então tudo deve ser pulado
+        inicio = time.perf_counter()
+        exporter.exportar()
+        segundos_sem_mudanca = time.perf_counter() - inicio
+    finally:
+        if pasta:
+            shutil.rmtree(pasta, ignore_errors=True)
+
+    bytes_enviados = sum(c["bytes"] for c in resultado.values())
+    return {
+        "segundos": segundos,
+        "segundos_sem_mudanca": segundos_sem_mudanca,
+        "particoes": sum(c["enviados"] for c in resultado.values()),
+        "bytes": bytes_enviados,
+        "bytes_por_s": bytes_enviados / segundos if segundos else None,
+    }
+
+
+def comparar(atual, anterior, limite):
+    """Imprime a variação de tempo por cenário; retorna os cenários que regrediram."""
+    regressoes = []
+    print(f"\n{'cenário':>8} | {'antes (s)':>10} | {'agora (s)':>10} | {'variação':>9}")
+    print("-" * 47)
+    for nome, r in atual["cenarios"].items():
+        antes = anterior.get("cenarios", {}).get(nome)
+        if not antes or not antes.get("segundos"):
+            continue
+        variacao = (r["segundos"] / antes["segundos"] - 1) * 100
+        marca = "  ← regressão" if variacao > limite else ""
+        print(f"{nome:>8} | {antes['segundos']:>10.3f} | {r['segundos']:>10.3f} | {variacao:>+8.1f}%{marca}")
+        if variacao > limite:
+            regressoes.append(nome)
+    return regressoes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cenarios", nargs="+", choices=CENARIOS, default=list(CENARIOS))
+    parser.add_argument("--marcas", type=int, default=5)
+    parser.add_argument("--modelos", type=int, default=40, help="modelos por marca")
+    parser.add_argument("--anos", type=int, default=5, help="anos por modelo")
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS_VEICULO, default=list(TIPOS_VEICULO),
+                        help="tipos de veículo coletados em paralelo")
+    parser.add_argument("--latencia", type=float, default=0.0, help="latência por requisição (s)")
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0, help="fração de respostas 503")
+    parser.add_argument("--retries", type=int, default=3)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--req-por-segundo", type=float, default=0.0, help="0 = sem rate limit")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--minio", action="store_true", help="exporta para o MinIO local em vez de um diretório")
+    parser.add_argument("--saida", help="arquivo JSON do resultado (padrão: src/benchmarks/resultados/<data>.json)")
+    parser.add_argument("--comparar", help="JSON de uma execução anterior")
+    parser.add_argument("--limite-regressao", type=float, default=20.0, help="em %% (padrão 20)")
+    args = parser.parse_args()
+
+    resultado = {
+        "data": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": _commit_git(),
+        "python": platform.python_version(),
+        "parametros": vars(args),
+        "cenarios": {},
+    }
+
+    # O crawl sempre roda: ele produz os registros das etapas seguintes
+    r_crawl, registros = cenario_crawl(args)
+    if "crawl" in args.cenarios:
+        resultado["cenarios"]["crawl"] = r_crawl
+        print(f"CRAWL: {r_crawl['linhas']} preços em {r_crawl['segundos']:.2f}s "
+              f"({r_crawl['req_por_s']:.0f} req/s, {r_crawl['retries']} retries)")
+
+    etapas_banco = [c for c in ("bronze", "refresh", "export") if c in args.cenarios]
+    if etapas_banco:
+        params = dict(
+            host=os.getenv("DB_HOST", "localhost"),
+            port=int(os.getenv("DB_PORT", "5432")),
+            dbname=os.getenv("BENCH_DB_NAME", "fipe_bench"),
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASS", "postgres"),
+        )
+        garantir_banco(**params)
+        banco = DBConnection(**params)
+
+        try:
+            with banco.conexao() as conn:
+                # refresh/export dependem do bronze carregado
+                r = cenario_bronze(conn, registros, args)
+                if "bronze" in args.cenarios:
+                    resultado["cenarios"]["bronze"] = r
+                    print(f"BRONZE: {r['linhas']} linhas em {r['segundos']:.2f}s ({r['linhas_por_s']:.0f} linhas/s)")
+
+                if "refresh" in args.cenarios or "export" in args.cenarios:
+                    r = cenario_refresh(conn, args)
+                    if "refresh" in args.cenarios:
+                        resultado["cenarios"]["refresh"] = r
+                        print(f"REFRESH: silver {r['linhas_silver']}, gold {r['linhas_gold']} em {r['segundos']:.2f}s")
+
+                if "export" in args.cenarios:
+                    r = cenario_export(conn, args)
+                    resultado["cenarios"]["export"] = r
+                    print(f"EXPORT: {r['particoes']} partições, {r['bytes'] / 1024:.1f} KiB em {r['segundos']:.2f}s "
+                          f"(sem mudança: {r['segundos_sem_mudanca']:.2f}s)")
+        finally:
+            banco.closeall()
+
+    saida = args.saida or os.path.join(
+        PASTA_RESULTADOS, f"{datetime.now():%Y%m%d_%H%M%S}_{resultado['commit'] or 'local'}.json"
+    )
+    os.makedirs(os.path.dirname(saida) or ".", exist_ok=True)
+    with open(saida, "w", encoding="utf-8") as f:
+        json.dump(resultado, f, indent=2, ensure_ascii=False)
+    print(f"\nResultado salvo em {saida}")
+
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            anterior = json.load(f)
+        if comparar(resultado, anterior, args.limite_regressao):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
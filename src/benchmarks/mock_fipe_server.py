@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor HTTP local que imita a API FIPE (parallelum) com um catálogo sintético.
+
+Serve as mesmas rotas usadas por FipeApiClient (marcas → modelos → anos →
+preço), com latência e taxa de erro configuráveis, para medir o pipeline sem
+depender da API pública.
+
+Uso (a partir da raiz do projeto):
+    PYTHONPATH=src python -m benchmarks.mock_fipe_server --marcas 5 --modelos 50 --latencia 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterable, List, Optional
+
+from services.fipe_api_client import TIPOS_VEICULO
+
+MES_REFERENCIA = "outubro de 2026 "
+COMBUSTIVEIS = {1: "Gasolina", 2: "Álcool", 3: "Diesel"}
+NOMES_MARCAS = {
+    "carros": ["FIAT", "VOLKSWAGEN", "CHEVROLET", "HONDA", "TOYOTA", "HYUNDAI", "RENAULT", "FORD"],
+    "motos": ["HONDA", "YAMAHA", "SUZUKI", "KAWASAKI", "BMW", "DUCATI", "TRIUMPH", "HARLEY-DAVIDSON"],
+    "caminhoes": ["VOLVO", "SCANIA", "MERCEDES-BENZ", "IVECO", "DAF", "MAN", "FORD", "VW"],
+}
+CODIGO_TIPO = {"carros": 1, "motos": 2, "caminhoes": 3}
+
+
+class CatalogoSintetico:
+    def __init__(self, marcas: int = 5, modelos_por_marca: int = 20, anos_por_modelo: int = 5,
+                 seed: int = 42, mes_referencia: str = MES_REFERENCIA, tipo_veiculo: str = "motos"):
+        """
+        Catálogo determinístico de um tipo de veículo: a mesma seed gera
+        sempre as mesmas marcas, modelos, anos e preços (inclusive o
+        sentinela 32000 de "zero km").
+        """
+        rnd = random.Random(seed + zlib.crc32(tipo_veiculo.encode()))
+        nomes = NOMES_MARCAS[tipo_veiculo]
+        self.tipo_veiculo = tipo_veiculo
+        self.mes_referencia = mes_referencia
+        self.marcas: List[Dict[str, str]] = []
+        self.modelos: Dict[str, List[Dict[str, Any]]] = {}
+        self.anos: Dict[tuple, List[Dict[str, str]]] = {}
+        self.precos: Dict[tuple, float] = {}
+
+        for i in range(marcas):
+            nome = nomes[i] if i < len(nomes) else f"MARCA {i}"
+            cod_marca = str(100 + i)
+            self.marcas.append({"codigo": cod_marca, "nome": nome})
+            self.modelos[cod_marca] = []
+
+            for j in range(modelos_por_marca):
+                cod_modelo = (i + 1) * 10000 + j
+                self.modelos[cod_marca].append({"codigo": cod_modelo, "nome": f"{nome} MODELO {j}"})
+
+                base = rnd.randint(8000, 90000)
+                anos = []
+                for k in range(anos_por_modelo):
+                    ano = 32000 if k == 0 and j % 7 == 0 else 2026 - k
+                    comb = 1 if j % 5 else 2
+                    codigo = f"{ano}-{comb}"
+                    anos.append({"codigo": codigo, "nome": f"{ano} {COMBUSTIVEIS[comb]}"})
+                    self.precos[(cod_marca, str(cod_modelo), codigo)] = round(base * (0.93 ** k), 2)
+                self.anos[(cod_marca, str(cod_modelo))] = anos
+
+    @property
+    def total_precos(self) -> int:
+        return len(self.precos)
+
+    def resposta(self, partes: List[str]) -> Optional[Any]:
+        """Corpo JSON para o caminho (já sem o prefixo), ou None se não existir."""
+        if partes == ["marcas"]:
+            return self.marcas
+
+        if len(partes) == 3 and partes[0] == "marcas" and partes[2] == "modelos":
+            modelos = self.modelos.get(partes[1])
+            if modelos is None:
+                return None
+            return {"modelos": modelos, "anos": []}
+
+        if len(partes) == 5 and partes[2] == "modelos" and partes[4] == "anos":
+            return self.anos.get((partes[1], partes[3]))
+
+        if len(partes) == 6 and partes[4] == "anos":
+            chave = (partes[1], partes[3], partes[5])
+            valor = self.precos.get(chave)
+            if valor is None:
+                return None
+            marca = next(m["nome"] for m in self.marcas if m["codigo"] == partes[1])
+            modelo = next(m["nome"] for m in self.modelos[partes[1]] if str(m["codigo"]) == partes[3])
+            ano, comb = partes[5].split("-")
+            inteiro, centavos = f"{valor:.2f}".split(".")
+            return {
+                "TipoVeiculo": CODIGO_TIPO[self.tipo_veiculo],
+                "Valor": f"R$ {int(inteiro):,}".replace(",", ".") + f",{centavos}",
+                "Marca": marca,
+                "Modelo": modelo,
+                "AnoModelo": int(ano),
+                "Combustivel": COMBUSTIVEIS[int(comb)],
+                "CodigoFipe": f"8{int(partes[3]) % 100000:05d}-{comb}",
+                "MesReferencia": self.mes_referencia,
+                "SiglaCombustivel": COMBUSTIVEIS[int(comb)][0],
+            }
+
+        return None
+
+
+def catalogos_sinteticos(tipos: Iterable[str] = TIPOS_VEICULO, **kwargs) -> Dict[str, CatalogoSintetico]:
+    """Um CatalogoSintetico por tipo de veículo, com os mesmos parâmetros."""
+    return {tipo: CatalogoSintetico(tipo_veiculo=tipo, **kwargs) for tipo in tipos}
+
+
+class MockFipeServer:
+    def __init__(self, catalogo, latencia: float = 0.0, jitter: float = 0.0,
+                 taxa_erro: float = 0.0, status_erro: int = 503, retry_after: str = "0",
+                 erro_em: Iterable[str] = (), prefixo: str = "/fipe/api/v1",
+                 host: str = "127.0.0.1", porta: int = 0, seed: int = 42):
+        """
+        Rotas: {prefixo}/{tipo_veiculo}/marcas/...; ``base_url`` é a raiz
+        (sem o tipo), como o BASE_URL_RAIZ de FipeApiClient.
+
+        :param catalogo: CatalogoSintetico (servido no tipo dele) ou dict
+            tipo_veiculo → CatalogoSintetico
+        :param latencia: atraso fixo por requisição (s)
+        :param jitter: atraso extra aleatório, uniforme em [0, jitter] (s)
+        :param taxa_erro: fração das requisições respondidas com ``status_erro``
+        :param status_erro: status das falhas injetadas
+        :param retry_after: header Retry-After das falhas 429/503
+        :param erro_em: trechos de caminho sempre respondidos com ``status_erro``
+            (ex.: "/marcas/100/" derruba uma marca inteira)
+        :param prefixo: caminho antes de /{tipo_veiculo} (igual ao da API pública)
+        :param porta: 0 escolhe uma porta livre
+        """
+        if isinstance(catalogo, CatalogoSintetico):
+            catalogo = {catalogo.tipo_veiculo: catalogo}
+        self.catalogos: Dict[str, CatalogoSintetico] = catalogo
+        self.latencia = latencia
+        self.jitter = jitter
+        self.taxa_erro = taxa_erro
+        self.status_erro = status_erro
+        self.retry_after = retry_after
+        self.erro_em = tuple(erro_em)
+        self.prefixo = prefixo.rstrip("/")
+        self.requisicoes = 0
+        self.erros_injetados = 0
+
+        self.seed = seed
+        self._por_caminho: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, porta), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, porta = self._httpd.server_address[:2]
+        return f"http://{host}:{porta}{self.prefixo}"
+
+    def _sortear(self, caminho: str):
+        """
+        Decide atraso e se a requisição falha. O sorteio sai de (seed,
+        caminho, n-ésima requisição do caminho), não de um RNG compartilhado:
+        o resultado não depende da ordem em que as threads chegam aqui.
+        """
+        with self._lock:
+            self.requisicoes += 1
+            n = self._por_caminho.get(caminho, 0)
+            self._por_caminho[caminho] = n + 1
+        rnd = random.Random(f"{self.seed}:{caminho}:{n}")
+        atraso = self.latencia + (rnd.uniform(0, self.jitter) if self.jitter else 0.0)
+        falha = (any(trecho in caminho for trecho in self.erro_em)
+                 or (self.taxa_erro > 0 and rnd.random() < self.taxa_erro))
+        if falha:
+            with self._lock:
+                self.erros_injetados += 1
+        return atraso, falha
+
+    def _handler(self):
+        servidor = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, como a API pública
+
+            def log_message(self, *args):
+                pass
+
+            def _responder(self, status: int, corpo: bytes, headers: Optional[Dict[str, str]] = None):
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json; charset=utf-8")
+                self.send_header("Content-Length", str(len(corpo)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(corpo)
+
+            def do_GET(self):
+                atraso, falha = servidor._sortear(self.path)
+                if atraso:
+                    time.sleep(atraso)
+
+                if falha:
+                    headers = {"Retry-After": servidor.retry_after} if servidor.status_erro in (429, 503) else None
+                    self._responder(servidor.status_erro, b'{"error": "injetado"}', headers)
+                    return
+
+                caminho = self.path.split("?")[0]
+                if not caminho.startswith(servidor.prefixo + "/"):
+                    self._responder(404, b"{}")
+                    return
+
+                partes = caminho[len(servidor.prefixo) + 1:].strip("/").split("/")
+                catalogo = servidor.catalogos.get(partes[0])
+                dados = catalogo.resposta(partes[1:]) if catalogo else None
+                if dados is None:
+                    self._responder(404, b'{"error": "nao encontrado"}')
+                    return
+
+                self._responder(200, json.dumps(dados, ensure_ascii=False).encode("utf-8"))
+
+        return Handler
+
+    def iniciar(self) -> str:
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self.base_url
+
+    def parar(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.iniciar()
+        return self
+
+    def __exit__(self, *exc):
+        self.parar()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--marcas", type=int, default=5)
+    parser.add_argument("--modelos", type=int, default=20, help="modelos por marca")
+    parser.add_argument("--anos", type=int, default=5, help="anos por modelo")
+    parser.add_argument("--latencia", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--taxa-erro", type=float, default=0.0)
+    parser.add_argument("--tipos", nargs="+", choices=TIPOS_VEICULO, default=list(TIPOS_VEICULO))
+    parser.add_argument("--porta", type=int, default=8765)
+    args = parser.parse_args()
+
+    catalogos = catalogos_sinteticos(args.tipos, marcas=args.marcas, modelos_por_marca=args.modelos,
+                                     anos_por_modelo=args.anos)
+    servidor = MockFipeServer(catalogos, latencia=args.latencia, jitter=args.jitter,
+                              taxa_erro=args.taxa_erro, porta=args.porta)
+    total = sum(c.total_precos for c in catalogos.values())
+    print(f"API FIPE local em {servidor.base_url}/{{{','.join(args.tipos)}}} ({total} preços). Ctrl+C para sair.")
+    try:
+        servidor._httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        servidor._httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
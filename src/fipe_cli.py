@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Linha de comando do pipeline FIPE.
+
+    fipe run                                  # todas as etapas
+    fipe run --stages gold,export             # só recalcula o gold e reexporta
+    fipe run --stages silver,gold --since 2026-09
+    fipe run --stages crawl,bronze --tipos motos --incremental --dry-run
+    fipe run --stages report --force          # refaz os relatórios mesmo sem mudança
+    fipe reset --keep-gold --dry-run          # o que um TRUNCATE do medallion apagaria
+
+Sem instalar (a partir da raiz do projeto):
+    PYTHONPATH=src python -m fipe_cli run --stages gold
+
+Só argparse é importado ao iniciar; o pipeline (e, dentro dele, pandas,
+pyarrow, matplotlib e o SDK do MinIO) é carregado depois da validação dos
+argumentos e apenas pelas etapas escolhidas.
+"""
+import argparse
+import sys
+from datetime import date, datetime
+from typing import List, Optional
+
+# Espelha insert_api_automacao.ETAPAS sem importá-lo (o --help fica instantâneo)
+ETAPAS = ("crawl", "bronze", "silver", "gold", "report", "export")
+TIPOS = ("carros", "motos", "caminhoes")
+
+
+def _lista(valor: str, validos, nome: str) -> List[str]:
+    itens = [v.strip() for v in valor.split(",") if v.strip()]
+    invalidos = sorted(set(itens) - set(validos))
+    if invalidos or not itens:
+        raise argparse.ArgumentTypeError(
+            f"{nome} inválido: {', '.join(invalidos) or valor!r} (use {', '.join(validos)})"
+        )
+    return itens
+
+
+def _etapas(valor: str) -> List[str]:
+    return _lista(valor, ETAPAS, "--stages")
+
+
+def _tipos(valor: str) -> List[str]:
+    return _lista(valor, TIPOS, "--tipos")
+
+
+def _desde(valor: str) -> date:
+    """AAAA-MM ou AAAA-MM-DD → date (o mês de referência é sempre dia 1)."""
+    for formato in ("%Y-%m", "%Y-%m-%d"):
+        try:
+            return datetime.strptime(valor, formato).date()
+        except ValueError:
+            pass
+    raise argparse.ArgumentTypeError(f"--since inválido: {valor!r} (use AAAA-MM ou AAAA-MM-DD)")
+
+
+def _shard(valor: str):
+    """K/N, com K de 1 a N."""
+    try:
+        k, n = (int(p) for p in valor.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"--shard inválido: {valor!r} (use K/N, ex.: 1/4)") from None
+    if not 1 <= k <= n:
+        raise argparse.ArgumentTypeError(f"--shard inválido: {valor!r} (K entre 1 e N)")
+    return k - 1, n
+
+
+def criar_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="fipe", description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    comandos = parser.add_subparsers(dest="comando", required=True)
+
+    run = comandos.add_parser("run", help="executa as etapas do pipeline")
+    run.add_argument("--stages", type=_etapas, default=list(ETAPAS),
+                     help=f"etapas separadas por vírgula (padrão: {','.join(ETAPAS)}). "
+                          "crawl e bronze rodam juntas, assim como silver e gold")
+    run.add_argument("--since", type=_desde, default=None,
+                     help="sem crawl: recalcula silver/gold só dos modelos com preço a partir "
+                          "deste mês de referência (AAAA-MM)")
+    run.add_argument("--dry-run", action="store_true",
+                     help="mostra o que seria executado, sem abrir banco, API ou MinIO")
+    run.add_argument("--tipos", type=_tipos, default=list(TIPOS))
+    run.add_argument("--selecao", help="JSON com os campos de SelecaoCrawl")
+    run.add_argument("--shard", type=_shard, help="K/N: coleta só a parte K de N")
+    run.add_argument("--incremental", action="store_true")
+    run.add_argument("--retry-failures", action="store_true")
+    run.add_argument("--history", action="store_true")
+    run.add_argument("--parallel-refresh", action="store_true")
+    run.add_argument("--force", action="store_true",
+                     help="roda as etapas pedidas mesmo sem mudança desde a última execução")
+
+    reset = comandos.add_parser("reset", help="zera bronze, silver e gold com um TRUNCATE")
+    reset.add_argument("--dry-run", action="store_true",
+                       help="só mostra as linhas estimadas de cada tabela (lê o catálogo do banco)")
+    reset.add_argument("--keep-gold", action="store_true",
+                       help="preserva o gold (ids estáveis e o feed de mudanças continuam válidos)")
+    return parser
+
+
+def plano(args) -> List[str]:
+    """Descrição, linha a linha, do que ``fipe run`` faria com estes argumentos."""
+    etapas = set(args.stages)
+    coleta = bool(etapas & {"crawl", "bronze"})
+    linhas = [f"etapas: {', '.join(e for e in ETAPAS if e in etapas)}",
+              f"tipos: {', '.join(args.tipos)}"]
+
+    if coleta:
+        modo = ("só falhas do checkpoint" if args.retry_failures
+                else "incremental (upsert)" if args.incremental
+                else "completa por diferença (apaga as chaves que não vierem, salvo retomada, "
+                     "shard ou tipos parciais)")
+        linhas.append(f"coleta → bronze: {modo}")
+        if args.selecao:
+            linhas.append(f"seleção: {args.selecao}")
+        if args.shard:
+            linhas.append(f"shard: {args.shard[0] + 1}/{args.shard[1]}")
+    else:
+        linhas.append("coleta: pulada (usa o bronze atual)")
+
+    if etapas & {"silver", "gold"}:
+        if coleta:
+            alcance = "modelos alterados pela coleta"
+        elif args.since:
+            alcance = f"modelos com preço desde {args.since:%Y-%m}"
+        else:
+            alcance = "tudo"
+        paralelo = ", por marca em paralelo" if args.parallel_refresh else ""
+        if args.force and not args.since:
+            alcance = "tudo"
+        pulo = "" if args.force else " (pulado se o bronze não mudou desde o último refresh)"
+        linhas.append(f"silver/gold: {alcance}{paralelo}; tabelas de consulta{pulo}")
+    if args.history:
+        linhas.append("histórico: arquiva o bronze e recalcula a depreciação")
+    pulo = "" if args.force else " (pulado se as camadas não mudaram)"
+    if "report" in etapas:
+        linhas.append(f"relatórios: só os que mudaram{pulo}")
+    if "export" in etapas:
+        linhas.append(f"export: snapshot Arrow local, Parquet, feed de mudanças e relatórios → MinIO{pulo}")
+    return linhas
+
+
+def _run(args) -> int:
+    if args.dry_run:
+        print("fipe run (dry-run):")
+        for linha in plano(args):
+            print(f"  {linha}")
+        return 0
+
+    # Só aqui o pipeline é importado
+    from insert_api_automacao import SELECAO_PADRAO, ApiFipe
+    from services.selecao import SelecaoCrawl
+
+    selecao = SelecaoCrawl.carregar(args.selecao) if args.selecao else None
+    if args.shard:
+        if selecao is None:
+            selecao = {tipo: SELECAO_PADRAO[tipo].com_shard(*args.shard) for tipo in args.tipos}
+        else:
+            selecao = selecao.com_shard(*args.shard)
+
+    concluido = ApiFipe().main(
+        incremental=args.incremental,
+        somente_falhas=args.retry_failures,
+        historico=args.history,
+        selecao=selecao,
+        tipos=tuple(args.tipos),
+        refresh_paralelo=args.parallel_refresh,
+        etapas=args.stages,
+        desde=args.since,
+        forcar=args.force
+    )
+    # Falha no banco já foi impressa; o status é o que o agendador enxerga
+    return 0 if concluido else 1
+
+
+def _reset(args) -> int:
+    from services.db_connection import DBConnection
+    from services.delete_table import DatabaseCleaner
+
+    banco = DBConnection.from_env()
+    try:
+        manter = ("gold.fipe_summary",) if args.keep_gold else ()
+        DatabaseCleaner(banco).reset_rapido(dry_run=args.dry_run, manter=manter)
+    finally:
+        banco.closeall()
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = criar_parser().parse_args(argv)
+    if args.comando == "run":
+        return _run(args)
+    if args.comando == "reset":
+        return _reset(args)
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
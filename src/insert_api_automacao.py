@@ -1,318 +1,523 @@
 # -*- coding: utf-8 -*-
-import time
 import os
-import csv
-import matplotlib.pyplot as plt
-from services.fipe_api_client import FipeApiClient, parse_valor_fipe
-from src.tests.test_db_connection import DBConnection
-from services.delete_table import DatabaseCleaner
-from services.export_to_minio import MinioUploader
-
+import sys
+import psycopg2
+from services.fipe_api_client import (
+    TIPOS_VEICULO, EstatisticasHttp, FipeApiClient, chave_preco, parse_mes_referencia
+)
+from services.rate_limiter import TokenBucket
+from services.response_cache import ResponseCache
+from services.checkpoint import CrawlCheckpoint, NIVEL_PRECO
+from services.medallion_refresh import MedallionRefresher
+from services.bronze_history import BronzeHistory
+from services.change_feed import ChangeFeedExporter
+from services.consulta_fipe import atualizar_tabelas_consulta
+from services.metrics import Metricas
+from services.selecao import SelecaoCrawl
+from services.db_connection import DBConnection
+from services.digest import atualizar_digests, combinar, marcar_processado, ultimo_processado
+
+# pandas (bronze), pyarrow (Parquet/snapshot), matplotlib (relatórios) e o SDK
+# do MinIO são importados só nas etapas que os usam: uma execução parcial
+# (ex.: fipe run --stages gold) não paga o import de quem não vai rodar
+
+# ================================================================
+#   CONFIGURAÇÃO DO CRAWL
+# ================================================================
+REQUISICOES_POR_SEGUNDO = 2.0   # teto de requisições/s aceito pela API
+RAJADA_MAXIMA = 2               # requisições acumuladas liberadas de uma vez
+MAX_WORKERS = 4                 # requisições simultâneas
+MAX_MODELOS_POR_MARCA = 10
+# Tipos coletados em cada execução (substituível por --tipos carros,motos).
+# Os tipos rodam em paralelo, dividindo o mesmo limite de requisições/s
+TIPOS_COLETA = TIPOS_VEICULO
+# O que coletar por padrão em cada tipo (substituível por --selecao arquivo.json,
+# que vale para todos os tipos)
+SELECAO_PADRAO = {
+    "carros": SelecaoCrawl(marcas={"FIAT", "TOYOTA"}, max_modelos=MAX_MODELOS_POR_MARCA),
+    "motos": SelecaoCrawl(marcas={"HONDA", "YAMAHA"}, max_modelos=MAX_MODELOS_POR_MARCA),
+    "caminhoes": SelecaoCrawl(marcas={"VOLVO", "SCANIA"}, max_modelos=MAX_MODELOS_POR_MARCA),
+}
+CACHE_HTTP = ".cache/fipe_http.sqlite"  # cache do catálogo (marcas/modelos/anos)
+TAMANHO_LOTE_BRONZE = 1000              # registros por COPY/commit no bronze
+MAX_FILA_CRAWL = 5000                   # registros em memória entre crawl e carga
+CHECKPOINT_CRAWL = ".cache/fipe_checkpoint_{tipo}.sqlite"  # fronteira para retomar o crawl
+FAIXA_SILVER = (18000, 30000)           # faixa de preço (R$) mantida no silver
+RETENCAO_HISTORICO_MESES = 24           # meses mantidos em bronze.fipe_history
+MESES_DEPRECIACAO = 12                  # janela de gold.fipe_depreciacao
+MAX_UPLOADS_PARALELOS = 4               # uploads simultâneos para o MinIO
+MAX_CONEXOES_BANCO = 4                  # tamanho máximo do pool de conexões
+MAX_CONEXOES_REFRESH = MAX_CONEXOES_BANCO - 1  # marcas simultâneas no refresh paralelo
+RELATORIOS_DIR = "relatorios"           # saída dos gráficos/CSVs (com manifesto de cache)
+SNAPSHOT_DIR = "snapshots"              # snapshot Arrow local das camadas (análise offline)
+MAX_PROCESSOS_RELATORIOS = 4            # processos de desenho simultâneos
+METRICAS_LOG = ".cache/fipe_metrics.jsonl"  # métricas por etapa (JSON lines)
+# Etapas selecionáveis (fipe run --stages); crawl+bronze e silver+gold andam juntas
+ETAPAS = ("crawl", "bronze", "silver", "gold", "report", "export")
+# Arquivo .prom para o textfile collector do Prometheus (opcional)
+METRICAS_PROMETHEUS = os.getenv("FIPE_PROMETHEUS_FILE")
 
 
 class ApiFipe:
     # ================================================================
-    #   INSERÇÃO — BRONZE
+    #   INSERÇÃO — BRONZE (STREAMING)
     # ================================================================
-    def insert_bronze(self, conn, registros):
-        cur = conn.cursor()
-
-        cur.execute("CREATE SCHEMA IF NOT EXISTS bronze;")
+    def insert_bronze(self, conn, produtores, incremental=False, ao_gravar=None, metricas=None,
+                      houve_falhas=None):
+        """
+        Grava no bronze os registros à medida que o crawl os produz.
+
+        Args:
+            produtores: iteráveis de registros (normalmente um gerador de
+                crawl por tipo de veículo), consumidos em paralelo
+            incremental: só faz upsert por (tipo, marca, modelo, ano, mês de
+                referência). Sem ele a carga é completa, mas por diferença: o
+                upsert pula linhas idênticas (mesmo hash_conteudo) e, no fim,
+                só as chaves que não vieram são apagadas
+            ao_gravar: callback chamado com cada lote após o commit
+            metricas: Metricas opcional (tempo de gravação na etapa "bronze")
+            houve_falhas: função consultada no fim do crawl; True impede a
+                carga completa de apagar as chaves que não vieram
+
+        Returns:
+            tuple: (total gravado, trios (tipo_veiculo, marca, modelo)
+            inseridos, alterados ou removidos)
+        """
+        from services.bronze_loader import criar_tabela_bronze
+        from services.pipeline import StreamingPipeline
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS bronze.fipe_raw (
-                id SERIAL PRIMARY KEY,
-                marca VARCHAR(50) NOT NULL,
-                modelo VARCHAR(100) NOT NULL,
-                ano_modelo VARCHAR(10) NOT NULL,
-                codigo_marca INTEGER NOT NULL,
-                codigo_modelo INTEGER NOT NULL,
-                codigo_ano VARCHAR(20) NOT NULL,
-                valor VARCHAR(30),
-                valor_numeric NUMERIC(12,2)
-            );
-        """)
-
-        cur.execute("DELETE FROM bronze.fipe_raw;")
-
-        for r in registros:
-            cur.execute("""
-                INSERT INTO bronze.fipe_raw
-                (marca, modelo, ano_modelo, codigo_marca, codigo_modelo, codigo_ano, valor, valor_numeric)
-                VALUES (%s,%s,%s,%s,%s,%s,%s,%s)
-            """, (
-                r["marca"],
-                r["modelo"],
-                r["ano"],
-                r["cod_marca"],
-                r["cod_modelo"],
-                r["cod_ano"],
-                r["valor_str"],
-                r["valor_num"]
-            ))
+        cur = conn.cursor()
 
+        criar_tabela_bronze(cur)
         conn.commit()
-        print(f"BRONZE OK! Inseridos {len(registros)} registros")
 
-    # ================================================================
-    #   INSERÇÃO — SILVER (18k–30k)
-    # ================================================================
-    def insert_silver(self, conn):
-        cur = conn.cursor()
+        pipeline = StreamingPipeline(
+            conn,
+            batch_size=TAMANHO_LOTE_BRONZE,
+            max_fila=MAX_FILA_CRAWL,
+            upsert=True,
+            ao_gravar=ao_gravar,
+            metricas=metricas,
+            espelho=not incremental,
+            houve_falhas=houve_falhas
+        )
+        total, alterados = pipeline.executar(*produtores)
 
-        cur.execute("CREATE SCHEMA IF NOT EXISTS silver;")
+        print(f"BRONZE OK! {total} registros recebidos, {len(alterados)} modelos com mudança")
+        return total, alterados
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS silver.fipe_limited (
-                id SERIAL PRIMARY KEY,
-                marca VARCHAR(50) NOT NULL,
-                modelo VARCHAR(100) NOT NULL,
-                ano_modelo VARCHAR(10) NOT NULL,
-                valor_numeric NUMERIC(12,2)
-            );
-        """)
+    def _mes_referencia_atual(self, conn, api):
+        """
+        Descobre o mês de referência vigente consultando de novo o preço mais
+        recente já gravado do tipo de ``api`` (uma única requisição).
+        """
+        from services.bronze_loader import criar_tabela_bronze
 
-        cur.execute("DELETE FROM silver.fipe_limited;")
+        cur = conn.cursor()
+        criar_tabela_bronze(cur)
+        conn.commit()
 
         cur.execute("""
-            INSERT INTO silver.fipe_limited (marca, modelo, ano_modelo, valor_numeric)
-            SELECT marca, modelo, ano_modelo, valor_numeric
+            SELECT codigo_marca, codigo_modelo, codigo_ano
             FROM bronze.fipe_raw
-            WHERE valor_numeric BETWEEN 18000 AND 30000
-            ORDER BY valor_numeric DESC;
-        """)
+            WHERE tipo_veiculo = %s AND mes_referencia IS NOT NULL
+            ORDER BY mes_referencia DESC
+            LIMIT 1;
+        """, (api.tipo_veiculo,))
+        row = cur.fetchone()
+        if not row:
+            return None
+
+        preco = api.get_preco(*row)
+        if not preco:
+            return None
+        return parse_mes_referencia(preco.get("MesReferencia"))
+
+    def _chaves_ingeridas(self, conn, mes_referencia, tipo_veiculo):
+        """Chaves (marca, modelo, ano) do tipo já gravadas para o mês de referência."""
+        if mes_referencia is None:
+            return set()
 
-        conn.commit()
-        print("SILVER OK! (18k–30k filtrado)")
+        cur = conn.cursor()
+        cur.execute("""
+            SELECT codigo_marca, codigo_modelo, codigo_ano
+            FROM bronze.fipe_raw
+            WHERE tipo_veiculo = %s AND mes_referencia = %s;
+        """, (tipo_veiculo, mes_referencia))
+        return {chave_preco(*row) for row in cur.fetchall()}
 
     # ================================================================
-    #   INSERÇÃO — GOLD
+    #   SILVER (FAIXA DE PREÇO) + GOLD (MÉDIAS POR MODELO)
     # ================================================================
-    def insert_gold(self, conn):
-        cur = conn.cursor()
+    def refresh_silver_gold(self, conn, alterados=None, banco=None):
+        """
+        Atualiza silver e gold dentro do banco, em uma transação.
 
-        cur.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+        Args:
+            alterados: trios (tipo_veiculo, marca, modelo) a recalcular; None
+                reconstrói tudo
+            banco: com o DBConnection, recalcula por marca em paralelo (uma
+                transação por marca, sob advisory lock) nas conexões do pool
 
-        cur.execute("""
-            CREATE TABLE IF NOT EXISTS gold.fipe_summary (
-                id SERIAL PRIMARY KEY,
-                marca VARCHAR(50) NOT NULL,
-                modelo VARCHAR(100) NOT NULL,
-                media_valor NUMERIC(12,2),
-                qtd_registros INTEGER
-            );
-        """)
+        Returns:
+            bool: False se alguma marca foi pulada (em refresh por outra execução)
+        """
+        refresher = MedallionRefresher(conn, *FAIXA_SILVER)
+        if banco is not None:
+            fatias = None if alterados is None else {(tipo, marca) for tipo, marca, _ in alterados}
+            resultado = refresher.refresh_por_marca(banco, fatias, max_workers=MAX_CONEXOES_REFRESH)
+            return not resultado["ocupadas"]
+        if alterados is None:
+            refresher.refresh()
+        else:
+            refresher.refresh_incremental(alterados)
+        return True
 
-        cur.execute("DELETE FROM gold.fipe_summary;")
+    # ================================================================
+    #   RELATÓRIOS — GRÁFICOS E CSVs (SEM JANELA, COM CACHE)
+    # ================================================================
+    def gerar_relatorios(self, conn):
+        """
+        Gera os relatórios em RELATORIOS_DIR. Só os que mudaram desde a última
+        execução são redesenhados.
 
-        cur.execute("""
-            INSERT INTO gold.fipe_summary (marca, modelo, media_valor, qtd_registros)
-            SELECT 
-                marca,
-                modelo,
-                AVG(valor_numeric),
-                COUNT(*)
-            FROM silver.fipe_limited
-            GROUP BY marca, modelo
-            ORDER BY AVG(valor_numeric) DESC;
-        """)
+        Returns:
+            dict: artefatos novos ou alterados (destino no MinIO → caminho local)
+        """
+        from services.report_renderer import ReportRenderer
 
-        conn.commit()
-        print("GOLD OK! (médias por modelo)")
+        renderer = ReportRenderer(
+            conn,
+            pasta=RELATORIOS_DIR,
+            max_workers=MAX_PROCESSOS_RELATORIOS,
+            faixa=FAIXA_SILVER
+        )
+        alterados = renderer.gerar()
+        print(f"Relatórios: {len(alterados)} arquivo(s) novos ou alterados em {RELATORIOS_DIR}/")
+        return alterados
 
     # ================================================================
-    #   GRÁFICO — TOP 10 MAIORES VALORES (SILVER)
+    #   MAIN - PARTE PRINCIPAL DO PROJETO
     # ================================================================
-    def gerar_grafico(self, conn):
+    def _marcar_lote_concluido(self, checkpoints, lote):
+        # Um lote mistura os tipos; cada um tem o seu checkpoint
+        por_tipo = {}
+        for r in lote:
+            por_tipo.setdefault(r["tipo_veiculo"], []).append(
+                chave_preco(r["cod_marca"], r["cod_modelo"], r["cod_ano"])
+            )
+        for tipo, chaves in por_tipo.items():
+            checkpoints[tipo].marcar_concluidos(NIVEL_PRECO, chaves)
+
+    def _caminho_checkpoint(self, tipo, selecao):
+        caminho = CHECKPOINT_CRAWL.format(tipo=tipo)
+        if selecao.fragmentada:
+            caminho = caminho.replace(".sqlite", f"_shard{selecao.shard}de{selecao.total_shards}.sqlite")
+        return caminho
+
+    def _digest_entrada(self, conn):
+        """Entrada do refresh: conteúdo do bronze + faixa de preço do silver."""
+        bronze = atualizar_digests(conn, ["bronze.fipe_raw"])["bronze.fipe_raw"]
+        return combinar(bronze, f"faixa={FAIXA_SILVER[0]}-{FAIXA_SILVER[1]}")
+
+    def _alterados_desde(self, conn, desde, tipos):
+        """Trios (tipo, marca, modelo) com preço de mês de referência >= ``desde`` no bronze."""
         cur = conn.cursor()
-
         cur.execute("""
-            SELECT modelo, valor_numeric
-            FROM silver.fipe_limited
-            ORDER BY valor_numeric DESC
-            LIMIT 10;
-        """)
-
-        rows = cur.fetchall()
-
-        if not rows:
-            print("Nenhum dado para gráficos!")
-            return
-
-        modelos = [r[0] for r in rows]
-        valores = [r[1] for r in rows]
-
-        os.makedirs("datasets", exist_ok=True)
-        csv_path = "datasets/sample_data.csv"
-
-        with open(csv_path, "w", newline="", encoding="utf-8") as f:
-            writer = csv.writer(f)
-            writer.writerow(["Modelo", "Valor"])
-            writer.writerows(rows)
-
-        print(f"Dados salvos em {csv_path}")
-
-        plt.figure(figsize=(10, 5))
-        plt.bar(modelos, valores, edgecolor="black")
-        plt.xticks(rotation=45, ha='right')
-        plt.title("TOP 10 Motos FIPE — Faixa 18k a 30k")
-        plt.xlabel("Modelo")
-        plt.ylabel("Valor (R$)")
-        plt.tight_layout()
-        plt.show()
+            SELECT DISTINCT tipo_veiculo, marca, modelo
+            FROM bronze.fipe_raw
+            WHERE mes_referencia >= %s AND tipo_veiculo = ANY(%s);
+        """, (desde, list(tipos)))
+        return {tuple(row) for row in cur.fetchall()}
 
-    # ================================================================
-    #   LIMPEZA DO BANCO ANTES DA INSERÇÃO
-    # ================================================================
-    def _limpar_banco_antes_insercao(self):
+    def main(self, incremental=False, somente_falhas=False, historico=False, selecao=None,
+             tipos=TIPOS_COLETA, refresh_paralelo=False, etapas=ETAPAS, desde=None, forcar=False):
         """
-        Verifica e limpa o banco de dados antes de inserir novos dados
+        Args:
+            incremental: quando True não apaga chaves do bronze; só busca os preços que
+                ainda não foram gravados para o mês de referência vigente e
+                recalcula silver/gold apenas para os modelos alterados
+            somente_falhas: reprocessa apenas as falhas registradas no
+                checkpoint da última execução (só upsert)
+            historico: também arquiva o bronze em bronze.fipe_history
+                (particionado por mês), aplica a retenção e recalcula a
+                depreciação mês a mês no gold
+            selecao: SelecaoCrawl com marcas, modelos, anos, faixa de preço e
+                shard a coletar, aplicada a todos os tipos, ou dict tipo →
+                SelecaoCrawl (padrão: SELECAO_PADRAO). Com mais de um shard nada
+                é apagado do bronze: cada shard faz upsert e os
+                resultados se juntam pela chave natural
+            tipos: tipos de veículo coletados, em paralelo. Sem todos os
+                tipos também não se apaga nada (upsert só dos coletados)
+            refresh_paralelo: recalcula silver/gold por marca, em paralelo e
+                sob advisory locks, em vez de uma transação única; shards em
+                máquinas diferentes não se bloqueiam nem se sobrescrevem
+            etapas: etapas a executar (subconjunto de ETAPAS). crawl e bronze
+                andam juntas (o crawl grava no bronze em streaming), assim
+                como silver e gold. Sem crawl o bronze não é alterado
+            desde: date; sem crawl na execução, silver/gold recalculam só os
+                modelos com preço de mês de referência a partir dessa data
+                (None recalcula tudo)
+            forcar: roda as etapas pedidas mesmo quando o digest de entrada
+                é o da última execução (sem desde, o refresh é completo)
+
+        Returns:
+            bool: False se a execução parou por falha de conexão ou timeout
+            do banco (o ``fipe run`` sai com status diferente de zero)
         """
-        print("VERIFICAÇÃO DO BANCO DE DADOS...")
-
-        # Criar conexão para o cleaner
-        banco_temp = DBConnection(
-            host="localhost",
-            port=5432,
-            dbname="fipe_banco",
-            user="postgres",
-            password="postgres"
-        )
-
-        # Usar o DatabaseCleaner para verificar e limpar
-        cleaner = DatabaseCleaner(banco_temp)
-        dados_foram_limpos = cleaner.check_and_clean_database()
+        etapas = set(etapas)
+        coleta = bool(etapas & {"crawl", "bronze"})
+        refresh = bool(etapas & {"silver", "gold"})
 
-        if dados_foram_limpos:
-            print("Banco limpo com sucesso. Pronto para novos dados.")
-        else:
-            print("Banco já estava vazio. Pronto para novos dados.")
+        if isinstance(selecao, SelecaoCrawl):
+            selecao = {tipo: selecao for tipo in tipos}
+        selecoes = {tipo: (selecao or SELECAO_PADRAO).get(tipo, SELECAO_PADRAO[tipo]) for tipo in tipos}
+        parcial = (set(tipos) != set(TIPOS_VEICULO)
+                   or any(s.fragmentada for s in selecoes.values()))
 
-        return True
+        print("\n" + "=" * 60)
+        print(f"ETAPAS: {', '.join(e for e in ETAPAS if e in etapas)}")
+        if coleta:
+            for tipo, sel in selecoes.items():
+                print(f"COLETA FIPE {tipo.upper()} ({sel.descricao()})")
+
+        # Checkpoint da fronteira do crawl: uma execução interrompida é retomada.
+        # Cada tipo (e cada shard) tem a sua fronteira
+        checkpoints = {}
+        retomando = {tipo: False for tipo in tipos}
+        if coleta:
+            checkpoints = {
+                tipo: CrawlCheckpoint(self._caminho_checkpoint(tipo, sel))
+                for tipo, sel in selecoes.items()
+            }
+            if not somente_falhas:
+                for tipo, checkpoint in checkpoints.items():
+                    retomando[tipo] = checkpoint.iniciar()
+                    if retomando[tipo]:
+                        print(f"Retomando execução interrompida ({tipo}): {checkpoint.resumo()}")
+
+        # Carga completa = upsert por diferença no bronze (sem regravar linhas
+        # idênticas) + remoção das chaves que sumiram; o refresh depois pega
+        # só os modelos que mudaram
+        carga_completa = coleta and not (incremental or somente_falhas or any(retomando.values()) or parcial)
+
+        # Duração por etapa, vazão, latência HTTP e pico de memória
+        metricas = Metricas(METRICAS_LOG, METRICAS_PROMETHEUS)
+
+        # PASSO 1: Pool de conexões único, compartilhado por todas as etapas
+        banco = DBConnection.from_env(maxconn=MAX_CONEXOES_BANCO)
+
+        try:
+            with banco.conexao() as conn:
+                # Digest do bronze antes da carga: se o último refresh foi feito
+                # sobre ele, basta recalcular os modelos que esta carga mudar
+                antes = self._digest_entrada(conn) if refresh else None
+
+                alterados = None
+                if coleta:
+                    # PASSO 2: Coletar dados da API e gravar no bronze
+                    alterados = self._coletar(conn, tipos, selecoes, checkpoints, retomando,
+                                              incremental, somente_falhas, carga_completa, metricas)
+                elif desde is not None:
+                    alterados = self._alterados_desde(conn, desde, tipos)
+                    print(f"Modelos com preço desde {desde:%Y-%m}: {len(alterados)}")
+
+                if refresh:
+                    # PASSO 3: Processar dados (silver, gold)
+                    print("\n" + "=" * 60)
+                    print("PROCESSAMENTO DOS DADOS (BRONZE → SILVER → GOLD)")
+                    print("=" * 60 + "\n")
+
+                    entrada = self._digest_entrada(conn)
+                    ultimo = ultimo_processado(conn, "silver_gold")
+                    if ultimo == entrada and not forcar:
+                        print("SILVER/GOLD: bronze igual ao do último refresh, nada a recalcular.")
+                    else:
+                        if desde is None and (forcar or ultimo != antes):
+                            # O bronze mudou fora desta execução (ou é o primeiro refresh)
+                            alterados = None
+
+                        # Silver e gold são recalculados na mesma transação (ou uma por
+                        # marca, em paralelo, com refresh_paralelo)
+                        with metricas.etapa("silver_gold"):
+                            banco_refresh = banco if refresh_paralelo else None
+                            completo = self.refresh_silver_gold(conn, alterados, banco=banco_refresh)
+
+                        # Preços vigentes + histograma de faixas lidos por services.consulta_fipe
+                        with metricas.etapa("consulta") as etapa:
+                            etapa.linhas, _ = atualizar_tabelas_consulta(conn)
+                        # Com marcas puladas, o próximo refresh não pode achar que está em dia
+                        if completo:
+                            marcar_processado(conn, "silver_gold", entrada)
+
+                if historico:
+                    with metricas.etapa("historico") as etapa:
+                        history = BronzeHistory(conn, retencao_meses=RETENCAO_HISTORICO_MESES)
+                        etapa.linhas = history.arquivar()
+                        history.aplicar_retencao()
+                        history.refresh_depreciacao(meses=MESES_DEPRECIACAO)
+
+                # Relatórios e export leem as três camadas: com o mesmo digest
+                # da última vez em que rodaram, não há o que refazer
+                camadas = None
+                if etapas & {"report", "export"}:
+                    camadas = combinar(*atualizar_digests(conn).values())
+
+                relatorios = {}
+                if "report" in etapas:
+                    # PASSO 4: Gerar gráficos
+                    print("\n" + "=" * 60)
+                    print("GERAÇÃO DE GRÁFICOS E RELATÓRIOS")
+                    print("=" * 60 + "\n")
+
+                    if ultimo_processado(conn, "relatorios") == camadas and not forcar:
+                        print("Relatórios: camadas sem mudança desde a última geração, nada a fazer")
+                    else:
+                        with metricas.etapa("relatorios") as etapa:
+                            relatorios = self.gerar_relatorios(conn)
+                            etapa.linhas = len(relatorios)
+                            etapa.bytes = sum(os.path.getsize(c) for c in relatorios.values())
+                        marcar_processado(conn, "relatorios", camadas)
+
+                if "export" in etapas:
+                    if ultimo_processado(conn, "export") == camadas and not relatorios and not forcar:
+                        print("EXPORT: camadas sem mudança desde a última exportação, nada a enviar")
+                    else:
+                        self._exportar(conn, relatorios, metricas)
+                        marcar_processado(conn, "export", camadas)
+
+        except psycopg2.OperationalError as e:
+            print(f"ERRO no banco de dados (conexão ou timeout): {e}")
+            return False
+        finally:
+            banco.closeall()
+            metricas.finalizar()
 
-    # ================================================================
-    #   MAIN - PARTE PRINCIPAL DO PROJETO
-    # ================================================================
-    def main(self):
         print("\n" + "=" * 60)
-        print("COLETA FIPE (Honda + Yamaha — 10 modelos cada)")
-
-        # PASSO 1: Limpar banco antes de começar
-        self._limpar_banco_antes_insercao()
-
-        # PASSO 2: Conectar ao banco para inserção
-        banco = DBConnection(
-            host="localhost",
-            port=5432,
-            dbname="fipe_banco",
-            user="postgres",
-            password="postgres"
-        )
+        print("PROCESSO CONCLUÍDO COM SUCESSO!")
+        print("=" * 60 + "\n")
+        return True
 
-        conn = banco.connect()
-        if not conn:
-            print("ERRO: Não foi possível conectar ao banco de dados!")
-            return
+    def _coletar(self, conn, tipos, selecoes, checkpoints, retomando,
+                 incremental, somente_falhas, carga_completa, metricas):
+        """
+        PASSO 2: coleta da API gravando no bronze em streaming.
 
-        # PASSO 3: Coletar dados da API
-        api = FipeApiClient()
-        marcas_desejadas = {"HONDA", "YAMAHA"}
-        registros_final = []
+        Returns:
+            set: trios (tipo_veiculo, marca, modelo) inseridos ou alterados
+        """
+        # Um cliente por tipo; limite global, cache e contadores HTTP
+        # são compartilhados por todos os tipos e threads do crawl
+        limite = TokenBucket(REQUISICOES_POR_SEGUNDO, RAJADA_MAXIMA)
+        cache = ResponseCache(CACHE_HTTP)
+        estatisticas = EstatisticasHttp()
+        apis = {
+            tipo: FipeApiClient(
+                rate_limiter=limite,
+                cache=cache,
+                pool_size=MAX_WORKERS,
+                tipo_veiculo=tipo,
+                estatisticas=estatisticas
+            )
+            for tipo in tipos
+        }
 
         print("\n" + "=" * 60)
         print("COLETANDO DADOS DA API FIPE")
         print("=" * 60 + "\n")
 
-        print("Buscando marcas...")
-        marcas = api.get_marcas()
-
-        for m in marcas:
-            nome = m["nome"].upper()
-            if nome not in marcas_desejadas:
+        # O crawl é consumido em streaming: cada lote vai para o bronze
+        # assim que fica pronto, sem acumular a coleta inteira em memória
+        produtores = []
+        for tipo, api in apis.items():
+            checkpoint = checkpoints[tipo]
+            if somente_falhas:
+                produtores.append(api.crawl_falhas(checkpoint, max_workers=MAX_WORKERS))
                 continue
 
-            print(f"\n{'=' * 40}")
-            print(f"MARCA: {nome}")
-            print(f"{'=' * 40}")
-
-            modelos = api.get_modelos(m["codigo"])
-            modelos_coletados = 0
-
-            for mod in modelos:
-                if modelos_coletados >= 10:
-                    print(f"Limite de {modelos_coletados} modelos atingido para {nome}.")
-                    break
-
-                print(f"→ Modelo: {mod['nome']}")
-                anos = api.get_anos(m["codigo"], mod["codigo"])
-
-                encontrou_preco = False
-
-                for ano in anos:
-                    preco = api.get_preco(m["codigo"], mod["codigo"], ano["codigo"])
-                    time.sleep(0.8)
-
-                    if not preco:
-                        continue
-
-                    valor_num = parse_valor_fipe(preco.get("Valor"))
-                    valor_str = preco.get("Valor")
-
-                    registros_final.append({
-                        "marca": nome,
-                        "modelo": mod["nome"],
-                        "ano": ano["codigo"],
-                        "cod_marca": m["codigo"],
-                        "cod_modelo": mod["codigo"],
-                        "cod_ano": ano["codigo"],
-                        "valor_str": valor_str,
-                        "valor_num": valor_num
-                    })
-
-                    print(f"✓ {nome} - {mod['nome']} - {ano['codigo']} → {valor_str}")
-                    encontrou_preco = True
-
-                if encontrou_preco:
-                    modelos_coletados += 1
+            ja_ingeridas = set()
+            if incremental:
+                mes_atual = self._mes_referencia_atual(conn, api)
+                ja_ingeridas = self._chaves_ingeridas(conn, mes_atual, tipo)
+                print(f"Modo incremental ({tipo}): mês {mes_atual}, "
+                      f"{len(ja_ingeridas)} preços já ingeridos")
+            if retomando[tipo]:
+                ja_ingeridas |= checkpoint.concluidos(NIVEL_PRECO)
+
+            produtores.append(api.crawl(
+                max_workers=MAX_WORKERS,
+                pular=ja_ingeridas.__contains__ if ja_ingeridas else None,
+                checkpoint=checkpoint,
+                selecao=selecoes[tipo]
+            ))
 
-            print(f"✓ Total coletado da marca {nome}: {modelos_coletados} modelos")
+        # Crawl e carga correm juntos: "crawl" é o tempo total do
+        # streaming e "bronze" só o tempo gasto gravando os lotes
+        print("Buscando marcas...")
+        with metricas.etapa("crawl") as etapa:
+            total, alterados = self.insert_bronze(
+                conn, produtores,
+                incremental=not carga_completa,
+                ao_gravar=lambda lote: self._marcar_lote_concluido(checkpoints, lote),
+                metricas=metricas,
+                # Marca/modelo/preço com falha fica no checkpoint; a lista de
+                # marcas só aparece nos erros HTTP
+                houve_falhas=lambda: (any(c.falhas() for c in checkpoints.values())
+                                      or any(e["erros"] for e in estatisticas.resumo().values()))
+            )
+            etapa.linhas = total
+        for checkpoint in checkpoints.values():
+            checkpoint.finalizar()
+        metricas.registrar_http(estatisticas)
+        metricas.incrementar("modelos_alterados", len(alterados))
 
         print(f"\n{'=' * 60}")
-        print(f"TOTAL GERAL COLETADO: {len(registros_final)} registros.")
+        print(f"TOTAL GERAL COLETADO: {total} registros.")
+        for tipo, checkpoint in checkpoints.items():
+            print(f"Checkpoint ({tipo}): {checkpoint.resumo()}")
+        for endpoint, est in estatisticas.resumo().items():
+            print(f"HTTP {endpoint}: {est['requisicoes']} req, {est['retries']} retries, "
+                  f"{est['erros']} erros, média {est['latencia_media'] * 1000:.0f} ms, "
+                  f"máx {est['latencia_max'] * 1000:.0f} ms")
         print(f"{'=' * 60}\n")
+        return alterados
 
-        # PASSO 4: Processar dados (bronze, silver, gold)
-        print("\n" + "=" * 60)
-        print("PROCESSAMENTO DOS DADOS (BRONZE → SILVER → GOLD)")
-        print("=" * 60 + "\n")
+    def _exportar(self, conn, relatorios, metricas):
+        """PASSO 5: snapshot local e envio de camadas, feed e relatórios ao MinIO."""
+        from services.export_to_minio import MinioUploader
+        from services.parquet_export import ParquetExporter
+        from services.snapshot_store import SnapshotWriter
 
-        self.insert_bronze(conn, registros_final)
-        self.insert_silver(conn)
-        self.insert_gold(conn)
+        # Cópia local (Arrow IPC) de bronze/silver/gold para notebooks
+        with metricas.etapa("snapshot") as etapa:
+            snapshot = SnapshotWriter(conn, pasta=SNAPSHOT_DIR).gravar()
+            etapa.linhas = sum(c["linhas"] for c in snapshot.values())
+            etapa.bytes = sum(c["bytes"] for c in snapshot.values())
 
-        # PASSO 5: Gerar gráficos
-        print("\n" + "=" * 60)
-        print("GERAÇÃO DE GRÁFICOS E RELATÓRIOS")
-        print("=" * 60 + "\n")
-
-        self.gerar_grafico(conn)
-
-        # PASSO 6: Enviar arquivos para o MinIO
         print("\n" + "=" * 60)
         print("EXPORTAÇÃO DOS DADOS PARA O MINIO")
         print("=" * 60 + "\n")
 
-        uploader = MinioUploader()
-        uploader.upload()
-
-        # Fechar conexão
-        conn.close()
-
-        print("\n" + "=" * 60)
-        print("PROCESSO CONCLUÍDO COM SUCESSO!")
-        print("=" * 60 + "\n")
+        with metricas.etapa("minio") as etapa:
+            uploader = MinioUploader()
+            exporter = ParquetExporter(
+                conn,
+                uploader.minio_client,
+                bucket=uploader.bucket_name,
+                max_workers=MAX_UPLOADS_PARALELOS
+            )
+            exportado = exporter.exportar()
+            # Deltas do gold (NDJSON por lote) para quem não quer reler o snapshot
+            feed = ChangeFeedExporter(conn, uploader.minio_client, bucket=uploader.bucket_name).exportar()
+            uploader.upload(relatorios)
+            etapa.linhas = (sum(c["enviados"] for c in exportado.values())
+                            + feed["lotes"] + len(relatorios))
+            etapa.bytes = (sum(c["bytes"] for c in exportado.values()) + feed["bytes"]
+                           + sum(os.path.getsize(c) for c in relatorios.values()))
 
 
 if __name__ == "__main__":
-    # EXECUTE O PIPELINE DA FIPE
-    ApiFipe().main()
\ No newline at end of file
+    # Mesmas opções do ``fipe run`` (ex.: --incremental, --tipos carros,motos)
+    from fipe_cli import main as fipe_main
+
+    sys.exit(fipe_main(["run", *sys.argv[1:]]))
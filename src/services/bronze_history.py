@@ -0,0 +1,253 @@
+# -*- coding: utf-8 -*-
+import re
+from datetime import date
+from typing import List, Optional
+
+PREFIXO_PARTICAO = "fipe_history_p"
+_RE_PARTICAO = re.compile(rf"^{PREFIXO_PARTICAO}(\d{{4}})_(\d{{2}})$")
+
+
+def somar_meses(d: date, n: int) -> date:
+    """Primeiro dia do mês ``n`` meses depois (ou antes, se negativo) de ``d``."""
+    total = d.year * 12 + (d.month - 1) + n
+    return date(total // 12, total % 12 + 1, 1)
+
+
+def nome_particao(mes: date) -> str:
+    return f"{PREFIXO_PARTICAO}{mes.year:04d}_{mes.month:02d}"
+
+
+# ================================================================
+#   ESTRUTURA — HISTÓRICO PARTICIONADO POR MÊS DE REFERÊNCIA
+# ================================================================
+def criar_tabela_historico(cur):
+    cur.execute("CREATE SCHEMA IF NOT EXISTS bronze;")
+    cur.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS bronze.fipe_history (
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            ano_modelo VARCHAR(10) NOT NULL,
+            codigo_marca INTEGER NOT NULL,
+            codigo_modelo INTEGER NOT NULL,
+            codigo_ano VARCHAR(20) NOT NULL,
+            valor VARCHAR(30),
+            valor_numeric NUMERIC(12,2),
+            mes_referencia DATE NOT NULL,
+            codigo_fipe VARCHAR(20),
+            carregado_em TIMESTAMP NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia)
+        ) PARTITION BY RANGE (mes_referencia);
+    """)
+    _migrar_historico_sem_tipo(cur)
+
+    # "Último preço por modelo-ano": busca pelo nome e varre os meses do mais
+    # recente para o mais antigo, sem ir ao heap (index-only)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_history_ultimo_preco
+            ON bronze.fipe_history (tipo_veiculo, marca, modelo, ano_modelo, mes_referencia DESC)
+            INCLUDE (valor_numeric);
+    """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_depreciacao (
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            mes_referencia DATE NOT NULL,
+            media_valor NUMERIC(12,2),
+            variacao_media_pct NUMERIC(8,2),
+            qtd_registros INTEGER,
+            PRIMARY KEY (tipo_veiculo, marca, modelo, mes_referencia)
+        );
+    """)
+    _migrar_depreciacao_sem_tipo(cur)
+
+
+def _tem_coluna(cur, schema: str, tabela: str, coluna: str) -> bool:
+    cur.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = %s AND table_name = %s AND column_name = %s;
+    """, (schema, tabela, coluna))
+    return cur.fetchone() is not None
+
+
+def _migrar_historico_sem_tipo(cur):
+    """Histórico de antes do multi-tipo: só motos, PK sem tipo_veiculo (uma vez só)."""
+    if _tem_coluna(cur, "bronze", "fipe_history", "tipo_veiculo"):
+        return
+    cur.execute("ALTER TABLE bronze.fipe_history ADD COLUMN tipo_veiculo VARCHAR(10) NOT NULL DEFAULT 'motos';")
+    cur.execute("ALTER TABLE bronze.fipe_history ALTER COLUMN tipo_veiculo DROP DEFAULT;")
+    cur.execute("ALTER TABLE bronze.fipe_history DROP CONSTRAINT fipe_history_pkey;")
+    cur.execute("""
+        ALTER TABLE bronze.fipe_history
+        ADD PRIMARY KEY (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia);
+    """)
+    # O índice antigo não tinha o tipo na frente
+    cur.execute("DROP INDEX IF EXISTS bronze.idx_history_ultimo_preco;")
+
+
+def _migrar_depreciacao_sem_tipo(cur):
+    if _tem_coluna(cur, "gold", "fipe_depreciacao", "tipo_veiculo"):
+        return
+    cur.execute("ALTER TABLE gold.fipe_depreciacao ADD COLUMN tipo_veiculo VARCHAR(10) NOT NULL DEFAULT 'motos';")
+    cur.execute("ALTER TABLE gold.fipe_depreciacao ALTER COLUMN tipo_veiculo DROP DEFAULT;")
+    cur.execute("ALTER TABLE gold.fipe_depreciacao DROP CONSTRAINT fipe_depreciacao_pkey;")
+    cur.execute("ALTER TABLE gold.fipe_depreciacao ADD PRIMARY KEY (tipo_veiculo, marca, modelo, mes_referencia);")
+
+
+class BronzeHistory:
+    def __init__(self, conn, retencao_meses: int = 24):
+        """
+        Histórico de preços do bronze em bronze.fipe_history, particionado por
+        mês de referência (uma partição por mês, criada sob demanda).
+
+        :param conn: conexão psycopg2 aberta
+        :param retencao_meses: meses mantidos; partições mais antigas são
+            desanexadas e apagadas por ``aplicar_retencao``
+        """
+        self.conn = conn
+        self.retencao_meses = retencao_meses
+
+    def garantir_particao(self, cur, mes: date) -> str:
+        mes = date(mes.year, mes.month, 1)
+        nome = nome_particao(mes)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS bronze.{nome}
+            PARTITION OF bronze.fipe_history
+            FOR VALUES FROM (%s) TO (%s);
+        """, (mes, somar_meses(mes, 1)))
+        return nome
+
+    def particoes(self, cur) -> List[date]:
+        cur.execute("""
+            SELECT c.relname
+            FROM pg_inherits i
+            JOIN pg_class c ON c.oid = i.inhrelid
+            WHERE i.inhparent = 'bronze.fipe_history'::regclass;
+        """)
+        meses = []
+        for (nome,) in cur.fetchall():
+            m = _RE_PARTICAO.match(nome)
+            if m:
+                meses.append(date(int(m.group(1)), int(m.group(2)), 1))
+        return sorted(meses)
+
+    def arquivar(self) -> int:
+        """
+        Copia para o histórico os meses de referência presentes em
+        bronze.fipe_raw, criando as partições que faltarem.
+
+        Returns:
+            int: linhas inseridas ou atualizadas no histórico
+        """
+        cur = self.conn.cursor()
+        criar_tabela_historico(cur)
+
+        cur.execute("""
+            SELECT DISTINCT mes_referencia
+            FROM bronze.fipe_raw
+            WHERE mes_referencia IS NOT NULL;
+        """)
+        meses = [row[0] for row in cur.fetchall()]
+        for mes in meses:
+            self.garantir_particao(cur, mes)
+
+        cur.execute("""
+            INSERT INTO bronze.fipe_history AS h
+            (tipo_veiculo, marca, modelo, ano_modelo, codigo_marca, codigo_modelo, codigo_ano,
+             valor, valor_numeric, mes_referencia, codigo_fipe)
+            SELECT tipo_veiculo, marca, modelo, ano_modelo, codigo_marca, codigo_modelo, codigo_ano,
+                   valor, valor_numeric, mes_referencia, codigo_fipe
+            FROM bronze.fipe_raw
+            WHERE mes_referencia IS NOT NULL
+            ON CONFLICT (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia) DO UPDATE
+            SET marca = EXCLUDED.marca,
+                modelo = EXCLUDED.modelo,
+                valor = EXCLUDED.valor,
+                valor_numeric = EXCLUDED.valor_numeric,
+                codigo_fipe = EXCLUDED.codigo_fipe,
+                carregado_em = NOW()
+            WHERE h.valor_numeric IS DISTINCT FROM EXCLUDED.valor_numeric;
+        """)
+        linhas = cur.rowcount
+
+        self.conn.commit()
+        print(f"HISTÓRICO OK! {linhas} registros arquivados em {len(meses)} mês(es)")
+        return linhas
+
+    def aplicar_retencao(self, hoje: Optional[date] = None) -> List[str]:
+        """Desanexa e apaga as partições mais antigas que a retenção."""
+        hoje = hoje or date.today()
+        limite = somar_meses(date(hoje.year, hoje.month, 1), -self.retencao_meses)
+
+        cur = self.conn.cursor()
+        criar_tabela_historico(cur)
+
+        removidas = []
+        for mes in self.particoes(cur):
+            if mes >= limite:
+                continue
+            nome = nome_particao(mes)
+            cur.execute(f"ALTER TABLE bronze.fipe_history DETACH PARTITION bronze.{nome};")
+            cur.execute(f"DROP TABLE bronze.{nome};")
+            removidas.append(nome)
+
+        self.conn.commit()
+        if removidas:
+            print(f"HISTÓRICO: partições removidas pela retenção: {', '.join(removidas)}")
+        return removidas
+
+    def refresh_depreciacao(self, meses: int = 12, hoje: Optional[date] = None) -> int:
+        """
+        Recalcula gold.fipe_depreciacao para os últimos ``meses`` meses.
+
+        A variação de cada modelo-ano é comparada com o mês imediatamente
+        anterior e depois agregada por (tipo_veiculo, marca, modelo, mês). O filtro constante
+        em mes_referencia faz o Postgres ler apenas as partições do período.
+        """
+        hoje = hoje or date.today()
+        inicio = somar_meses(date(hoje.year, hoje.month, 1), -(meses - 1))
+        params = {"inicio": inicio, "inicio_lag": somar_meses(inicio, -1)}
+
+        cur = self.conn.cursor()
+        try:
+            criar_tabela_historico(cur)
+
+            cur.execute("DELETE FROM gold.fipe_depreciacao WHERE mes_referencia >= %(inicio)s;", params)
+            cur.execute("""
+                INSERT INTO gold.fipe_depreciacao
+                (tipo_veiculo, marca, modelo, mes_referencia, media_valor, variacao_media_pct, qtd_registros)
+                SELECT
+                    tipo_veiculo,
+                    marca,
+                    modelo,
+                    mes_referencia,
+                    AVG(valor_numeric),
+                    AVG(100.0 * (valor_numeric / valor_anterior - 1))
+                        FILTER (WHERE valor_anterior > 0
+                                AND mes_anterior = (mes_referencia - INTERVAL '1 month')::date),
+                    COUNT(*)
+                FROM (
+                    SELECT
+                        tipo_veiculo, marca, modelo, mes_referencia, valor_numeric,
+                        LAG(valor_numeric) OVER w AS valor_anterior,
+                        LAG(mes_referencia) OVER w AS mes_anterior
+                    FROM bronze.fipe_history
+                    WHERE mes_referencia >= %(inicio_lag)s
+                    WINDOW w AS (PARTITION BY tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano ORDER BY mes_referencia)
+                ) precos
+                WHERE mes_referencia >= %(inicio)s
+                GROUP BY tipo_veiculo, marca, modelo, mes_referencia;
+            """, params)
+            linhas = cur.rowcount
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        print(f"GOLD OK! Depreciação mês a mês: {linhas} linhas desde {inicio:%Y-%m}")
+        return linhas
@@ -0,0 +1,366 @@
+# -*- coding: utf-8 -*-
+import io
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import pandas as pd
+from psycopg2.extras import execute_values
+
+from services.fipe_api_client import TIPOS_VEICULO
+from services.normalizacao import SCHEMA_NORMALIZADO, normalizar_registros
+
+COLUNAS_BRONZE = tuple(SCHEMA_NORMALIZADO)
+
+METODOS = ("copy", "values", "row")
+
+# Chave natural de um preço no bronze (inclui a chave de partição)
+CHAVE_BRONZE = ("tipo_veiculo", "codigo_marca", "codigo_modelo", "codigo_ano", "mes_referencia")
+
+# Linha idêntica (mesmo hash_conteudo) não é reescrita nem volta no RETURNING
+_SQL_UPSERT = f"""
+    INSERT INTO bronze.fipe_raw AS b ({", ".join(COLUNAS_BRONZE)})
+    {{origem}}
+    ON CONFLICT ({", ".join(CHAVE_BRONZE)}) DO UPDATE
+    SET marca = EXCLUDED.marca,
+        modelo = EXCLUDED.modelo,
+        valor = EXCLUDED.valor,
+        valor_numeric = EXCLUDED.valor_numeric,
+        codigo_fipe = EXCLUDED.codigo_fipe,
+        hash_conteudo = EXCLUDED.hash_conteudo
+    WHERE b.hash_conteudo IS DISTINCT FROM EXCLUDED.hash_conteudo
+    RETURNING tipo_veiculo, marca, modelo
+"""
+
+# Espelho: remove do bronze as chaves que a carga completa não trouxe
+_SQL_REMOVER_NAO_VISTOS = f"""
+    DELETE FROM bronze.fipe_raw b
+    WHERE NOT EXISTS (
+        SELECT 1 FROM fipe_raw_vistos v
+        WHERE {" AND ".join(f"v.{c} = b.{c}" for c in CHAVE_BRONZE[:-1])}
+          AND v.mes_referencia IS NOT DISTINCT FROM b.mes_referencia
+    )
+    RETURNING tipo_veiculo, marca, modelo
+"""
+
+_COLUNAS_LEGADO = [c for c in COLUNAS_BRONZE if c != "tipo_veiculo"]
+
+
+# ================================================================
+#   ESTRUTURA — BRONZE (PARTICIONADO POR TIPO DE VEÍCULO)
+# ================================================================
+def _bronze_particionada(cur) -> Optional[bool]:
+    """True/False conforme bronze.fipe_raw seja particionada; None se não existir."""
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('bronze.fipe_raw');")
+    row = cur.fetchone()
+    return None if row is None else row[0] == "p"
+
+
+def _migrar_bronze_legado(cur):
+    """
+    Converte a bronze.fipe_raw antiga (só motos, sem partições) na tabela
+    particionada por tipo_veiculo, preservando as linhas.
+    """
+    # Colunas que versões anteriores ainda não tinham
+    cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS mes_referencia DATE;")
+    cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS codigo_fipe VARCHAR(20);")
+    cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS ano INTEGER;")
+    cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS combustivel SMALLINT;")
+    cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS zero_km BOOLEAN NOT NULL DEFAULT FALSE;")
+    cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS hash_conteudo BIGINT;")
+
+    cur.execute("ALTER TABLE bronze.fipe_raw RENAME TO fipe_raw_legado;")
+    _criar_bronze_particionada(cur)
+
+    colunas = ", ".join(_COLUNAS_LEGADO)
+    cur.execute(f"""
+        INSERT INTO bronze.fipe_raw (tipo_veiculo, {colunas})
+        SELECT 'motos', {colunas} FROM bronze.fipe_raw_legado;
+    """)
+    # Leva junto os índices antigos (mesmos nomes dos novos)
+    cur.execute("DROP TABLE bronze.fipe_raw_legado;")
+    print(f"BRONZE: tabela antiga migrada para particionada por tipo_veiculo ({cur.rowcount} linhas)")
+
+
+def _criar_bronze_particionada(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS bronze.fipe_raw (
+            id BIGSERIAL,
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            ano_modelo VARCHAR(10) NOT NULL,
+            codigo_marca INTEGER NOT NULL,
+            codigo_modelo INTEGER NOT NULL,
+            codigo_ano VARCHAR(20) NOT NULL,
+            valor VARCHAR(30),
+            valor_numeric NUMERIC(12,2),
+            mes_referencia DATE,
+            codigo_fipe VARCHAR(20),
+            ano INTEGER,
+            combustivel SMALLINT,
+            zero_km BOOLEAN NOT NULL DEFAULT FALSE,
+            hash_conteudo BIGINT,
+            PRIMARY KEY (tipo_veiculo, id)
+        ) PARTITION BY LIST (tipo_veiculo);
+    """)
+
+    for tipo in TIPOS_VEICULO:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS bronze.fipe_raw_{tipo}
+            PARTITION OF bronze.fipe_raw FOR VALUES IN (%s);
+        """, (tipo,))
+
+
+def _criar_indice_chave(cur):
+    """
+    Índice único da chave natural com NULLS NOT DISTINCT (Postgres 15+):
+    mes_referencia pode vir nulo (mês que não foi possível interpretar) e,
+    sem isso, cada carga inseriria outra cópia da mesma chave em vez de
+    cair no ON CONFLICT.
+    """
+    cur.execute("""
+        SELECT indnullsnotdistinct FROM pg_index
+        WHERE indexrelid = to_regclass('bronze.uq_bronze_chave_mes');
+    """)
+    row = cur.fetchone()
+    if row is not None and row[0]:
+        return
+
+    if row is not None:
+        # Índice antigo: mantém só a cópia mais recente de cada chave sem mês
+        cur.execute(f"""
+            DELETE FROM bronze.fipe_raw b
+            USING bronze.fipe_raw n
+            WHERE b.mes_referencia IS NULL AND n.mes_referencia IS NULL
+              AND {" AND ".join(f"n.{c} = b.{c}" for c in CHAVE_BRONZE[:-1])}
+              AND n.id > b.id;
+        """)
+        print(f"BRONZE: {cur.rowcount} cópias de chaves sem mês de referência removidas")
+        cur.execute("DROP INDEX bronze.uq_bronze_chave_mes;")
+
+    cur.execute(f"""
+        CREATE UNIQUE INDEX uq_bronze_chave_mes
+            ON bronze.fipe_raw({", ".join(CHAVE_BRONZE)}) NULLS NOT DISTINCT;
+    """)
+
+
+def criar_tabela_bronze(cur):
+    cur.execute("CREATE SCHEMA IF NOT EXISTS bronze;")
+
+    particionada = _bronze_particionada(cur)
+    if particionada is None:
+        _criar_bronze_particionada(cur)
+    elif not particionada:
+        _migrar_bronze_legado(cur)
+    else:
+        # Garante as partições de tipos novos e a coluna de hash (linhas
+        # antigas ficam com NULL e são regravadas uma vez no próximo upsert)
+        _criar_bronze_particionada(cur)
+        cur.execute("ALTER TABLE bronze.fipe_raw ADD COLUMN IF NOT EXISTS hash_conteudo BIGINT;")
+
+    _criar_indice_chave(cur)
+
+    # Mesmos índices de src/sql/00_create_schemas_and_tables.sql
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bronze_marca ON bronze.fipe_raw(marca);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bronze_modelo ON bronze.fipe_raw(modelo);")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bronze_valor ON bronze.fipe_raw(valor_numeric);")
+
+
+def linhas_bronze(df: pd.DataFrame) -> List[Tuple]:
+    """Converte o frame normalizado em tuplas de COLUNAS_BRONZE (NaN/NaT → None)."""
+    df = df.astype(object).where(df.notna(), None)
+    df["mes_referencia"] = [m.date() if m is not None else None for m in df["mes_referencia"]]
+    return list(df.itertuples(index=False, name=None))
+
+
+def _lotes(registros: Iterable[Any], tamanho: int) -> Iterator[List[Any]]:
+    lote = []
+    for r in registros:
+        lote.append(r)
+        if len(lote) >= tamanho:
+            yield lote
+            lote = []
+    if lote:
+        yield lote
+
+
+class BronzeLoader:
+    def __init__(self, conn, batch_size: int = 5000, metodo: str = "copy", espelho: bool = False):
+        """
+        Carga em massa na tabela bronze.fipe_raw.
+
+        :param conn: conexão psycopg2 aberta (o commit fica com quem chama)
+        :param batch_size: registros enviados por round trip
+        :param metodo: "copy" (COPY FROM STDIN a partir de um buffer em memória),
+            "values" (execute_values em lotes) ou "row" (um INSERT por registro,
+            mantido apenas para comparação)
+        :param espelho: carga completa sem apagar o bronze antes: grava com
+            upsert (pulando linhas idênticas), guarda as chaves vistas e, em
+            remover_nao_vistos, apaga só as que sumiram
+        """
+        if metodo not in METODOS:
+            raise ValueError(f"metodo deve ser um de {METODOS}")
+        if batch_size < 1:
+            raise ValueError("batch_size deve ser pelo menos 1")
+
+        self.conn = conn
+        self.batch_size = batch_size
+        self.metodo = metodo
+        self.espelho = espelho
+        self.bytes_enviados = 0  # tamanho dos buffers do COPY (métricas)
+        self._staging_criada = False
+        self._vistos_criada = False
+
+    def carregar(self, registros: Iterable[Dict[str, Any]], upsert: bool = False) -> Tuple[int, Set[Tuple[str, str, str]]]:
+        """
+        Envia os registros para o bronze em lotes de ``batch_size``. Cada lote
+        passa antes por ``normalizar_registros`` (parse vetorizado).
+
+        :param upsert: quando True usa ON CONFLICT na chave natural por mês
+            (sempre, no modo espelho)
+        :return: (total de registros enviados, trios (tipo_veiculo, marca, modelo) inseridos
+            ou alterados — só preenchido no upsert)
+        """
+        cur = self.conn.cursor()
+        total = 0
+        alterados = set()
+        upsert = upsert or self.espelho
+
+        for lote in _lotes(registros, self.batch_size):
+            df = normalizar_registros(lote)
+            total += len(df)
+            if self.espelho:
+                self._registrar_vistos(cur, df)
+
+            if self.metodo == "copy":
+                alterados |= self._copy(cur, df, upsert)
+            elif self.metodo == "values":
+                alterados |= self._values(cur, linhas_bronze(df), upsert)
+            else:
+                alterados |= self._row(cur, linhas_bronze(df), upsert)
+
+        return total, alterados
+
+    # ------------------------------------------------------------
+    #   ESPELHO — CHAVES VISTAS NA CARGA COMPLETA
+    # ------------------------------------------------------------
+    def _registrar_vistos(self, cur, df: pd.DataFrame):
+        if not self._vistos_criada:
+            # Temporária da sessão: sobrevive aos commits de cada lote
+            cur.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS fipe_raw_vistos
+                AS SELECT {", ".join(CHAVE_BRONZE)} FROM bronze.fipe_raw WITH NO DATA;
+            """)
+            cur.execute("TRUNCATE fipe_raw_vistos;")
+            self._vistos_criada = True
+
+        buf = io.StringIO()
+        df[list(CHAVE_BRONZE)].to_csv(buf, header=False, index=False, date_format="%Y-%m-%d")
+        buf.seek(0)
+        cur.copy_expert(f"COPY fipe_raw_vistos ({', '.join(CHAVE_BRONZE)}) FROM STDIN WITH (FORMAT csv)", buf)
+
+    def remover_nao_vistos(self) -> Set[Tuple[str, str, str]]:
+        """
+        Fim da carga em modo espelho: apaga do bronze as chaves que não
+        vieram nesta carga (o commit fica com quem chama).
+
+        :return: trios (tipo_veiculo, marca, modelo) que perderam preços
+        """
+        if not self.espelho:
+            raise ValueError("remover_nao_vistos só vale no modo espelho")
+        if not self._vistos_criada:
+            # Nenhum lote: nada foi visto, e um bronze vazio não é o que se quer
+            return set()
+
+        cur = self.conn.cursor()
+        cur.execute("ANALYZE fipe_raw_vistos;")
+        cur.execute(_SQL_REMOVER_NAO_VISTOS)
+        linhas = cur.fetchall()
+        cur.execute("DROP TABLE fipe_raw_vistos;")
+        self._vistos_criada = False
+        print(f"BRONZE: {len(linhas)} preços que não vieram nesta carga removidos")
+        return set(linhas)
+
+    # ------------------------------------------------------------
+    #   COPY FROM STDIN
+    # ------------------------------------------------------------
+    def _buffer_copy(self, df: pd.DataFrame) -> io.StringIO:
+        # CSV em uma chamada só; campo vazio sem aspas = NULL no COPY csv
+        buf = io.StringIO()
+        df.to_csv(buf, header=False, index=False, date_format="%Y-%m-%d")
+        self.bytes_enviados += buf.tell()
+        buf.seek(0)
+        return buf
+
+    def _copy(self, cur, df: pd.DataFrame, upsert: bool) -> Set[Tuple[str, str, str]]:
+        colunas = ", ".join(COLUNAS_BRONZE)
+        buf = self._buffer_copy(df)
+
+        if not upsert:
+            cur.copy_expert(f"COPY bronze.fipe_raw ({colunas}) FROM STDIN WITH (FORMAT csv)", buf)
+            return set()
+
+        # Upsert: COPY para uma tabela temporária e depois um único INSERT ... ON CONFLICT
+        if not self._staging_criada:
+            cur.execute(f"""
+                CREATE TEMP TABLE IF NOT EXISTS fipe_raw_staging
+                AS SELECT {colunas} FROM bronze.fipe_raw WITH NO DATA;
+            """)
+            self._staging_criada = True
+
+        cur.execute("TRUNCATE fipe_raw_staging;")
+        cur.copy_expert(f"COPY fipe_raw_staging ({colunas}) FROM STDIN WITH (FORMAT csv)", buf)
+        # Chave repetida no mesmo lote derrubaria o ON CONFLICT ("cannot affect
+        # row a second time"): fica a última cópia (ctid segue a ordem do COPY)
+        chave = ", ".join(CHAVE_BRONZE)
+        cur.execute(_SQL_UPSERT.format(
+            origem=f"SELECT DISTINCT ON ({chave}) {colunas} FROM fipe_raw_staging ORDER BY {chave}, ctid DESC"
+        ))
+        return set(cur.fetchall())
+
+    # ------------------------------------------------------------
+    #   execute_values (fallback)
+    # ------------------------------------------------------------
+    def _values(self, cur, linhas: List[Tuple], upsert: bool) -> Set[Tuple[str, str, str]]:
+        colunas = ", ".join(COLUNAS_BRONZE)
+
+        if not upsert:
+            execute_values(
+                cur,
+                f"INSERT INTO bronze.fipe_raw ({colunas}) VALUES %s",
+                linhas,
+                page_size=self.batch_size
+            )
+            return set()
+
+        # Mesma regra do COPY: uma linha por chave, a última do lote
+        posicoes = [COLUNAS_BRONZE.index(c) for c in CHAVE_BRONZE]
+        linhas = list({tuple(linha[i] for i in posicoes): linha for linha in linhas}.values())
+        rows = execute_values(
+            cur,
+            _SQL_UPSERT.format(origem="VALUES %s"),
+            linhas,
+            page_size=self.batch_size,
+            fetch=True
+        )
+        return set(rows)
+
+    # ------------------------------------------------------------
+    #   Um INSERT por registro (caminho antigo)
+    # ------------------------------------------------------------
+    def _row(self, cur, linhas: List[Tuple], upsert: bool) -> Set[Tuple[str, str, str]]:
+        alterados = set()
+        marcadores = ",".join(["%s"] * len(COLUNAS_BRONZE))
+
+        for linha in linhas:
+            if upsert:
+                cur.execute(_SQL_UPSERT.format(origem=f"VALUES ({marcadores})"), linha)
+                row = cur.fetchone()
+                if row:
+                    alterados.add(row)
+            else:
+                cur.execute(
+                    f"INSERT INTO bronze.fipe_raw ({', '.join(COLUNAS_BRONZE)}) VALUES ({marcadores})",
+                    linha
+                )
+
+        return alterados
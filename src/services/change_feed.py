@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+import io
+import json
+from itertools import groupby
+from typing import Any, Dict, Iterable, List, Tuple
+
+from services.medallion_refresh import criar_tabelas_medallion
+
+COLUNAS_MUDANCA = (
+    "id", "lote", "operacao", "tipo_veiculo", "marca", "modelo",
+    "media_valor", "qtd_registros", "media_anterior", "qtd_anterior", "registrado_em",
+)
+PREFIXO_PADRAO = "gold/fipe_summary_changes"
+
+
+def criar_tabela_exportados(cur):
+    """
+    Lotes do feed já publicados em cada destino, um a um. Uma marca d'água
+    (último lote) não serve: os lotes saem de uma sequence antes do commit,
+    e com refreshes concorrentes um lote menor pode ser gravado depois de
+    um maior já ter sido publicado.
+    """
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_summary_lotes_exportados (
+            destino TEXT NOT NULL,
+            lote BIGINT NOT NULL,
+            exportado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+            PRIMARY KEY (destino, lote)
+        );
+    """)
+
+    # Migração da marca d'água antiga: tudo até ela já foi publicado
+    cur.execute("SELECT to_regclass('gold.fipe_summary_changes_exportados') IS NOT NULL;")
+    if cur.fetchone()[0]:
+        cur.execute("""
+            INSERT INTO gold.fipe_summary_lotes_exportados (destino, lote)
+            SELECT DISTINCT e.destino, c.lote
+            FROM gold.fipe_summary_changes_exportados e
+            JOIN gold.fipe_summary_changes c ON c.lote <= e.ultimo_lote
+            ON CONFLICT DO NOTHING;
+        """)
+        cur.execute("DROP TABLE gold.fipe_summary_changes_exportados;")
+
+
+def serializar_lote(linhas: Iterable[Tuple]) -> bytes:
+    """
+    Uma mudança por linha (NDJSON). Valores NUMERIC vão como texto
+    ("24510.00") para não perder precisão; datas em ISO 8601.
+    """
+    partes = [
+        json.dumps(dict(zip(COLUNAS_MUDANCA, linha)), ensure_ascii=False, default=str)
+        for linha in linhas
+    ]
+    return ("\n".join(partes) + "\n").encode("utf-8") if partes else b""
+
+
+class ChangeFeedExporter:
+    def __init__(self, conn, minio_client, bucket: str = "fipe", prefixo: str = PREFIXO_PADRAO):
+        """
+        Publica no MinIO os lotes de gold.fipe_summary_changes ainda não
+        enviados, um objeto NDJSON por lote:
+        ``{prefixo}/lote=000000000042.ndjson``.
+
+        Consumidores listam o prefixo e aplicam os lotes que ainda não
+        leram — sem reler o gold inteiro. Um lote pode aparecer depois de
+        outro de número maior (refreshes por marca em paralelo); os dois
+        tocam marcas diferentes, então basta guardar os lotes já aplicados,
+        e não só o maior. Lotes do mesmo modelo saem sempre em ordem.
+
+        :param conn: conexão psycopg2 aberta
+        :param minio_client: instância de minio.Minio
+        :param bucket: bucket de destino
+        :param prefixo: pasta dos objetos (também identifica o destino)
+        """
+        self.conn = conn
+        self.minio_client = minio_client
+        self.bucket = bucket
+        self.prefixo = prefixo.strip("/")
+
+    @property
+    def destino(self) -> str:
+        return f"{self.bucket}/{self.prefixo}"
+
+    def _nome_objeto(self, lote: int) -> str:
+        return f"{self.prefixo}/lote={lote:012d}.ndjson"
+
+    def exportar(self) -> Dict[str, int]:
+        """
+        Envia os lotes ainda não publicados neste destino. Cada lote é
+        marcado como publicado (com commit) logo depois do envio; se a
+        execução cair no meio, o próximo envio sobrescreve o mesmo objeto.
+        Lotes de refreshes ainda sem commit não aparecem e saem no próximo
+        envio.
+
+        Returns:
+            dict: {"lotes": objetos enviados, "mudancas": linhas, "bytes": bytes}
+        """
+        cur = self.conn.cursor()
+        criar_tabelas_medallion(cur)
+        criar_tabela_exportados(cur)
+
+        cur.execute(f"""
+            SELECT {", ".join("c." + coluna for coluna in COLUNAS_MUDANCA)}
+            FROM gold.fipe_summary_changes c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM gold.fipe_summary_lotes_exportados e
+                WHERE e.destino = %s AND e.lote = c.lote
+            )
+            ORDER BY c.lote, c.id;
+        """, (self.destino,))
+        linhas: List[Tuple[Any, ...]] = cur.fetchall()
+
+        resultado = {"lotes": 0, "mudancas": 0, "bytes": 0}
+        for lote, do_lote in groupby(linhas, key=lambda linha: linha[1]):
+            do_lote = list(do_lote)
+            dados = serializar_lote(do_lote)
+            self.minio_client.put_object(
+                self.bucket,
+                self._nome_objeto(lote),
+                io.BytesIO(dados),
+                len(dados),
+                content_type="application/x-ndjson"
+            )
+
+            cur.execute("""
+                INSERT INTO gold.fipe_summary_lotes_exportados (destino, lote)
+                VALUES (%s, %s)
+                ON CONFLICT (destino, lote) DO UPDATE SET exportado_em = NOW();
+            """, (self.destino, lote))
+            self.conn.commit()
+
+            resultado["lotes"] += 1
+            resultado["mudancas"] += len(do_lote)
+            resultado["bytes"] += len(dados)
+
+        self.conn.commit()
+        if resultado["lotes"]:
+            print(f"FEED DE MUDANÇAS: {resultado['lotes']} lote(s), {resultado['mudancas']} mudanças "
+                  f"→ {self.destino}/")
+        else:
+            print("FEED DE MUDANÇAS: nada novo no gold")
+        return resultado
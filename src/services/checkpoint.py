@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Níveis da fronteira do crawl
+NIVEL_MARCA = "marca"
+NIVEL_MODELO = "modelo"
+NIVEL_PRECO = "preco"
+
+PENDENTE = "pendente"
+CONCLUIDO = "concluido"
+FALHA = "falha"
+
+EM_ANDAMENTO = "em_andamento"
+FINALIZADA = "finalizada"
+COM_FALHAS = "com_falhas"
+
+
+def _chave_texto(chave: Iterable[Any]) -> str:
+    return "/".join(str(c) for c in chave)
+
+
+def _chave_tupla(nivel: str, texto: str) -> Tuple:
+    partes = texto.split("/")
+    if nivel == NIVEL_PRECO:
+        return int(partes[0]), int(partes[1]), partes[2]
+    return tuple(int(p) for p in partes)
+
+
+class CrawlCheckpoint:
+    def __init__(self, caminho: str = ".cache/fipe_checkpoint.sqlite"):
+        """
+        Fronteira do crawl (marcas, modelos e preços pendentes, concluídos e
+        com falha) persistida em SQLite, para retomar uma execução interrompida.
+
+        :param caminho: arquivo SQLite do checkpoint
+        """
+        self.caminho = caminho
+        self._lock = threading.Lock()
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS fronteira (
+                nivel TEXT NOT NULL,
+                chave TEXT NOT NULL,
+                status TEXT NOT NULL,
+                tentativas INTEGER NOT NULL DEFAULT 0,
+                contexto TEXT,
+                atualizado_em REAL NOT NULL,
+                PRIMARY KEY (nivel, chave)
+            );
+            CREATE TABLE IF NOT EXISTS execucao (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                status TEXT NOT NULL,
+                iniciada_em REAL NOT NULL
+            );
+        """)
+        self._conn.commit()
+
+    # ------------------------------------------------------------
+    #   CICLO DE VIDA DA EXECUÇÃO
+    # ------------------------------------------------------------
+    def status(self) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM execucao WHERE id = 1").fetchone()
+        return row[0] if row else None
+
+    def em_andamento(self) -> bool:
+        """True se a última execução foi interrompida antes de terminar o crawl."""
+        return self.status() == EM_ANDAMENTO
+
+    def iniciar(self) -> bool:
+        """
+        Começa uma execução. Se a anterior foi interrompida, mantém a fronteira
+        para retomar; caso contrário zera o checkpoint.
+
+        Returns:
+            bool: True se está retomando uma execução interrompida
+        """
+        retomando = self.em_andamento()
+        with self._lock:
+            if not retomando:
+                self._conn.execute("DELETE FROM fronteira")
+            self._conn.execute(
+                "INSERT OR REPLACE INTO execucao (id, status, iniciada_em) VALUES (1, ?, ?)",
+                (EM_ANDAMENTO, time.time())
+            )
+            self._conn.commit()
+        return retomando
+
+    def finalizar(self):
+        """Marca o crawl como terminado (com ou sem falhas pendentes)."""
+        status = COM_FALHAS if self.falhas() else FINALIZADA
+        with self._lock:
+            self._conn.execute("UPDATE execucao SET status = ? WHERE id = 1", (status,))
+            self._conn.commit()
+
+    # ------------------------------------------------------------
+    #   FRONTEIRA
+    # ------------------------------------------------------------
+    def _marcar(self, nivel: str, chaves: Iterable[Iterable[Any]], status: str,
+                contexto: Optional[Dict[str, Any]] = None, tentativa: bool = False):
+        agora = time.time()
+        ctx = json.dumps(contexto, ensure_ascii=False) if contexto is not None else None
+        with self._lock:
+            for chave in chaves:
+                self._conn.execute("""
+                    INSERT INTO fronteira (nivel, chave, status, tentativas, contexto, atualizado_em)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (nivel, chave) DO UPDATE SET
+                        status = excluded.status,
+                        tentativas = fronteira.tentativas + excluded.tentativas,
+                        contexto = COALESCE(excluded.contexto, fronteira.contexto),
+                        atualizado_em = excluded.atualizado_em
+                """, (nivel, _chave_texto(chave), status, int(tentativa), ctx, agora))
+            self._conn.commit()
+
+    def registrar_pendentes(self, nivel: str, chaves: Iterable[Iterable[Any]], contexto: Dict[str, Any]):
+        self._marcar(nivel, chaves, PENDENTE, contexto)
+
+    def registrar_falha(self, nivel: str, chave: Iterable[Any], contexto: Dict[str, Any]):
+        self._marcar(nivel, [chave], FALHA, contexto, tentativa=True)
+
+    def marcar_concluidos(self, nivel: str, chaves: Iterable[Iterable[Any]]):
+        self._marcar(nivel, chaves, CONCLUIDO)
+
+    def concluidos(self, nivel: str = NIVEL_PRECO) -> Set[Tuple]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT chave FROM fronteira WHERE nivel = ? AND status = ?", (nivel, CONCLUIDO)
+            ).fetchall()
+        return {_chave_tupla(nivel, r[0]) for r in rows}
+
+    def falhas(self) -> List[Dict[str, Any]]:
+        """Falhas registradas, na forma {nivel, chave, contexto, tentativas}."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT nivel, chave, contexto, tentativas FROM fronteira WHERE status = ? ORDER BY nivel, chave",
+                (FALHA,)
+            ).fetchall()
+        return [
+            {
+                "nivel": nivel,
+                "chave": _chave_tupla(nivel, chave),
+                "contexto": json.loads(contexto) if contexto else {},
+                "tentativas": tentativas,
+            }
+            for nivel, chave, contexto, tentativas in rows
+        ]
+
+    def resumo(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT status, COUNT(*) FROM fronteira GROUP BY status"
+            ).fetchall()
+        return dict(rows)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,307 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import psycopg2
+
+LARGURA_FAIXA = 5000     # largura (R$) de cada faixa do histograma
+TTL_CONSULTA = 300.0     # segundos; o gold muda no máximo uma vez por execução
+MAX_ENTRADAS_CACHE = 10000
+
+_AUSENTE = object()
+
+# Preço vigente (último mês de referência) de cada chave do bronze, de todas
+# as faixas de preço — o silver só guarda 18k–30k. O DISTINCT ON percorre o
+# índice único uq_bronze_chave_mes.
+_SQL_PRECOS_VIGENTES = """
+    INSERT INTO gold.fipe_precos_vigentes
+        (tipo_veiculo, marca, modelo, ano_modelo, codigo_fipe, valor_numeric, mes_referencia)
+    SELECT DISTINCT ON (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano)
+           tipo_veiculo, marca, modelo, ano_modelo, codigo_fipe, valor_numeric, mes_referencia
+    FROM bronze.fipe_raw
+    WHERE valor_numeric IS NOT NULL
+    ORDER BY tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia DESC NULLS LAST;
+"""
+
+_SQL_FAIXAS = """
+    INSERT INTO gold.fipe_faixas_preco
+        (tipo_veiculo, faixa_inicio, faixa_fim, qtd_precos, qtd_modelos, preco_min, preco_max)
+    SELECT tipo_veiculo,
+           FLOOR(valor_numeric / %(largura)s) * %(largura)s AS faixa_inicio,
+           FLOOR(valor_numeric / %(largura)s) * %(largura)s + %(largura)s AS faixa_fim,
+           COUNT(*),
+           COUNT(DISTINCT (marca, modelo)),
+           MIN(valor_numeric),
+           MAX(valor_numeric)
+    FROM gold.fipe_precos_vigentes
+    GROUP BY tipo_veiculo, 2, 3;
+"""
+
+
+# ================================================================
+#   ESTRUTURA — TABELAS E ÍNDICES DE CONSULTA
+# ================================================================
+def _criar_extensao_trigram(cur) -> bool:
+    """
+    Habilita o pg_trgm (busca por trecho do nome). Sem permissão para criar
+    a extensão a busca continua funcionando, só que sem índice.
+    """
+    cur.execute("SAVEPOINT trgm;")
+    try:
+        cur.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm;")
+    except psycopg2.Error as e:
+        cur.execute("ROLLBACK TO SAVEPOINT trgm;")
+        print(f"⚠ pg_trgm indisponível ({e.pgcode}); busca de modelos sem índice trigram")
+        return False
+    cur.execute("RELEASE SAVEPOINT trgm;")
+    return True
+
+
+def criar_tabelas_consulta(cur):
+    cur.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_precos_vigentes (
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            ano_modelo VARCHAR(10) NOT NULL,
+            codigo_fipe VARCHAR(20),
+            valor_numeric NUMERIC(12,2) NOT NULL,
+            mes_referencia DATE
+        );
+    """)
+    # "Preço de marca X modelo Y ano Z": index-only, sem ir ao heap
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vigentes_chave
+            ON gold.fipe_precos_vigentes (tipo_veiculo, marca, modelo, ano_modelo)
+            INCLUDE (valor_numeric, codigo_fipe, mes_referencia);
+    """)
+    # "Modelos na faixa de preço": varredura de intervalo no valor
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vigentes_valor
+            ON gold.fipe_precos_vigentes (tipo_veiculo, valor_numeric)
+            INCLUDE (marca, modelo, ano_modelo);
+    """)
+    if _criar_extensao_trigram(cur):
+        cur.execute("""
+            CREATE INDEX IF NOT EXISTS idx_vigentes_modelo_trgm
+                ON gold.fipe_precos_vigentes USING gin (modelo gin_trgm_ops);
+        """)
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_faixas_preco (
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            faixa_inicio NUMERIC(12,2) NOT NULL,
+            faixa_fim NUMERIC(12,2) NOT NULL,
+            qtd_precos INTEGER NOT NULL,
+            qtd_modelos INTEGER NOT NULL,
+            preco_min NUMERIC(12,2),
+            preco_max NUMERIC(12,2),
+            PRIMARY KEY (tipo_veiculo, faixa_inicio)
+        );
+    """)
+
+
+def atualizar_tabelas_consulta(conn, largura_faixa: float = LARGURA_FAIXA) -> Tuple[int, int]:
+    """
+    Recalcula os preços vigentes e o histograma de faixas em uma transação.
+    Usa DELETE, e não TRUNCATE (que pega ACCESS EXCLUSIVE e bloquearia as
+    leituras): quem lê continua vendo a versão anterior até o commit. As
+    tabelas são pequenas (uma linha por modelo-ano), e o autovacuum recolhe
+    as linhas antigas.
+
+    Returns:
+        tuple: (preços vigentes, faixas do histograma)
+    """
+    cur = conn.cursor()
+    try:
+        criar_tabelas_consulta(cur)
+
+        cur.execute("DELETE FROM gold.fipe_precos_vigentes;")
+        cur.execute("DELETE FROM gold.fipe_faixas_preco;")
+        cur.execute(_SQL_PRECOS_VIGENTES)
+        precos = cur.rowcount
+        cur.execute(_SQL_FAIXAS, {"largura": largura_faixa})
+        faixas = cur.rowcount
+
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    cur.execute("ANALYZE gold.fipe_precos_vigentes;")
+    cur.execute("ANALYZE gold.fipe_faixas_preco;")
+    conn.commit()
+
+    print(f"CONSULTA OK! {precos} preços vigentes, {faixas} faixas de R$ {largura_faixa:,.0f}")
+    return precos, faixas
+
+
+# ================================================================
+#   CACHE EM MEMÓRIA (LRU + TTL)
+# ================================================================
+class CacheTTL:
+    def __init__(self, max_entradas: int = MAX_ENTRADAS_CACHE, ttl: float = TTL_CONSULTA,
+                 relogio: Callable[[], float] = time.monotonic):
+        """
+        Cache LRU com expiração, seguro entre threads.
+
+        :param max_entradas: acima disso sai a entrada usada há mais tempo
+        :param ttl: segundos até uma entrada expirar
+        :param relogio: fonte de tempo (substituível nos testes)
+        """
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.relogio = relogio
+        self.acertos = 0
+        self.falhas = 0
+        self._dados: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, chave: Hashable, padrao: Any = None) -> Any:
+        """Valor guardado, ou ``padrao`` se não houver (ou tiver expirado)."""
+        with self._lock:
+            item = self._dados.get(chave)
+            if item is None or item[0] <= self.relogio():
+                if item is not None:
+                    del self._dados[chave]
+                self.falhas += 1
+                return padrao
+            self._dados.move_to_end(chave)
+            self.acertos += 1
+            return item[1]
+
+    def put(self, chave: Hashable, valor: Any):
+        with self._lock:
+            self._dados[chave] = (self.relogio() + self.ttl, valor)
+            self._dados.move_to_end(chave)
+            while len(self._dados) > self.max_entradas:
+                self._dados.popitem(last=False)
+
+    def limpar(self):
+        with self._lock:
+            self._dados.clear()
+
+    def __len__(self):
+        return len(self._dados)
+
+
+# ================================================================
+#   API DE LEITURA
+# ================================================================
+class ConsultaFipe:
+    def __init__(self, banco, cache: Optional[CacheTTL] = None):
+        """
+        Consultas de preço para outros serviços, sobre as tabelas de
+        ``atualizar_tabelas_consulta``. Cada consulta pega uma conexão do pool
+        (seguro entre threads) e o resultado fica em cache por ``TTL_CONSULTA``.
+
+        :param banco: DBConnection (pool de conexões)
+        :param cache: CacheTTL; None cria um com os valores padrão
+        """
+        self.banco = banco
+        self.cache = cache if cache is not None else CacheTTL()
+
+    def _consultar(self, chave: Tuple, sql: str, params: Dict[str, Any],
+                   montar: Callable[[List[Tuple]], Any]) -> Any:
+        valor = self.cache.get(chave, _AUSENTE)
+        if valor is not _AUSENTE:
+            return valor
+
+        with self.banco.conexao() as conn:
+            cur = conn.cursor()
+            cur.execute(sql, params)
+            valor = montar(cur.fetchall())
+            conn.rollback()  # só leitura: devolve a conexão sem transação aberta
+
+        self.cache.put(chave, valor)
+        return valor
+
+    def preco(self, marca: str, modelo: str, ano_modelo: str,
+              tipo_veiculo: str = "motos") -> Optional[Dict[str, Any]]:
+        """
+        Preço vigente de um modelo-ano, ou None se não existir. Os nomes são
+        os da API (os mesmos devolvidos por ``buscar_modelos``).
+        """
+        def montar(linhas):
+            if not linhas:
+                return None
+            valor, codigo_fipe, mes = linhas[0]
+            return {"tipo_veiculo": tipo_veiculo, "marca": marca, "modelo": modelo, "ano_modelo": ano_modelo,
+                    "valor": valor, "codigo_fipe": codigo_fipe, "mes_referencia": mes}
+
+        return self._consultar(
+            ("preco", tipo_veiculo, marca, modelo, ano_modelo),
+            """
+            SELECT valor_numeric, codigo_fipe, mes_referencia
+            FROM gold.fipe_precos_vigentes
+            WHERE tipo_veiculo = %(tipo)s AND marca = %(marca)s
+              AND modelo = %(modelo)s AND ano_modelo = %(ano)s
+            LIMIT 1;
+            """,
+            {"tipo": tipo_veiculo, "marca": marca, "modelo": modelo, "ano": ano_modelo},
+            montar
+        )
+
+    def modelos_na_faixa(self, preco_min: float, preco_max: float, tipo_veiculo: str = "motos",
+                         limite: int = 100) -> List[Dict[str, Any]]:
+        """Modelos-ano com preço vigente entre ``preco_min`` e ``preco_max``, do mais barato."""
+        return self._consultar(
+            ("faixa", tipo_veiculo, float(preco_min), float(preco_max), limite),
+            """
+            SELECT marca, modelo, ano_modelo, valor_numeric
+            FROM gold.fipe_precos_vigentes
+            WHERE tipo_veiculo = %(tipo)s
+              AND valor_numeric BETWEEN %(min)s AND %(max)s
+            ORDER BY valor_numeric, marca, modelo, ano_modelo
+            LIMIT %(limite)s;
+            """,
+            {"tipo": tipo_veiculo, "min": preco_min, "max": preco_max, "limite": limite},
+            lambda linhas: [
+                {"marca": m, "modelo": mod, "ano_modelo": a, "valor": v} for m, mod, a, v in linhas
+            ]
+        )
+
+    def buscar_modelos(self, texto: str, tipo_veiculo: Optional[str] = None,
+                       limite: int = 20) -> List[Tuple[str, str, str]]:
+        """
+        Modelos cujo nome contém ``texto`` (sem diferenciar maiúsculas),
+        usando o índice trigram. Retorna (tipo_veiculo, marca, modelo).
+        """
+        return self._consultar(
+            ("busca", texto.upper(), tipo_veiculo, limite),
+            """
+            SELECT DISTINCT tipo_veiculo, marca, modelo
+            FROM gold.fipe_precos_vigentes
+            WHERE modelo ILIKE %(padrao)s
+              AND (%(tipo)s::text IS NULL OR tipo_veiculo = %(tipo)s)
+            ORDER BY tipo_veiculo, marca, modelo
+            LIMIT %(limite)s;
+            """,
+            {"padrao": f"%{_escapar_like(texto)}%", "tipo": tipo_veiculo, "limite": limite},
+            lambda linhas: [tuple(linha) for linha in linhas]
+        )
+
+    def histograma(self, tipo_veiculo: str = "motos") -> List[Dict[str, Any]]:
+        """Faixas de preço pré-calculadas (quantidade de preços e de modelos por faixa)."""
+        return self._consultar(
+            ("histograma", tipo_veiculo),
+            """
+            SELECT faixa_inicio, faixa_fim, qtd_precos, qtd_modelos, preco_min, preco_max
+            FROM gold.fipe_faixas_preco
+            WHERE tipo_veiculo = %(tipo)s
+            ORDER BY faixa_inicio;
+            """,
+            {"tipo": tipo_veiculo},
+            lambda linhas: [
+                {"inicio": i, "fim": f, "precos": qp, "modelos": qm, "min": pmin, "max": pmax}
+                for i, f, qp, qm, pmin, pmax in linhas
+            ]
+        )
+
+
+def _escapar_like(texto: str) -> str:
+    return texto.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
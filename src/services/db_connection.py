@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+from psycopg2.pool import ThreadedConnectionPool
+
+
+class DBConnection:
+    def __init__(self, host, port, dbname, user, password,
+                 minconn=1, maxconn=8, statement_timeout_ms=None,
+                 connect_timeout=10, health_check_after=30.0):
+        """
+        Args:
+            host, port, dbname, user, password: dados de acesso ao Postgres
+            minconn: conexões abertas mantidas no pool
+            maxconn: máximo de conexões simultâneas (uma por worker)
+            statement_timeout_ms: statement_timeout aplicado no servidor a
+                cada conexão (None = sem limite)
+            connect_timeout: tempo limite para abrir uma conexão (s)
+            health_check_after: conexões paradas há mais que isso (s) passam
+                por um SELECT 1 antes de serem entregues
+        """
+        self.host = host
+        self.port = port
+        self.dbname = dbname
+        self.user = user
+        self.password = password
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.statement_timeout_ms = statement_timeout_ms
+        self.connect_timeout = connect_timeout
+        self.health_check_after = health_check_after
+        self.connection = None
+
+        self._pool = None
+        self._pool_lock = threading.Lock()
+        self._ultimo_uso = {}
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """
+        Cria a conexão a partir das variáveis de ambiente (as mesmas do CI):
+        DB_HOST, DB_PORT, DB_NAME, DB_USER, DB_PASS, DB_POOL_MIN, DB_POOL_MAX
+        e DB_STATEMENT_TIMEOUT_MS (0 desliga o limite).
+        """
+        timeout = int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "300000"))
+        params = dict(
+            host=os.getenv("DB_HOST", "localhost"),
+            port=int(os.getenv("DB_PORT", "5432")),
+            dbname=os.getenv("DB_NAME", "fipe_banco"),
+            user=os.getenv("DB_USER", "postgres"),
+            password=os.getenv("DB_PASS", "postgres"),
+            minconn=int(os.getenv("DB_POOL_MIN", "1")),
+            maxconn=int(os.getenv("DB_POOL_MAX", "8")),
+            statement_timeout_ms=timeout or None,
+        )
+        params.update(kwargs)
+        return cls(**params)
+
+    def _parametros(self):
+        params = dict(
+            host=self.host,
+            port=self.port,
+            dbname=self.dbname,
+            user=self.user,
+            password=self.password,
+            connect_timeout=self.connect_timeout
+        )
+        if self.statement_timeout_ms:
+            params["options"] = f"-c statement_timeout={int(self.statement_timeout_ms)}"
+        return params
+
+    def connect(self):
+        try:
+            self.connection = psycopg2.connect(**self._parametros())
+            print(f"Conectado ao banco '{self.dbname}' com sucesso!")
+            return self.connection
+        except Exception as e:
+            print(f"[ERRO] Falha ao conectar: {e}")
+            return None
+
+    def disconnect(self):
+        if self.connection:
+            self.connection.close()
+            print("Conexão encerrada.")
+
+    def get_cursor(self):
+        if self.connection:
+            return self.connection.cursor()
+        return None
+
+    # ================================================================
+    #   POOL DE CONEXÕES
+    # ================================================================
+    def _get_pool(self):
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ThreadedConnectionPool(self.minconn, self.maxconn, **self._parametros())
+                print(f"Pool de conexões aberto para '{self.dbname}' ({self.minconn}–{self.maxconn})")
+            return self._pool
+
+    def _saudavel(self, conn):
+        if conn.closed:
+            return False
+
+        ultimo = self._ultimo_uso.get(id(conn))
+        if ultimo is not None and time.monotonic() - ultimo < self.health_check_after:
+            return True
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    @contextmanager
+    def conexao(self):
+        """
+        Empresta uma conexão do pool (thread-safe) e a devolve ao sair.
+
+        Em caso de exceção a transação aberta é desfeita; conexões quebradas
+        são descartadas em vez de voltarem ao pool.
+
+        Raises:
+            psycopg2.OperationalError: se nem uma conexão nova passar no
+                health check
+        """
+        pool = self._get_pool()
+        conn = pool.getconn()
+        # Depois de um restart do banco todas as conexões paradas no pool
+        # estão mortas: descarta uma a uma até achar uma que responda (a
+        # reposição também é verificada). Esgotado o pool, desiste
+        for descartadas in range(self.maxconn + 1):
+            if self._saudavel(conn):
+                break
+            self._ultimo_uso.pop(id(conn), None)
+            pool.putconn(conn, close=True)
+            if descartadas == self.maxconn:
+                raise psycopg2.OperationalError(
+                    f"nenhuma conexão saudável com '{self.dbname}' após {descartadas + 1} tentativas"
+                )
+            conn = pool.getconn()
+
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                conn.rollback()
+            raise
+        finally:
+            if not conn.closed and conn.get_transaction_status() != extensions.TRANSACTION_STATUS_IDLE:
+                conn.rollback()
+            self._ultimo_uso[id(conn)] = time.monotonic()
+            pool.putconn(conn, close=bool(conn.closed))
+
+    def closeall(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.closeall()
+                self._pool = None
+                self._ultimo_uso.clear()
+                print("Pool de conexões encerrado.")
+
+
+if __name__ == "__main__":
+    # Teste da conexão
+    db = DBConnection.from_env()
+
+    with db.conexao() as conn:
+        # Teste simples
+        cur = conn.cursor()
+        cur.execute("SELECT version();")
+        print(cur.fetchone()[0])
+
+    db.closeall()
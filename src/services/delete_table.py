@@ -1,6 +1,36 @@
 # -*- coding: utf-8 -*-
-import psycopg2
-from src.tests.test_db_connection import DBConnection
+import sys
+
+# Tabelas do medallion, na ordem de limpeza (gold → silver → bronze)
+TABELAS_MEDALLION = [
+    'gold.fipe_summary',
+    'silver.fipe_limited',
+    'bronze.fipe_raw'
+]
+
+# Derivadas das camadas: também são zeradas no reset. O digest, em especial,
+# faria a próxima execução achar que o refresh, os relatórios e o export
+# já estão em dia com um banco que não existe mais
+TABELAS_DERIVADAS = [
+    'gold.fipe_digests',
+    'gold.fipe_precos_vigentes',
+    'gold.fipe_faixas_preco',
+    'gold.fipe_depreciacao',
+    'bronze.fipe_history'
+]
+
+TABELAS_RESET = TABELAS_MEDALLION + TABELAS_DERIVADAS
+
+# O feed de mudanças do gold (gold.fipe_summary_changes e os lotes já
+# exportados) nunca é zerado: quando o gold é apagado, cada modelo vira um
+# 'delete' num lote novo, para os consumidores do feed acompanharem
+_SQL_EXCLUSOES_DO_GOLD = """
+    INSERT INTO gold.fipe_summary_changes
+        (lote, operacao, tipo_veiculo, marca, modelo,
+         media_valor, qtd_registros, media_anterior, qtd_anterior)
+    SELECT %s, 'delete', tipo_veiculo, marca, modelo, NULL, NULL, media_valor, qtd_registros
+    FROM gold.fipe_summary;
+"""
 
 
 class DatabaseCleaner:
@@ -9,10 +39,10 @@ class DatabaseCleaner:
         Inicializa o cleaner com uma conexão de banco de dados
 
         Args:
-            db_connection: Instância da classe DBConnection
+            db_connection: Instância da classe DBConnection (o pool dela é
+                compartilhado com o restante do pipeline)
         """
         self.db_connection = db_connection
-        self.conn = None
 
     def check_and_clean_database(self):
         """
@@ -22,65 +52,57 @@ class DatabaseCleaner:
             bool: True se dados foram limpos, False se não havia dados
         """
         try:
-            # Conecta ao banco
-            self.conn = self.db_connection.connect()
-            if not self.conn:
-                print("ERRO: Não foi possível conectar ao banco de dados!")
-                return False
-
-            cur = self.conn.cursor()
-
-            # Verifica se há dados nas tabelas bronze, silver e gold
-            tabelas_para_verificar = [
-                'bronze.fipe_raw',
-                'silver.fipe_limited',
-                'gold.fipe_summary'
-            ]
-
-            dados_encontrados = False
-
-            for tabela in tabelas_para_verificar:
-                # Verifica se a tabela existe
-                cur.execute("""
-                    SELECT EXISTS (
-                        SELECT FROM information_schema.tables 
-                        WHERE table_schema || '.' || table_name = %s
-                    );
-                """, (tabela,))
-
-                tabela_existe = cur.fetchone()[0]
-
-                if tabela_existe:
-                    # Conta registros na tabela
-                    schema, nome_tabela = tabela.split('.')
-                    cur.execute(f"SELECT COUNT(*) FROM {schema}.{nome_tabela};")
-                    count = cur.fetchone()[0]
-
-                    if count > 0:
-                        dados_encontrados = True
-                        print(f"✓ Tabela {tabela}: {count} registros encontrados")
+            with self.db_connection.conexao() as conn:
+                cur = conn.cursor()
+
+                # Verifica se há dados nas tabelas bronze, silver e gold
+                tabelas_para_verificar = [
+                    'bronze.fipe_raw',
+                    'silver.fipe_limited',
+                    'gold.fipe_summary'
+                ]
+
+                dados_encontrados = False
+
+                for tabela in tabelas_para_verificar:
+                    # Verifica se a tabela existe
+                    cur.execute("""
+                        SELECT EXISTS (
+                            SELECT FROM information_schema.tables 
+                            WHERE table_schema || '.' || table_name = %s
+                        );
+                    """, (tabela,))
+
+                    tabela_existe = cur.fetchone()[0]
+
+                    if tabela_existe:
+                        # Conta registros na tabela
+                        schema, nome_tabela = tabela.split('.')
+                        cur.execute(f"SELECT COUNT(*) FROM {schema}.{nome_tabela};")
+                        count = cur.fetchone()[0]
+
+                        if count > 0:
+                            dados_encontrados = True
+                            print(f"✓ Tabela {tabela}: {count} registros encontrados")
+                        else:
+                            print(f"✓ Tabela {tabela}: vazia")
                     else:
-                        print(f"✓ Tabela {tabela}: vazia")
+                        print(f"⚠ Tabela {tabela}: não existe ainda")
+
+                # Se encontrou dados, limpa todas as tabelas
+                if dados_encontrados:
+                    print("\nDados encontrados no banco. Limpando todas as tabelas...")
+                    self._limpar_todas_tabelas(cur)
+                    conn.commit()
+                    print("Banco de dados limpo com sucesso!")
+                    return True
                 else:
-                    print(f"⚠ Tabela {tabela}: não existe ainda")
-
-            # Se encontrou dados, limpa todas as tabelas
-            if dados_encontrados:
-                print("\nDados encontrados no banco. Limpando todas as tabelas...")
-                self._limpar_todas_tabelas(cur)
-                print("Banco de dados limpo com sucesso!")
-                return True
-            else:
-                print("\nBanco de dados está vazio. Pronto para inserir novos dados.")
-                return False
+                    print("\nBanco de dados está vazio. Pronto para inserir novos dados.")
+                    return False
 
         except Exception as e:
             print(f"ERRO ao verificar/limpar banco: {e}")
             return False
-        finally:
-            if self.conn:
-                self.conn.commit()
-                self.conn.close()
 
     def _limpar_todas_tabelas(self, cursor):
         """
@@ -90,13 +112,7 @@ class DatabaseCleaner:
             cursor: Cursor do banco de dados
         """
         # Ordem correta para limpeza (devido a foreign keys se houver)
-        tabelas_para_limpar = [
-            'gold.fipe_summary',
-            'silver.fipe_limited',
-            'bronze.fipe_raw'
-        ]
-
-        for tabela in tabelas_para_limpar:
+        for tabela in TABELAS_RESET:
             try:
                 # Verifica se a tabela existe antes de tentar limpar
                 schema, nome_tabela = tabela.split('.')
@@ -108,6 +124,8 @@ class DatabaseCleaner:
                 """, (schema, nome_tabela))
 
                 if cursor.fetchone()[0]:
+                    if tabela == 'gold.fipe_summary':
+                        self._registrar_exclusoes_do_gold(cursor)
                     cursor.execute(f"DELETE FROM {tabela};")
                     print(f"  - Tabela {tabela}: limpa")
                 else:
@@ -116,6 +134,95 @@ class DatabaseCleaner:
             except Exception as e:
                 print(f"  ⚠ Aviso ao limpar {tabela}: {e}")
 
+    def _registrar_exclusoes_do_gold(self, cursor):
+        """
+        Antes de apagar o gold: grava um 'delete' por modelo no feed de
+        mudanças, num lote novo. Sem o feed (ainda não criado), nada a fazer.
+
+        Returns:
+            int: lote usado, ou None sem feed
+        """
+        cursor.execute("SELECT to_regclass('gold.fipe_summary_changes') IS NOT NULL;")
+        if not cursor.fetchone()[0]:
+            return None
+        # Nenhum refresh grava no gold entre o INSERT e a limpeza
+        cursor.execute("LOCK TABLE gold.fipe_summary IN ACCESS EXCLUSIVE MODE;")
+        cursor.execute("SELECT nextval('gold.fipe_summary_lote_seq');")
+        lote = cursor.fetchone()[0]
+        cursor.execute(_SQL_EXCLUSOES_DO_GOLD, (lote,))
+        print(f"  - Feed: {cursor.rowcount} exclusões do gold registradas no lote {lote}")
+        return lote
+
+    def inspecionar(self, cursor):
+        """
+        Consulta o catálogo uma única vez: existência (to_regclass) e linhas
+        estimadas (pg_class.reltuples) de todas as tabelas do reset
+        (medallion e derivadas), sem varrer nenhuma delas.
+
+        Returns:
+            list: dicts {tabela, existe, linhas_estimadas}; linhas_estimadas é
+                None quando a tabela ainda não foi analisada
+        """
+        cursor.execute("""
+            SELECT t.nome, c.oid IS NOT NULL, c.reltuples::bigint
+            FROM unnest(%s::text[]) WITH ORDINALITY AS t(nome, ordem)
+            LEFT JOIN pg_class c ON c.oid = to_regclass(t.nome)
+            ORDER BY t.ordem;
+        """, (TABELAS_RESET,))
+
+        return [
+            {
+                "tabela": nome,
+                "existe": existe,
+                "linhas_estimadas": estimativa if estimativa is not None and estimativa >= 0 else None
+            }
+            for nome, existe, estimativa in cursor.fetchall()
+        ]
+
+    def reset_rapido(self, dry_run=False, manter=()):
+        """
+        Zera as tabelas do medallion e as derivadas delas (digests, tabelas
+        de consulta, histórico e depreciação) com um único
+        TRUNCATE ... RESTART IDENTITY (tempo constante, sem DELETE linha a
+        linha e sem inchar o heap). Se o gold for zerado, cada modelo dele
+        entra antes como 'delete' no feed de mudanças, na mesma transação.
+
+        Args:
+            dry_run: apenas mostra o que seria limpo, sem alterar nada
+            manter: tabelas preservadas (ex.: o gold, que o refresh atualiza
+                por diferença para manter ids e o feed de mudanças)
+
+        Returns:
+            list: relatório de inspecionar() antes da limpeza
+        """
+        with self.db_connection.conexao() as conn:
+            cur = conn.cursor()
+            relatorio = self.inspecionar(cur)
+
+            for item in relatorio:
+                if not item["existe"]:
+                    print(f"⚠ Tabela {item['tabela']}: não existe ainda")
+                elif item["linhas_estimadas"] is None:
+                    print(f"✓ Tabela {item['tabela']}: ~? registros (sem estatísticas)")
+                else:
+                    print(f"✓ Tabela {item['tabela']}: ~{item['linhas_estimadas']} registros (estimativa)")
+
+            existentes = [item["tabela"] for item in relatorio if item["existe"] and item["tabela"] not in manter]
+
+            if dry_run:
+                if 'gold.fipe_summary' in existentes:
+                    print("\n[DRY-RUN] Os modelos do gold seriam registrados como 'delete' no feed")
+                print(f"\n[DRY-RUN] Seria executado: TRUNCATE {', '.join(existentes) or '(nada)'} RESTART IDENTITY")
+                return relatorio
+
+            if 'gold.fipe_summary' in existentes:
+                self._registrar_exclusoes_do_gold(cur)
+            if existentes:
+                cur.execute(f"TRUNCATE {', '.join(existentes)} RESTART IDENTITY;")
+            conn.commit()
+            print(f"\n{len(existentes)} tabelas zeradas com TRUNCATE.")
+            return relatorio
+
     def clean_all_tables_force(self):
         """
         Limpa todas as tabelas sem verificar se há dados (forçado)
@@ -124,33 +231,20 @@ class DatabaseCleaner:
             bool: True se sucesso, False se erro
         """
         try:
-            self.conn = self.db_connection.connect()
-            if not self.conn:
-                return False
-
-            cur = self.conn.cursor()
-            self._limpar_todas_tabelas(cur)
-            self.conn.commit()
-            print("Todas as tabelas foram limpas (forçado)")
-            return True
+            with self.db_connection.conexao() as conn:
+                cur = conn.cursor()
+                self._limpar_todas_tabelas(cur)
+                conn.commit()
+                print("Todas as tabelas foram limpas (forçado)")
+                return True
 
         except Exception as e:
             print(f"ERRO ao limpar tabelas: {e}")
             return False
-        finally:
-            if self.conn:
-                self.conn.close()
 
 
 if __name__ == "__main__":
-    # Teste da classe
-    print("=== TESTE DatabaseCleaner ===\n")
-
-    # Criar conexão
-    db = DBConnection("localhost", 5432, "api_fipe", "postgres", "postgres")
-
-    # Criar cleaner
-    cleaner = DatabaseCleaner(db)
+    # Mesmo que ``fipe reset`` (ex.: --dry-run, --keep-gold)
+    from fipe_cli import main as fipe_main
 
-    # Testar verificação e limpeza
-    cleaner.check_and_clean_database()
\ No newline at end of file
+    sys.exit(fipe_main(["reset", *sys.argv[1:]]))
\ No newline at end of file
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+import hashlib
+from typing import Dict, Iterable, Optional, Tuple
+
+# Tabela → colunas de conteúdo (sem ids nem datas de carga). O bronze já
+# guarda o hash de cada linha (hash_conteudo, calculado na normalização).
+TABELAS_DIGEST = {
+    "bronze.fipe_raw": None,
+    "silver.fipe_limited": ("tipo_veiculo", "marca", "modelo", "ano_modelo", "valor_numeric"),
+    "gold.fipe_summary": ("tipo_veiculo", "marca", "modelo", "media_valor", "qtd_registros"),
+}
+PREFIXO_ETAPA = "etapa:"
+
+
+def criar_tabela_digest(cur):
+    """
+    Digest atual de cada tabela e o digest de entrada com que cada etapa
+    (refresh, relatórios, export) rodou pela última vez.
+    """
+    cur.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_digests (
+            nome TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            linhas BIGINT,
+            atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """)
+
+
+def _gravar(cur, nome: str, digest: str, linhas: Optional[int] = None):
+    cur.execute("""
+        INSERT INTO gold.fipe_digests (nome, digest, linhas)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (nome) DO UPDATE
+        SET digest = EXCLUDED.digest, linhas = EXCLUDED.linhas, atualizado_em = NOW();
+    """, (nome, digest, linhas))
+
+
+def digest_tabela(cur, tabela: str) -> Tuple[str, int]:
+    """
+    Digest do conteúdo da tabela, independente da ordem e dos ids:
+    quantidade de linhas + soma dos hashes de 64 bits das linhas. Lê só a
+    tabela (o bronze, só a coluna de hash); nada é ordenado nem reescrito.
+
+    :return: (digest, linhas); ("vazia", 0) se a tabela não existir
+    """
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (tabela,))
+    if not cur.fetchone()[0]:
+        return "vazia", 0
+
+    colunas = TABELAS_DIGEST[tabela]
+    if colunas is None:
+        cur.execute("""
+            SELECT EXISTS (SELECT 1 FROM pg_attribute
+                           WHERE attrelid = to_regclass(%s) AND attname = 'hash_conteudo');
+        """, (tabela,))
+        if not cur.fetchone()[0]:
+            # Bronze de antes do hash (o loader ainda não rodou nesta versão)
+            cur.execute(f"SELECT COUNT(*) FROM {tabela};")
+            linhas = cur.fetchone()[0]
+            return f"sem-hash:{linhas}", linhas
+
+    expr = "hash_conteudo" if colunas is None else f"hashtextextended(ROW({', '.join(colunas)})::text, 0)"
+    cur.execute(f"SELECT COUNT(*), COALESCE(SUM({expr}), 0) FROM {tabela};")
+    linhas, soma = cur.fetchone()
+    return f"{linhas}:{soma}", linhas
+
+
+def atualizar_digests(conn, tabelas: Iterable[str] = tuple(TABELAS_DIGEST)) -> Dict[str, str]:
+    """Recalcula e grava em gold.fipe_digests o digest das tabelas pedidas."""
+    cur = conn.cursor()
+    criar_tabela_digest(cur)
+
+    digests = {}
+    for tabela in tabelas:
+        digests[tabela], linhas = digest_tabela(cur, tabela)
+        _gravar(cur, tabela, digests[tabela], linhas)
+    conn.commit()
+    return digests
+
+
+def combinar(*partes: str) -> str:
+    """Um digest só para várias entradas (ex.: as três camadas + a faixa do silver)."""
+    return hashlib.sha256("|".join(partes).encode("utf-8")).hexdigest()
+
+
+def ultimo_processado(conn, etapa: str) -> Optional[str]:
+    """Digest de entrada da última execução bem-sucedida da etapa (None se nunca rodou)."""
+    cur = conn.cursor()
+    criar_tabela_digest(cur)
+    cur.execute("SELECT digest FROM gold.fipe_digests WHERE nome = %s;", (PREFIXO_ETAPA + etapa,))
+    row = cur.fetchone()
+    conn.commit()
+    return row[0] if row else None
+
+
+def marcar_processado(conn, etapa: str, digest: str):
+    """Registra que a etapa terminou com esta entrada; chame só depois do sucesso."""
+    cur = conn.cursor()
+    criar_tabela_digest(cur)
+    _gravar(cur, PREFIXO_ETAPA + etapa, digest)
+    conn.commit()
@@ -22,16 +22,30 @@ class MinioUploader:
         # ===============================
         # CAMINHOS DOS ARQUIVOS
         # ===============================
+        # As tabelas vão como Parquet (services.parquet_export); aqui ficam
+        # os relatórios gerados por services.report_renderer
         self.arquivos = {
-            "silver/sample_data.csv": "src/datasets/sample_data.csv",
-            "gold/sample_data.csv": "src/docs/sample_data.csv"
+            "relatorios/top10_silver.csv": "relatorios/top10_silver.csv"
         }
 
-    def upload(self):
+    def upload(self, arquivos=None):
+        """
+        Envia os arquivos para o MinIO.
+
+        Args:
+            arquivos: dict destino → caminho local; None envia ``self.arquivos``.
+                Com o cache de relatórios, só os artefatos alterados são passados
+        """
         # ===============================
         # UPLOAD
         # ===============================
-        for destino, origem in self.arquivos.items():
+        if arquivos is None:
+            arquivos = self.arquivos
+
+        if not arquivos:
+            print("Nenhum relatório alterado para enviar")
+
+        for destino, origem in arquivos.items():
             if not os.path.exists(origem):
                 print(f"Arquivo não encontrado: {origem}")
                 continue
@@ -1,40 +1,227 @@
+import random
 import requests
+import threading
 import time
-from typing import List, Dict, Optional, Any
+from bisect import bisect_left
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, List, Dict, Optional, Any, Iterable, Iterator, Callable, Tuple
+from requests.adapters import HTTPAdapter
 
-BASE_URL = "https://parallelum.com.br/fipe/api/v1/motos"
+from services.rate_limiter import TokenBucket
+from services.response_cache import ResponseCache
+from services.checkpoint import CrawlCheckpoint, NIVEL_MARCA, NIVEL_MODELO, NIVEL_PRECO
+from services.registro import RegistroFipe
+
+if TYPE_CHECKING:
+    from services.selecao import SelecaoCrawl
+
+BASE_URL_RAIZ = "https://parallelum.com.br/fipe/api/v1"
+TIPOS_VEICULO = ("carros", "motos", "caminhoes")
+BASE_URL = f"{BASE_URL_RAIZ}/motos"
+
+MESES = {
+    "janeiro": 1, "fevereiro": 2, "março": 3, "abril": 4, "maio": 5, "junho": 6,
+    "julho": 7, "agosto": 8, "setembro": 9, "outubro": 10, "novembro": 11, "dezembro": 12,
+}
+
+# Chave natural de um preço: (codigo_marca, codigo_modelo, codigo_ano)
+ChavePreco = Tuple[int, int, str]
+
+# Status que não adianta repetir (falha imediata)
+STATUS_SEM_RETRY = {404}
+# Status em que o servidor pode mandar Retry-After
+STATUS_RETRY_AFTER = {429, 503}
+
+
+# Limites (s) dos buckets do histograma de latência por endpoint
+BUCKETS_LATENCIA = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class EstatisticasHttp:
+    def __init__(self):
+        """Contadores de latência e retries por endpoint, seguros entre threads."""
+        self._lock = threading.Lock()
+        self._dados: Dict[str, Dict[str, float]] = {}
+
+    def registrar(self, endpoint: str, latencia: Optional[float] = None,
+                  retry: bool = False, erro: bool = False):
+        with self._lock:
+            d = self._dados.setdefault(endpoint, {
+                "requisicoes": 0, "retries": 0, "erros": 0,
+                "latencia_total": 0.0, "latencia_max": 0.0,
+                "histograma": [0] * (len(BUCKETS_LATENCIA) + 1),
+            })
+            if latencia is not None:
+                d["requisicoes"] += 1
+                d["latencia_total"] += latencia
+                d["latencia_max"] = max(d["latencia_max"], latencia)
+                d["histograma"][bisect_left(BUCKETS_LATENCIA, latencia)] += 1
+            if retry:
+                d["retries"] += 1
+            if erro:
+                d["erros"] += 1
+
+    def resumo(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Por endpoint: requisições, retries, erros, latência total/média/máxima
+        (s) e o histograma (contagem por bucket de BUCKETS_LATENCIA; a última
+        posição conta o que passou do maior limite).
+        """
+        with self._lock:
+            return {
+                endpoint: {
+                    "requisicoes": d["requisicoes"],
+                    "retries": d["retries"],
+                    "erros": d["erros"],
+                    "latencia_total": d["latencia_total"],
+                    "latencia_media": d["latencia_total"] / d["requisicoes"] if d["requisicoes"] else 0.0,
+                    "latencia_max": d["latencia_max"],
+                    "histograma": list(d["histograma"]),
+                }
+                for endpoint, d in self._dados.items()
+            }
+
+
+def _retry_after(valor: Optional[str]) -> Optional[float]:
+    """Segundos indicados no header Retry-After (número ou data HTTP)."""
+    if not valor:
+        return None
+    try:
+        return max(0.0, float(valor))
+    except ValueError:
+        pass
+    try:
+        quando = parsedate_to_datetime(valor)
+        return max(0.0, (quando - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return None
 
 
 class FipeApiClient:
-    def __init__(self, retries: int = 3, timeout: int = 10, delay: float = 0.8):
+    def __init__(self, retries: int = 3, timeout: int = 10, delay: float = 0.8,
+                 rate_limiter: Optional[TokenBucket] = None,
+                 cache: Optional[ResponseCache] = None,
+                 pool_size: int = 10, backoff_max: float = 30.0,
+                 base_url: str = BASE_URL_RAIZ, tipo_veiculo: str = "motos",
+                 estatisticas: Optional[EstatisticasHttp] = None):
         """
         :param retries: número de tentativas caso a API falhe
         :param timeout: tempo limite por requisição
-        :param delay: tempo de espera entre cada requisição (evita bloqueio)
+        :param delay: tempo de espera entre cada requisição (evita bloqueio) e
+            base do backoff exponencial entre tentativas
+        :param rate_limiter: limitador global compartilhado; quando informado,
+            substitui o delay fixo após cada requisição bem-sucedida
+        :param cache: cache em disco para os endpoints de catálogo
+            (marcas, modelos, anos); preços nunca são cacheados. Se a API
+            falhar em todas as tentativas, uma entrada vencida é devolvida
+        :param pool_size: conexões keep-alive mantidas com a API (use pelo
+            menos o número de workers do crawl)
+        :param backoff_max: espera máxima entre tentativas, em segundos
+            (inclusive a pedida pelo Retry-After)
+        :param base_url: raiz da API, sem o tipo de veículo (ex.: o servidor
+            local dos benchmarks)
+        :param tipo_veiculo: "carros", "motos" ou "caminhoes"
+        :param estatisticas: contadores HTTP compartilhados entre clientes
+            (um por tipo de veículo); None cria um próprio
         """
+        if tipo_veiculo not in TIPOS_VEICULO:
+            raise ValueError(f"tipo_veiculo deve ser um de {TIPOS_VEICULO}")
+
         self.retries = retries
         self.timeout = timeout
         self.delay = delay
+        self.rate_limiter = rate_limiter
+        self.cache = cache
+        self.backoff_max = backoff_max
+        self.tipo_veiculo = tipo_veiculo
+        self.base_url = f"{base_url.rstrip('/')}/{tipo_veiculo}"
+        self.estatisticas = estatisticas or EstatisticasHttp()
+
+        # Sessão com pool de conexões: reaproveita TCP+TLS entre requisições
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def _backoff(self, attempt: int) -> float:
+        """Backoff exponencial com jitter completo."""
+        return random.uniform(0, min(self.backoff_max, self.delay * 2 ** (attempt - 1)))
 
     # =======================================================
     #   MÉTODO INTERNO PARA CHAMAR A API COM RETRY
     # =======================================================
-    def _get(self, url: str) -> Optional[Any]:
+    def _get(self, url: str, endpoint: Optional[str] = None) -> Optional[Any]:
+        usar_cache = self.cache is not None and self.cache.cacheavel(endpoint)
+        entrada = self.cache.get(url) if usar_cache else None
+        headers = {}
+
+        if entrada:
+            if entrada["fresca"]:
+                return entrada["dados"]
+
+            # Entrada expirada → revalidação condicional
+            if entrada["etag"]:
+                headers["If-None-Match"] = entrada["etag"]
+            if entrada["last_modified"]:
+                headers["If-Modified-Since"] = entrada["last_modified"]
+
+        endpoint = endpoint or "outros"
+
         for attempt in range(1, self.retries + 1):
+            if attempt > 1:
+                self.estatisticas.registrar(endpoint, retry=True)
+
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+
+            espera = None
             try:
-                resp = requests.get(url, timeout=self.timeout)
+                inicio = time.perf_counter()
+                resp = self.session.get(url, timeout=self.timeout, headers=headers)
+                self.estatisticas.registrar(endpoint, latencia=time.perf_counter() - inicio)
+
+                if resp.status_code == 304 and entrada:
+                    self.cache.renovar(url)
+                    return entrada["dados"]
 
                 if resp.status_code == 200:
-                    time.sleep(self.delay)  # Delay entre requisições
-                    return resp.json()
-                else:
-                    print(f"[FIPE] status {resp.status_code} para URL {url}")
+                    if not self.rate_limiter:
+                        time.sleep(self.delay)  # Delay entre requisições
+                    dados = resp.json()
+                    if usar_cache:
+                        self.cache.put(
+                            url, endpoint, dados,
+                            etag=resp.headers.get("ETag"),
+                            last_modified=resp.headers.get("Last-Modified")
+                        )
+                    return dados
+
+                print(f"[FIPE] status {resp.status_code} para URL {url}")
+
+                if resp.status_code in STATUS_SEM_RETRY:
+                    self.estatisticas.registrar(endpoint, erro=True)
+                    return None
+
+                if resp.status_code in STATUS_RETRY_AFTER:
+                    espera = _retry_after(resp.headers.get("Retry-After"))
+                    if espera is not None:
+                        # Retry-After de horas travaria o worker: vale o teto do backoff
+                        espera = min(espera, self.backoff_max)
 
             except Exception as e:
                 print(f"[FIPE] ERRO {e} para URL {url}")
 
-            time.sleep(self.delay)
+            if attempt < self.retries:
+                time.sleep(espera if espera is not None else self._backoff(attempt))
 
+        self.estatisticas.registrar(endpoint, erro=True)
+        if entrada:
+            # Catálogo vencido ainda é melhor que nenhum: a revalidação fica para a próxima
+            print(f"[FIPE] Falha após {self.retries} tentativas, usando o cache vencido → {url}")
+            return entrada["dados"]
         print(f"[FIPE] Falha após {self.retries} tentativas → {url}")
         return None
 
@@ -42,23 +229,222 @@ class FipeApiClient:
     #   ENDPOINTS DA API
     # =======================================================
     def get_marcas(self) -> List[Dict[str, Any]]:
-        """Retorna lista de todas as marcas de motos."""
-        return self._get(f"{BASE_URL}/marcas") or []
+        """Retorna lista de todas as marcas do tipo de veículo do cliente."""
+        return self._get(f"{self.base_url}/marcas", "marcas") or []
 
     def get_modelos(self, marca_codigo: str) -> List[Dict[str, Any]]:
         """Retorna lista de modelos de uma marca."""
-        data = self._get(f"{BASE_URL}/marcas/{marca_codigo}/modelos")
+        data = self._get(f"{self.base_url}/marcas/{marca_codigo}/modelos", "modelos")
         if not data:
             return []
         return data.get("modelos", [])
 
     def get_anos(self, marca_codigo: str, modelo_codigo: str) -> List[Dict[str, Any]]:
         """Retorna lista dos anos disponíveis para um modelo."""
-        return self._get(f"{BASE_URL}/marcas/{marca_codigo}/modelos/{modelo_codigo}/anos") or []
+        return self._get(f"{self.base_url}/marcas/{marca_codigo}/modelos/{modelo_codigo}/anos", "anos") or []
 
     def get_preco(self, marca_codigo: str, modelo_codigo: str, ano_codigo: str) -> Optional[Dict[str, Any]]:
         """Retorna o preço FIPE de um modelo/ano específico."""
-        return self._get(f"{BASE_URL}/marcas/{marca_codigo}/modelos/{modelo_codigo}/anos/{ano_codigo}")
+        return self._get(f"{self.base_url}/marcas/{marca_codigo}/modelos/{modelo_codigo}/anos/{ano_codigo}", "preco")
+
+    # =======================================================
+    #   CRAWL CONCORRENTE (marcas → modelos → anos → preço)
+    # =======================================================
+    def crawl(self, marcas_desejadas: Optional[Iterable[str]] = None,
+              max_modelos: Optional[int] = 10,
+              max_workers: int = 4,
+              pular: Optional[Callable[[ChavePreco], bool]] = None,
+              checkpoint: Optional[CrawlCheckpoint] = None,
+              selecao: Optional["SelecaoCrawl"] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Percorre a árvore da API disparando as requisições em paralelo.
+
+        A concorrência é limitada por ``max_workers``; o ritmo global fica a
+        cargo do ``rate_limiter`` compartilhado. Os modelos de cada marca são
+        processados em lotes do tamanho que ainda falta para ``max_modelos``,
+        então apenas modelos com preço contam para o limite.
+
+        :param marcas_desejadas: nomes das marcas (maiúsculas); None = todas
+        :param max_modelos: limite de modelos com preço por marca; None = todos
+        :param max_workers: número máximo de requisições simultâneas
+        :param pular: função que recebe a chave do preço e indica se ele já foi
+            ingerido; nesse caso o endpoint de preço não é chamado, mas o
+            modelo continua contando para ``max_modelos``
+        :param checkpoint: fronteira persistente onde ficam registrados os
+            preços pendentes e as falhas de marca, modelo e preço
+        :param selecao: services.selecao.SelecaoCrawl; quando informada,
+            substitui ``marcas_desejadas``/``max_modelos`` e poda a árvore
+            (modelos por regex/shard antes dos anos, anos antes dos preços).
+            Com shards, o limite é a parte do shard (SelecaoCrawl.max_modelos_do_shard),
+            contada só entre os modelos dele: somando os N shards, cada marca
+            fica com até ``selecao.max_modelos`` modelos
+        :return: gerador de registros prontos para a camada bronze
+        """
+        if selecao is not None:
+            desejadas = selecao.marcas
+            max_modelos = selecao.max_modelos_do_shard
+        else:
+            desejadas = {n.upper() for n in marcas_desejadas} if marcas_desejadas else None
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for m in self.get_marcas():
+                nome = m["nome"].upper()
+                if desejadas is not None and nome not in desejadas:
+                    continue
+
+                print(f"\n{'=' * 40}")
+                print(f"MARCA: {nome} ({self.tipo_veiculo})")
+                print(f"{'=' * 40}")
+
+                modelos = self._modelos_da_marca(nome, m, checkpoint)
+                if selecao is not None:
+                    modelos = [mod for mod in modelos if selecao.aceita_modelo(m["codigo"], mod)]
+                modelos_coletados = 0
+                pos = 0
+
+                while pos < len(modelos):
+                    if max_modelos is not None and modelos_coletados >= max_modelos:
+                        print(f"Limite de {modelos_coletados} modelos atingido para {nome}.")
+                        break
+
+                    tamanho = len(modelos) if max_modelos is None else max_modelos - modelos_coletados
+                    lote = modelos[pos:pos + tamanho]
+                    pos += len(lote)
+
+                    modelos_com_preco = yield from self._coletar_modelos(
+                        pool, nome, m, lote, pular, checkpoint, selecao
+                    )
+                    modelos_coletados += len(modelos_com_preco)
+
+                print(f"✓ Total coletado da marca {nome}: {modelos_coletados} modelos")
+
+    def crawl_falhas(self, checkpoint: CrawlCheckpoint, max_workers: int = 4) -> Iterator[Dict[str, Any]]:
+        """
+        Reprocessa apenas as falhas registradas no checkpoint, no nível em que
+        cada uma ocorreu (marca, modelo ou preço).
+        """
+        falhas = checkpoint.falhas()
+        print(f"Reprocessando {len(falhas)} falhas do checkpoint...")
+
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            for f in falhas:
+                ctx = f["contexto"]
+                nome = ctx.get("marca", "")
+                m = {"codigo": f["chave"][0], "nome": nome}
+
+                if f["nivel"] == NIVEL_MARCA:
+                    modelos = self._modelos_da_marca(nome, m, checkpoint)
+                    yield from self._coletar_modelos(pool, nome, m, modelos, None, checkpoint)
+
+                elif f["nivel"] == NIVEL_MODELO:
+                    mod = {"codigo": f["chave"][1], "nome": ctx.get("modelo", "")}
+                    yield from self._coletar_modelos(pool, nome, m, [mod], None, checkpoint)
+
+                else:
+                    mod = {"codigo": f["chave"][1], "nome": ctx.get("modelo", "")}
+                    ano = {"codigo": f["chave"][2]}
+                    yield from self._coletar_precos(pool, nome, m, [(mod, ano)], checkpoint)
+
+    def _modelos_da_marca(self, nome: str, m: Dict[str, Any],
+                          checkpoint: Optional[CrawlCheckpoint]) -> List[Dict[str, Any]]:
+        modelos = self.get_modelos(m["codigo"])
+        if checkpoint:
+            if modelos:
+                checkpoint.marcar_concluidos(NIVEL_MARCA, [(m["codigo"],)])
+            else:
+                checkpoint.registrar_falha(NIVEL_MARCA, (m["codigo"],), {"marca": nome})
+        return modelos
+
+    def _coletar_modelos(self, pool, nome: str, m: Dict[str, Any], modelos: List[Dict[str, Any]],
+                         pular: Optional[Callable[[ChavePreco], bool]],
+                         checkpoint: Optional[CrawlCheckpoint],
+                         selecao: Optional["SelecaoCrawl"] = None):
+        """Busca anos e preços de um lote de modelos; retorna os modelos com preço."""
+        futuros_anos = [
+            (mod, pool.submit(self.get_anos, m["codigo"], mod["codigo"]))
+            for mod in modelos
+        ]
+
+        itens = []
+        modelos_com_preco = set()
+        for mod, fut in futuros_anos:
+            anos = fut.result()
+            contexto = {"marca": nome, "modelo": mod["nome"]}
+
+            if checkpoint:
+                if anos:
+                    checkpoint.marcar_concluidos(NIVEL_MODELO, [(m["codigo"], mod["codigo"])])
+                else:
+                    checkpoint.registrar_falha(NIVEL_MODELO, (m["codigo"], mod["codigo"]), contexto)
+
+            novos = []
+            for ano in anos:
+                if selecao is not None and not selecao.aceita_ano(ano["codigo"]):
+                    continue
+                chave = chave_preco(m["codigo"], mod["codigo"], ano["codigo"])
+                if pular and pular(chave):
+                    modelos_com_preco.add(mod["codigo"])
+                    continue
+                novos.append(chave)
+                itens.append((mod, ano))
+
+            if checkpoint and novos:
+                checkpoint.registrar_pendentes(NIVEL_PRECO, novos, contexto)
+
+        modelos_com_preco |= yield from self._coletar_precos(pool, nome, m, itens, checkpoint, selecao)
+        return modelos_com_preco
+
+    def _coletar_precos(self, pool, nome: str, m: Dict[str, Any], itens,
+                        checkpoint: Optional[CrawlCheckpoint],
+                        selecao: Optional["SelecaoCrawl"] = None):
+        """Busca os preços de (modelo, ano) em paralelo; retorna os modelos com preço."""
+        futuros = deque(
+            (mod, ano, pool.submit(self.get_preco, m["codigo"], mod["codigo"], ano["codigo"]))
+            for mod, ano in itens
+        )
+
+        modelos_com_preco = set()
+        while futuros:
+            # Sai da fila ao ser lido: o JSON da resposta não fica preso ao
+            # futuro até o fim do lote
+            mod, ano, fut = futuros.popleft()
+            preco = fut.result()
+            if not preco:
+                if checkpoint:
+                    checkpoint.registrar_falha(
+                        NIVEL_PRECO,
+                        chave_preco(m["codigo"], mod["codigo"], ano["codigo"]),
+                        {"marca": nome, "modelo": mod["nome"]}
+                    )
+                continue
+
+            modelos_com_preco.add(mod["codigo"])
+            if selecao is not None and not selecao.aceita_preco(preco):
+                # Fora da faixa: não vai para o bronze, mas não fica pendente
+                if checkpoint:
+                    checkpoint.marcar_concluidos(
+                        NIVEL_PRECO, [chave_preco(m["codigo"], mod["codigo"], ano["codigo"])]
+                    )
+                continue
+
+            registro = montar_registro(nome, m, mod, ano, preco, self.tipo_veiculo)
+            print(f"✓ {nome} - {mod['nome']} - {ano['codigo']} → {registro['valor_str']}")
+            yield registro
+
+        return modelos_com_preco
+
+
+# =======================================================
+#   MONTAGEM DO REGISTRO BRONZE
+# =======================================================
+def chave_preco(marca_codigo: Any, modelo_codigo: Any, ano_codigo: Any) -> ChavePreco:
+    return int(marca_codigo), int(modelo_codigo), str(ano_codigo)
+
+
+def montar_registro(nome_marca: str, marca: Dict[str, Any], modelo: Dict[str, Any],
+                    ano: Dict[str, Any], preco: Dict[str, Any],
+                    tipo_veiculo: str = "motos") -> RegistroFipe:
+    return RegistroFipe.da_api(nome_marca, marca, modelo, ano, preco, tipo_veiculo)
 
 
 # =======================================================
@@ -75,5 +461,20 @@ def parse_valor_fipe(v: Optional[str]) -> Optional[float]:
              .strip()
         )
         return float(s)
-    except:
+    except ValueError:
+        return None
+
+
+# =======================================================
+#   PARSE DO MÊS DE REFERÊNCIA ("outubro de 2026 " → 2026-10-01)
+# =======================================================
+def parse_mes_referencia(v: Optional[str]) -> Optional[date]:
+    if not v:
+        return None
+    partes = v.strip().lower().split(" de ")
+    if len(partes) != 2 or partes[0] not in MESES:
+        return None
+    try:
+        return date(int(partes[1]), MESES[partes[0]], 1)
+    except ValueError:
         return None
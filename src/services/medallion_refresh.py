@@ -0,0 +1,401 @@
+# -*- coding: utf-8 -*-
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Tuple
+
+FAIXA_PADRAO = (18000, 30000)
+
+# Advisory locks do refresh: (classe, chave). A chave 0 é o medallion
+# inteiro (exclusiva no refresh completo, compartilhada pelas fatias); cada
+# fatia (tipo, marca) tem a sua, derivada do nome com hashtext.
+LOCK_CLASSE = "fipe_medallion"
+_SQL_LOCK_FATIA = """
+    SELECT pg_try_advisory_xact_lock_shared(hashtext(%(classe)s), 0)
+       AND pg_try_advisory_xact_lock(hashtext(%(classe)s), hashtext(%(tipo)s || '/' || %(marca)s));
+"""
+_FILTRO_FATIA = "tipo_veiculo = %(tipo)s AND marca = %(marca)s"
+# Refresh incremental: espera (em vez de pular) as fatias dos modelos
+# alterados, na ordem da chave para dois refreshes não travarem um ao outro
+_SQL_LOCK_FATIAS = """
+    SELECT pg_advisory_xact_lock_shared(hashtext(%(classe)s), 0),
+           (SELECT COUNT(pg_advisory_xact_lock(hashtext(%(classe)s), chave))
+            FROM (SELECT DISTINCT hashtext(t || '/' || m) AS chave
+                  FROM unnest(%(tipos)s::text[], %(marcas)s::text[]) AS f(t, m)
+                  ORDER BY chave) fatias);
+"""
+
+# Último mês de referência de cada chave (tipo, marca, modelo, ano) do bronze.
+# A faixa de preço filtra pelo idx_bronze_valor e o NOT EXISTS usa o índice
+# único uq_bronze_chave_mes para descartar meses antigos.
+_SQL_BRONZE_VIGENTE = """
+    SELECT b.tipo_veiculo, b.marca, b.modelo, b.ano_modelo, b.valor_numeric
+    FROM bronze.fipe_raw b
+    WHERE b.valor_numeric BETWEEN %(faixa_min)s AND %(faixa_max)s
+      AND NOT EXISTS (
+          SELECT 1
+          FROM bronze.fipe_raw n
+          WHERE n.tipo_veiculo = b.tipo_veiculo
+            AND n.codigo_marca = b.codigo_marca
+            AND n.codigo_modelo = b.codigo_modelo
+            AND n.codigo_ano = b.codigo_ano
+            AND n.mes_referencia > b.mes_referencia
+      )
+"""
+
+_FILTRO_GRUPOS = (
+    "(tipo_veiculo, marca, modelo) IN "
+    "(SELECT * FROM unnest(%(tipos)s::text[], %(marcas)s::text[], %(modelos)s::text[]))"
+)
+
+# Gold aplicado por diferença: em vez de apagar e reinserir (ids novos a cada
+# execução), remove os modelos que saíram, insere os novos e atualiza só os que
+# mudaram — e registra cada operação em gold.fipe_summary_changes no mesmo
+# comando. Todas as CTEs enxergam o gold de antes do comando ("anterior").
+# {filtro} restringe aos grupos recalculados ("TRUE" no refresh completo).
+_SQL_GOLD_DIFF = """
+    WITH novo AS (
+        SELECT tipo_veiculo, marca, modelo,
+               ROUND(AVG(valor_numeric), 2) AS media_valor, COUNT(*) AS qtd_registros
+        FROM silver.fipe_limited
+        WHERE {filtro}
+        GROUP BY tipo_veiculo, marca, modelo
+    ),
+    anterior AS (
+        SELECT tipo_veiculo, marca, modelo, media_valor, qtd_registros
+        FROM gold.fipe_summary
+        WHERE {filtro}
+    ),
+    removidos AS (
+        DELETE FROM gold.fipe_summary g
+        WHERE {filtro}
+          AND NOT EXISTS (
+              SELECT 1 FROM novo n
+              WHERE (n.tipo_veiculo, n.marca, n.modelo) = (g.tipo_veiculo, g.marca, g.modelo)
+          )
+        RETURNING g.tipo_veiculo, g.marca, g.modelo
+    ),
+    gravados AS (
+        INSERT INTO gold.fipe_summary AS g (tipo_veiculo, marca, modelo, media_valor, qtd_registros)
+        SELECT tipo_veiculo, marca, modelo, media_valor, qtd_registros FROM novo
+        ON CONFLICT (tipo_veiculo, marca, modelo) DO UPDATE
+        SET media_valor = EXCLUDED.media_valor,
+            qtd_registros = EXCLUDED.qtd_registros
+        WHERE (g.media_valor, g.qtd_registros)
+              IS DISTINCT FROM (EXCLUDED.media_valor, EXCLUDED.qtd_registros)
+        RETURNING g.tipo_veiculo, g.marca, g.modelo, g.media_valor, g.qtd_registros
+    )
+    INSERT INTO gold.fipe_summary_changes
+        (lote, operacao, tipo_veiculo, marca, modelo,
+         media_valor, qtd_registros, media_anterior, qtd_anterior)
+    SELECT %(lote)s, 'delete', r.tipo_veiculo, r.marca, r.modelo,
+           NULL, NULL, a.media_valor, a.qtd_registros
+    FROM removidos r
+    JOIN anterior a USING (tipo_veiculo, marca, modelo)
+    UNION ALL
+    SELECT %(lote)s, CASE WHEN a.modelo IS NULL THEN 'insert' ELSE 'update' END,
+           w.tipo_veiculo, w.marca, w.modelo,
+           w.media_valor, w.qtd_registros, a.media_valor, a.qtd_registros
+    FROM gravados w
+    LEFT JOIN anterior a USING (tipo_veiculo, marca, modelo);
+"""
+
+
+def _aplicar_gold(cur, filtro: str, params) -> Tuple[int, int]:
+    """
+    Aplica ao gold a diferença para o silver nos grupos de ``filtro`` e
+    registra as operações em um lote novo de gold.fipe_summary_changes.
+    Usado pelo refresh completo, pelo incremental e por cada fatia.
+
+    :return: (lote, número de mudanças — inserts + updates + deletes)
+    """
+    cur.execute("SELECT nextval('gold.fipe_summary_lote_seq');")
+    lote = cur.fetchone()[0]
+    cur.execute(_SQL_GOLD_DIFF.format(filtro=filtro), {**params, "lote": lote})
+    return lote, cur.rowcount
+
+
+# ================================================================
+#   ESTRUTURA — SILVER E GOLD
+# ================================================================
+def criar_tabelas_medallion(cur):
+    """Cria silver/gold e os índices de src/sql/00_create_schemas_and_tables.sql."""
+    cur.execute("CREATE SCHEMA IF NOT EXISTS silver;")
+    cur.execute("CREATE SCHEMA IF NOT EXISTS gold;")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS silver.fipe_limited (
+            id SERIAL PRIMARY KEY,
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            ano_modelo VARCHAR(10) NOT NULL,
+            valor_numeric NUMERIC(12,2)
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_silver_valor ON silver.fipe_limited(valor_numeric);")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_summary (
+            id SERIAL PRIMARY KEY,
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            media_valor NUMERIC(12,2),
+            qtd_registros INTEGER
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gold_media ON gold.fipe_summary(media_valor);")
+
+    # Tabelas de antes do multi-tipo só tinham motos
+    for tabela in ("silver.fipe_limited", "gold.fipe_summary"):
+        cur.execute(f"""
+            ALTER TABLE {tabela}
+            ADD COLUMN IF NOT EXISTS tipo_veiculo VARCHAR(10) NOT NULL DEFAULT 'motos';
+        """)
+
+    # Chave natural estável do gold (base do diff e do feed de mudanças);
+    # cobre as colunas lidas por modelo, sem ir ao heap. Bancos criados
+    # antes do INCLUDE têm o índice só com a chave: recria
+    cur.execute("""
+        SELECT indnatts = indnkeyatts FROM pg_index
+        WHERE indexrelid = to_regclass('gold.uq_gold_chave');
+    """)
+    row = cur.fetchone()
+    if row is not None and row[0]:
+        cur.execute("DROP INDEX gold.uq_gold_chave;")
+    cur.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS uq_gold_chave
+            ON gold.fipe_summary(tipo_veiculo, marca, modelo)
+            INCLUDE (media_valor, qtd_registros);
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_silver_chave
+            ON silver.fipe_limited(tipo_veiculo, marca, modelo)
+            INCLUDE (ano_modelo, valor_numeric);
+    """)
+
+    # Feed de mudanças do gold: só recebe INSERTs. Cada refresh usa um lote
+    # novo; consumidores aplicam os lotes maiores que o último já lido
+    cur.execute("CREATE SEQUENCE IF NOT EXISTS gold.fipe_summary_lote_seq;")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS gold.fipe_summary_changes (
+            id BIGSERIAL PRIMARY KEY,
+            lote BIGINT NOT NULL,
+            operacao VARCHAR(6) NOT NULL CHECK (operacao IN ('insert', 'update', 'delete')),
+            tipo_veiculo VARCHAR(10) NOT NULL,
+            marca VARCHAR(50) NOT NULL,
+            modelo VARCHAR(100) NOT NULL,
+            media_valor NUMERIC(12,2),
+            qtd_registros INTEGER,
+            media_anterior NUMERIC(12,2),
+            qtd_anterior INTEGER,
+            registrado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        );
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_gold_changes_lote ON gold.fipe_summary_changes(lote);")
+
+
+class MedallionRefresher:
+    def __init__(self, conn, faixa_min: float = FAIXA_PADRAO[0], faixa_max: float = FAIXA_PADRAO[1]):
+        """
+        Refresh bronze → silver → gold feito inteiramente no banco.
+
+        :param conn: conexão psycopg2 aberta
+        :param faixa_min: menor valor (R$) mantido no silver
+        :param faixa_max: maior valor (R$) mantido no silver
+        """
+        self.conn = conn
+        self.faixa_min = faixa_min
+        self.faixa_max = faixa_max
+        self.ultimo_lote = None  # lote do feed de mudanças do último refresh
+
+    def _aplicar_gold(self, cur, filtro: str, params) -> int:
+        """Aplica a diferença do gold (ver _aplicar_gold) e guarda o lote em ``ultimo_lote``."""
+        self.ultimo_lote, mudancas = _aplicar_gold(cur, filtro, params)
+        return mudancas
+
+    def _params(self, **extra):
+        return {"faixa_min": self.faixa_min, "faixa_max": self.faixa_max, **extra}
+
+    def refresh(self):
+        """
+        Reconstrói o silver (TRUNCATE + INSERT) e aplica ao gold só a
+        diferença, em uma única transação.
+
+        O TRUNCATE bloqueia o silver até o commit e o gold só muda no commit,
+        então quem lê enxerga direto o resultado novo — nunca um gold pela
+        metade. As linhas do gold mantêm o id entre execuções.
+
+        Returns:
+            tuple: (linhas no silver, mudanças aplicadas ao gold)
+        """
+        cur = self.conn.cursor()
+        try:
+            criar_tabelas_medallion(cur)
+
+            # Espera fatias em andamento (refresh_por_marca) e as impede até o commit
+            cur.execute("SELECT pg_advisory_xact_lock(hashtext(%s), 0);", (LOCK_CLASSE,))
+            cur.execute("TRUNCATE silver.fipe_limited RESTART IDENTITY;")
+
+            cur.execute(f"""
+                INSERT INTO silver.fipe_limited (tipo_veiculo, marca, modelo, ano_modelo, valor_numeric)
+                {_SQL_BRONZE_VIGENTE};
+            """, self._params())
+            silver = cur.rowcount
+
+            gold = self._aplicar_gold(cur, "TRUE", self._params())
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        cur.execute("ANALYZE silver.fipe_limited;")
+        cur.execute("ANALYZE gold.fipe_summary;")
+        self.conn.commit()
+
+        print(f"SILVER OK! {silver} registros (faixa {self.faixa_min:.0f}–{self.faixa_max:.0f})")
+        print(f"GOLD OK! {gold} mudanças nas médias por modelo (lote {self.ultimo_lote})")
+        return silver, gold
+
+    def refresh_incremental(self, alterados: Iterable[Tuple[str, str, str]]):
+        """
+        Recalcula silver e gold somente para os trios (tipo_veiculo, marca,
+        modelo) alterados, também em uma única transação.
+
+        Pega os mesmos advisory locks do refresh por marca (o do medallion,
+        compartilhado, e o de cada marca tocada), esperando por eles: um
+        refresh por marca concorrente pula essas marcas até o commit, e o
+        refresh completo espera.
+        """
+        alterados = list(alterados)
+        if not alterados:
+            print("SILVER/GOLD: nenhuma alteração no bronze, nada a recalcular.")
+            return
+
+        params = self._params(
+            tipos=[a[0] for a in alterados],
+            marcas=[a[1] for a in alterados],
+            modelos=[a[2] for a in alterados],
+            classe=LOCK_CLASSE
+        )
+        cur = self.conn.cursor()
+        try:
+            criar_tabelas_medallion(cur)
+
+            cur.execute(_SQL_LOCK_FATIAS, params)
+
+            cur.execute(f"DELETE FROM silver.fipe_limited WHERE {_FILTRO_GRUPOS};", params)
+            cur.execute(f"""
+                INSERT INTO silver.fipe_limited (tipo_veiculo, marca, modelo, ano_modelo, valor_numeric)
+                SELECT * FROM ({_SQL_BRONZE_VIGENTE}) vigente
+                WHERE {_FILTRO_GRUPOS};
+            """, params)
+
+            mudancas = self._aplicar_gold(cur, _FILTRO_GRUPOS, params)
+
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            raise
+
+        print(f"SILVER/GOLD OK! {len(alterados)} modelos recalculados, "
+              f"{mudancas} mudanças no gold (lote {self.ultimo_lote})")
+
+    # ------------------------------------------------------------
+    #   REFRESH POR MARCA, EM PARALELO
+    # ------------------------------------------------------------
+    def _fatias(self, cur) -> List[Tuple[str, str]]:
+        # Marcas que saíram do bronze continuam no silver/gold até o refresh
+        # da fatia apagá-las
+        cur.execute("""
+            SELECT tipo_veiculo, marca FROM bronze.fipe_raw
+            UNION
+            SELECT tipo_veiculo, marca FROM silver.fipe_limited
+            UNION
+            SELECT tipo_veiculo, marca FROM gold.fipe_summary
+            ORDER BY 1, 2;
+        """)
+        return [tuple(row) for row in cur.fetchall()]
+
+    def _refresh_fatia(self, banco, tipo: str, marca: str) -> Optional[Tuple[int, int]]:
+        """
+        Recalcula silver e gold de uma fatia (tipo, marca) em uma conexão
+        própria do pool. Retorna (lote, mudanças no gold), ou None se outra
+        execução já estiver com a fatia (ou com o refresh completo).
+        """
+        params = self._params(tipo=tipo, marca=marca, classe=LOCK_CLASSE)
+        with banco.conexao() as conn:
+            cur = conn.cursor()
+            try:
+                # Locks de transação: liberados sozinhos no commit/rollback
+                cur.execute(_SQL_LOCK_FATIA, params)
+                if not cur.fetchone()[0]:
+                    conn.rollback()
+                    return None
+
+                cur.execute(f"DELETE FROM silver.fipe_limited WHERE {_FILTRO_FATIA};", params)
+                cur.execute(f"""
+                    INSERT INTO silver.fipe_limited (tipo_veiculo, marca, modelo, ano_modelo, valor_numeric)
+                    SELECT * FROM ({_SQL_BRONZE_VIGENTE}) vigente
+                    WHERE {_FILTRO_FATIA};
+                """, params)
+
+                lote, mudancas = _aplicar_gold(cur, _FILTRO_FATIA, params)
+
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+        return lote, mudancas
+
+    def refresh_por_marca(self, banco, fatias: Optional[Iterable[Tuple[str, str]]] = None,
+                          max_workers: int = 4) -> Dict[str, List[Tuple[str, str]]]:
+        """
+        Recalcula silver e gold por fatia (tipo_veiculo, marca), com várias
+        fatias ao mesmo tempo em conexões diferentes do pool.
+
+        Cada fatia é uma transação que só mexe nas próprias linhas e pega um
+        advisory lock da fatia sem esperar: duas execuções (ex.: shards em
+        máquinas diferentes) atualizam marcas diferentes em paralelo, e uma
+        fatia que já está sendo atualizada por outra execução é pulada em vez
+        de ser sobrescrita. Cada fatia gera o seu lote no feed de mudanças;
+        o maior deles fica em ``ultimo_lote``.
+
+        :param banco: DBConnection cujo pool fornece as conexões das fatias
+        :param fatias: pares (tipo_veiculo, marca); None usa todas do bronze,
+            silver e gold (marcas que saíram do bronze são apagadas)
+        :param max_workers: fatias simultâneas (conexões usadas do pool)
+        :return: {"atualizadas": [...], "ocupadas": [...], "lotes": [...]}
+        """
+        cur = self.conn.cursor()
+        # DDL antes das threads: CREATE ... IF NOT EXISTS concorrente conflita
+        criar_tabelas_medallion(cur)
+        fatias = sorted(set(fatias)) if fatias is not None else self._fatias(cur)
+        self.conn.commit()
+
+        resultado = {"atualizadas": [], "ocupadas": [], "lotes": []}
+        if not fatias:
+            print("SILVER/GOLD: nenhuma marca a recalcular.")
+            return resultado
+
+        mudancas = 0
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            futuros = [(f, pool.submit(self._refresh_fatia, banco, *f)) for f in fatias]
+            for fatia, fut in futuros:
+                feito = fut.result()
+                if feito is None:
+                    resultado["ocupadas"].append(fatia)
+                else:
+                    resultado["atualizadas"].append(fatia)
+                    resultado["lotes"].append(feito[0])
+                    mudancas += feito[1]
+
+        lotes = resultado["lotes"] = sorted(resultado["lotes"])
+        if lotes:
+            self.ultimo_lote = lotes[-1]
+        print(f"SILVER/GOLD OK! {len(resultado['atualizadas'])} marcas recalculadas em paralelo, "
+              f"{mudancas} mudanças no gold" + (f" (lotes {lotes[0]}–{lotes[-1]})" if lotes else ""))
+        if resultado["ocupadas"]:
+            ocupadas = ", ".join(f"{m} ({t})" for t, m in resultado["ocupadas"])
+            print(f"SILVER/GOLD: puladas (em refresh por outra execução): {ocupadas}")
+        return resultado
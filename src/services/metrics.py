@@ -0,0 +1,208 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource  # não existe no Windows
+except ImportError:
+    resource = None
+
+from services.fipe_api_client import BUCKETS_LATENCIA, EstatisticasHttp
+
+PREFIXO = "fipe"
+
+
+def memoria_pico_bytes() -> Optional[int]:
+    """Pico de memória residente do processo (ru_maxrss), ou None sem ``resource``."""
+    if resource is None:
+        return None
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa em KiB; macOS em bytes
+    return pico if sys.platform == "darwin" else pico * 1024
+
+
+class Etapa:
+    def __init__(self, nome: str):
+        """Span de uma etapa; quem executa a etapa preenche linhas e bytes."""
+        self.nome = nome
+        self.linhas = 0
+        self.bytes = 0
+
+
+class Metricas:
+    def __init__(self, caminho_log: Optional[str] = None, caminho_prometheus: Optional[str] = None):
+        """
+        Instrumentação da execução: duração por etapa, linhas/s, bytes/s,
+        latência HTTP por endpoint (histograma), retries e pico de memória.
+
+        Cada etapa encerrada vira uma linha JSON (em ``caminho_log`` ou no
+        stderr); ``finalizar`` grava o resumo e, se pedido, um arquivo no
+        formato texto do Prometheus para o textfile collector.
+
+        :param caminho_log: arquivo JSON lines (append); None escreve no stderr
+        :param caminho_prometheus: arquivo .prom reescrito a cada execução
+        """
+        self.caminho_log = caminho_log
+        self.caminho_prometheus = caminho_prometheus
+        self.execucao = uuid.uuid4().hex[:12]
+        self._inicio = time.monotonic()
+        self._lock = threading.Lock()
+        self._etapas: Dict[str, Dict[str, float]] = {}
+        self._contadores: Dict[str, float] = {}
+        self._http: Dict[str, Dict[str, Any]] = {}
+
+    # ------------------------------------------------------------
+    #   LOG JSON
+    # ------------------------------------------------------------
+    def log(self, evento: str, **campos):
+        linha = json.dumps({
+            "ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+            "execucao": self.execucao,
+            "evento": evento,
+            **campos,
+        }, ensure_ascii=False, default=str)
+
+        with self._lock:
+            if self.caminho_log:
+                os.makedirs(os.path.dirname(self.caminho_log) or ".", exist_ok=True)
+                with open(self.caminho_log, "a", encoding="utf-8") as f:
+                    f.write(linha + "\n")
+            else:
+                print(linha, file=sys.stderr)
+
+    # ------------------------------------------------------------
+    #   ETAPAS
+    # ------------------------------------------------------------
+    def acumular(self, etapa: str, segundos: float, linhas: int = 0, bytes_: int = 0):
+        """Soma tempo/linhas/bytes a uma etapa (para etapas intercaladas, como lotes do bronze)."""
+        with self._lock:
+            d = self._etapas.setdefault(etapa, {"segundos": 0.0, "linhas": 0, "bytes": 0, "execucoes": 0})
+            d["segundos"] += segundos
+            d["linhas"] += linhas
+            d["bytes"] += bytes_
+            d["execucoes"] += 1
+
+    @contextmanager
+    def etapa(self, nome: str) -> Iterator[Etapa]:
+        span = Etapa(nome)
+        inicio = time.monotonic()
+        status = "ok"
+        try:
+            yield span
+        except BaseException:
+            status = "erro"
+            raise
+        finally:
+            segundos = time.monotonic() - inicio
+            self.acumular(nome, segundos, span.linhas, span.bytes)
+            self.log(
+                "etapa",
+                etapa=nome,
+                status=status,
+                duracao_s=round(segundos, 4),
+                linhas=span.linhas,
+                bytes=span.bytes,
+                linhas_por_s=round(span.linhas / segundos, 1) if segundos else None,
+                bytes_por_s=round(span.bytes / segundos, 1) if segundos else None,
+                memoria_pico_bytes=memoria_pico_bytes(),
+            )
+
+    def incrementar(self, nome: str, valor: float = 1):
+        with self._lock:
+            self._contadores[nome] = self._contadores.get(nome, 0) + valor
+
+    def registrar_http(self, estatisticas: EstatisticasHttp):
+        """Copia os contadores e histogramas de latência do cliente da API."""
+        resumo = estatisticas.resumo()
+        with self._lock:
+            self._http = resumo
+        for endpoint, est in resumo.items():
+            self.log("http", endpoint=endpoint, **{k: v for k, v in est.items() if k != "histograma"})
+
+    # ------------------------------------------------------------
+    #   RESUMO / PROMETHEUS
+    # ------------------------------------------------------------
+    def resumo(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "duracao_total_s": time.monotonic() - self._inicio,
+                "etapas": {nome: dict(d) for nome, d in self._etapas.items()},
+                "contadores": dict(self._contadores),
+                "http": dict(self._http),
+                "memoria_pico_bytes": memoria_pico_bytes(),
+            }
+
+    def texto_prometheus(self) -> str:
+        r = self.resumo()
+        linhas = []
+
+        def metrica(nome, tipo, ajuda, amostras):
+            linhas.append(f"# HELP {PREFIXO}_{nome} {ajuda}")
+            linhas.append(f"# TYPE {PREFIXO}_{nome} {tipo}")
+            for rotulos, valor in amostras:
+                txt = ",".join(f'{k}="{v}"' for k, v in rotulos.items())
+                linhas.append(f"{PREFIXO}_{nome}{{{txt}}} {valor}" if txt else f"{PREFIXO}_{nome} {valor}")
+
+        etapas = r["etapas"].items()
+        metrica("etapa_duracao_segundos", "gauge", "Tempo gasto na etapa na última execução",
+                [({"etapa": n}, round(d["segundos"], 6)) for n, d in etapas])
+        metrica("etapa_linhas", "gauge", "Linhas processadas pela etapa",
+                [({"etapa": n}, d["linhas"]) for n, d in etapas])
+        metrica("etapa_bytes", "gauge", "Bytes gravados/enviados pela etapa",
+                [({"etapa": n}, d["bytes"]) for n, d in etapas])
+
+        hist = []
+        for endpoint, est in r["http"].items():
+            acumulado = 0
+            for limite, qtd in zip(BUCKETS_LATENCIA, est["histograma"]):
+                acumulado += qtd
+                hist.append(({"endpoint": endpoint, "le": limite}, acumulado))
+            hist.append(({"endpoint": endpoint, "le": "+Inf"}, est["requisicoes"]))
+        linhas.append(f"# HELP {PREFIXO}_http_latencia_segundos Latência das requisições à API FIPE")
+        linhas.append(f"# TYPE {PREFIXO}_http_latencia_segundos histogram")
+        for rotulos, valor in hist:
+            linhas.append(f'{PREFIXO}_http_latencia_segundos_bucket{{endpoint="{rotulos["endpoint"]}",'
+                          f'le="{rotulos["le"]}"}} {valor}')
+        for endpoint, est in r["http"].items():
+            linhas.append(f'{PREFIXO}_http_latencia_segundos_sum{{endpoint="{endpoint}"}} {est["latencia_total"]:.6f}')
+            linhas.append(f'{PREFIXO}_http_latencia_segundos_count{{endpoint="{endpoint}"}} {est["requisicoes"]}')
+
+        metrica("http_retries", "gauge", "Retries por endpoint",
+                [({"endpoint": e}, est["retries"]) for e, est in r["http"].items()])
+        metrica("http_erros", "gauge", "Requisições que falharam de vez",
+                [({"endpoint": e}, est["erros"]) for e, est in r["http"].items()])
+        metrica("contador", "gauge", "Contadores diversos da execução",
+                [({"nome": n}, v) for n, v in r["contadores"].items()])
+        if r["memoria_pico_bytes"] is not None:
+            metrica("memoria_pico_bytes", "gauge", "Pico de memória residente do processo",
+                    [({}, r["memoria_pico_bytes"])])
+        metrica("execucao_duracao_segundos", "gauge", "Duração total da execução",
+                [({}, round(r["duracao_total_s"], 3))])
+        metrica("execucao_fim_timestamp_segundos", "gauge", "Fim da última execução (epoch)",
+                [({}, int(time.time()))])
+
+        return "\n".join(linhas) + "\n"
+
+    def finalizar(self) -> Dict[str, Any]:
+        """Registra o resumo no log e grava o arquivo do Prometheus, se configurado."""
+        r = self.resumo()
+        self.log("resumo", duracao_total_s=round(r["duracao_total_s"], 3),
+                 etapas=r["etapas"], contadores=r["contadores"],
+                 memoria_pico_bytes=r["memoria_pico_bytes"])
+
+        if self.caminho_prometheus:
+            os.makedirs(os.path.dirname(self.caminho_prometheus) or ".", exist_ok=True)
+            temp = self.caminho_prometheus + ".tmp"
+            with open(temp, "w", encoding="utf-8") as f:
+                f.write(self.texto_prometheus())
+            # Troca atômica: o collector nunca lê um arquivo pela metade
+            os.replace(temp, self.caminho_prometheus)
+
+        return r
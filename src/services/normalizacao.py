@@ -0,0 +1,176 @@
+# -*- coding: utf-8 -*-
+from operator import attrgetter, itemgetter
+from typing import Any, Callable, Dict, List, Sequence, Union
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from services.fipe_api_client import parse_mes_referencia
+from services.registro import ANO_ZERO_KM, RegistroFipe
+
+
+# Colunas (e tipos) do frame normalizado, na ordem das colunas do bronze
+SCHEMA_NORMALIZADO = {
+    "tipo_veiculo": "object",
+    "marca": "object",
+    "modelo": "object",
+    "ano_modelo": "object",
+    "codigo_marca": "int32",
+    "codigo_modelo": "int32",
+    "codigo_ano": "object",
+    "valor": "object",
+    "valor_numeric": "float64",
+    "mes_referencia": "datetime64[ns]",
+    "codigo_fipe": "object",
+    "ano": "Int32",
+    "combustivel": "Int16",
+    "zero_km": "bool",
+    "hash_conteudo": "int64",
+}
+
+# Colunas cobertas pelo hash de conteúdo (todas, menos o próprio hash)
+_COLUNAS_CONTEUDO = [c for c in SCHEMA_NORMALIZADO if c != "hash_conteudo"]
+
+# Campo do registro do crawl → coluna do bronze
+_RENOMEAR = {
+    "tipo_veiculo": "tipo_veiculo",
+    "marca": "marca",
+    "modelo": "modelo",
+    "ano": "ano_modelo",
+    "cod_marca": "codigo_marca",
+    "cod_modelo": "codigo_modelo",
+    "cod_ano": "codigo_ano",
+    "valor_str": "valor",
+    "mes_referencia": "mes_referencia",
+    "codigo_fipe": "codigo_fipe",
+}
+
+_LER_DICT = itemgetter(*_RENOMEAR)
+_LER_REGISTRO = attrgetter(*_RENOMEAR)  # RegistroFipe.ano é o próprio cod_ano
+
+_RE_NUMERO = r"^-?\d+(\.\d+)?$"
+
+
+def _ler_misto(registro: Union[RegistroFipe, Dict[str, Any]]) -> tuple:
+    return _LER_REGISTRO(registro) if isinstance(registro, RegistroFipe) else _LER_DICT(registro)
+
+
+def _leitor(registros: List[Union[RegistroFipe, Dict[str, Any]]]) -> Callable[[Any], tuple]:
+    """Getter dos campos: o mais rápido se o lote for de um tipo só, um por item se misturar."""
+    compactos = {issubclass(t, RegistroFipe) for t in set(map(type, registros))}
+    if compactos == {True}:
+        return _LER_REGISTRO
+    if compactos == {False}:
+        return _LER_DICT
+    return _ler_misto
+
+
+def _por_valor_unico(valores: Sequence[Any], func: Callable[[Any], Any], dtype: str):
+    """
+    Aplica ``func`` só aos valores distintos e espalha o resultado pelos
+    códigos do factorize. Códigos, anos e meses se repetem muito, então o
+    custo fica proporcional à cardinalidade e não ao tamanho do lote.
+    """
+    codigos, unicos = pd.factorize(np.asarray(valores, dtype=object), use_na_sentinel=True)
+    convertidos = pd.array([func(u) for u in unicos] + [None], dtype=dtype)
+    return convertidos[codigos]  # -1 (nulo) cai no None do final
+
+
+def _ano_combustivel(codigo_ano: Any):
+    ano, _, comb = str(codigo_ano).partition("-")
+    return (int(ano) if ano.isdigit() else None, int(comb) if comb.isdigit() else None)
+
+
+def parse_valores_brl(valores: Sequence[Any]) -> np.ndarray:
+    """Vetorizado (Arrow): "R$ 24.510,00" → 24510.0 (NaN quando não for número)."""
+    arr = pa.array(valores, type=pa.string(), from_pandas=True)
+    for antes, depois in (("R$", ""), (".", ""), (",", ".")):
+        arr = pc.replace_substring(arr, antes, depois)
+    limpo = pc.utf8_trim_whitespace(arr)
+    limpo = pc.if_else(pc.match_substring_regex(limpo, _RE_NUMERO), limpo, pa.scalar(None, pa.string()))
+    return pc.cast(limpo, pa.float64()).to_numpy(zero_copy_only=False)
+
+
+def parse_meses_referencia(valores: Sequence[Any]):
+    """Vetorizado: "outubro de 2026 " → 2026-10-01 (NaT quando inválido)."""
+    return _por_valor_unico(
+        valores,
+        lambda v: np.datetime64(parse_mes_referencia(v) or "NaT", "ns"),
+        "datetime64[ns]"
+    )
+
+
+def hash_conteudo(df: pd.DataFrame) -> np.ndarray:
+    """
+    Hash de 64 bits (com sinal, como BIGINT) de cada linha normalizada,
+    vetorizado. O mesmo conteúdo gera o mesmo hash em qualquer lote ou
+    execução (a chave do hash do pandas é fixa); o bronze guarda o valor
+    para o upsert pular preços idênticos.
+    """
+    return pd.util.hash_pandas_object(df[_COLUNAS_CONTEUDO], index=False).to_numpy().view("int64")
+
+
+def normalizar_registros(registros: List[Union[RegistroFipe, Dict[str, Any]]]) -> pd.DataFrame:
+    """
+    Converte um lote de registros do crawl em um DataFrame colunar, de uma vez:
+    valores em R$, mês de referência, ano/combustível separados do
+    codigo_ano, a marcação do sentinela 32000 ("zero km") e o hash de
+    conteúdo de cada linha.
+
+    Aceita RegistroFipe (o que o crawl produz) ou dicts com as mesmas chaves,
+    inclusive misturados no mesmo lote.
+
+    Raises:
+        ValueError: se alguma coluna obrigatória vier com tipo inválido
+    """
+    if not registros:
+        return pd.DataFrame({col: pd.Series(dtype=tipo) for col, tipo in SCHEMA_NORMALIZADO.items()})
+
+    # Transpõe os registros em uma tupla por coluna numa passada só (em C)
+    colunas = zip(*map(_leitor(registros), registros))
+    bruto = dict(zip(_RENOMEAR.values(), colunas))
+
+    df = pd.DataFrame({
+        "tipo_veiculo": _por_valor_unico(bruto["tipo_veiculo"], str, "object"),
+        "marca": bruto["marca"],
+        "modelo": bruto["modelo"],
+        "ano_modelo": _por_valor_unico(bruto["ano_modelo"], str, "object"),
+        "codigo_marca": _por_valor_unico(bruto["codigo_marca"], int, "Int32"),
+        "codigo_modelo": _por_valor_unico(bruto["codigo_modelo"], int, "Int32"),
+        "codigo_ano": _por_valor_unico(bruto["codigo_ano"], str, "object"),
+        "valor": bruto["valor"],
+        "valor_numeric": parse_valores_brl(bruto["valor"]),
+        "mes_referencia": parse_meses_referencia(bruto["mes_referencia"]),
+        "codigo_fipe": bruto["codigo_fipe"],
+    })
+
+    df["ano"] = _por_valor_unico(bruto["codigo_ano"], lambda c: _ano_combustivel(c)[0], "Int32")
+    df["combustivel"] = _por_valor_unico(bruto["codigo_ano"], lambda c: _ano_combustivel(c)[1], "Int16")
+    df["zero_km"] = (df["ano"] == ANO_ZERO_KM).fillna(False).astype(bool)
+
+    for col in ("codigo_marca", "codigo_modelo"):
+        if df[col].isna().any():
+            raise ValueError(f"Coluna obrigatória {col} com valores nulos")
+        df[col] = df[col].astype("int32")
+
+    df["hash_conteudo"] = hash_conteudo(df)
+    df = df[list(SCHEMA_NORMALIZADO)]
+    validar_frame(df)
+    return df
+
+
+def validar_frame(df: pd.DataFrame):
+    """Confere colunas e tipos do frame normalizado."""
+    faltando = set(SCHEMA_NORMALIZADO) - set(df.columns)
+    if faltando:
+        raise ValueError(f"Colunas ausentes no frame normalizado: {sorted(faltando)}")
+
+    for col, tipo in SCHEMA_NORMALIZADO.items():
+        if str(df[col].dtype) != tipo:
+            raise ValueError(f"Coluna {col} com tipo {df[col].dtype}, esperado {tipo}")
+
+    for col in ("tipo_veiculo", "marca", "modelo", "codigo_ano"):
+        if df[col].isna().any():
+            raise ValueError(f"Coluna obrigatória {col} com valores nulos")
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+import hashlib
+import io
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# Camada → (tabela, colunas de partição, schema Arrow)
+TABELAS_EXPORTACAO = {
+    "bronze": (
+        "bronze.fipe_raw",
+        ("tipo_veiculo", "mes_referencia", "marca"),
+        pa.schema([
+            ("tipo_veiculo", pa.string()),
+            ("marca", pa.string()),
+            ("modelo", pa.string()),
+            ("ano_modelo", pa.string()),
+            ("codigo_marca", pa.int32()),
+            ("codigo_modelo", pa.int32()),
+            ("codigo_ano", pa.string()),
+            ("valor", pa.string()),
+            ("valor_numeric", pa.decimal128(12, 2)),
+            ("mes_referencia", pa.date32()),
+            ("codigo_fipe", pa.string()),
+            ("ano", pa.int32()),
+            ("combustivel", pa.int16()),
+            ("zero_km", pa.bool_()),
+        ]),
+    ),
+    "silver": (
+        "silver.fipe_limited",
+        ("tipo_veiculo", "marca"),
+        pa.schema([
+            ("tipo_veiculo", pa.string()),
+            ("marca", pa.string()),
+            ("modelo", pa.string()),
+            ("ano_modelo", pa.string()),
+            ("valor_numeric", pa.decimal128(12, 2)),
+        ]),
+    ),
+    "gold": (
+        "gold.fipe_summary",
+        ("tipo_veiculo", "marca"),
+        pa.schema([
+            ("tipo_veiculo", pa.string()),
+            ("marca", pa.string()),
+            ("modelo", pa.string()),
+            ("media_valor", pa.decimal128(12, 2)),
+            ("qtd_registros", pa.int32()),
+        ]),
+    ),
+}
+
+META_HASH = "sha256"
+
+
+def _valor_particao(v: Any) -> str:
+    if v is None:
+        return "__null__"
+    if hasattr(v, "strftime"):
+        return v.strftime("%Y-%m")
+    return quote(str(v), safe="")
+
+
+class ParquetExporter:
+    def __init__(self, conn, minio_client, bucket: str = "fipe", max_workers: int = 4,
+                 part_size: int = 8 * 1024 * 1024, compressao: str = "zstd",
+                 linhas_por_fetch: int = 10000, remover_orfas: bool = True):
+        """
+        Exporta bronze/silver/gold do Postgres para Parquet no MinIO.
+
+        As linhas vêm de um cursor server-side (sem carregar a tabela inteira),
+        são agrupadas por partição (tipo de veículo, marca e, no bronze, mês
+        de referência), serializadas em memória e enviadas em paralelo.
+        Partições cujo conteúdo não mudou (mesmo sha256 guardado nos
+        metadados do objeto) são puladas.
+
+        O prefixo de cada tabela no bucket espelha a tabela: partições que
+        não existem mais no Postgres (meses que saíram do bronze, marcas
+        removidas) são apagadas do MinIO depois dos uploads. Uma camada sem
+        nenhuma linha não apaga nada, para um refresh que falhou não esvaziar
+        o bucket.
+
+        :param conn: conexão psycopg2 aberta
+        :param minio_client: instância de minio.Minio
+        :param bucket: bucket de destino
+        :param max_workers: uploads simultâneos
+        :param part_size: tamanho das partes do upload multipart (mín. 5 MiB)
+        :param compressao: codec Parquet (zstd, snappy, gzip...)
+        :param linhas_por_fetch: linhas buscadas por round trip do cursor
+        :param remover_orfas: apaga os objetos de partições que sumiram
+        """
+        self.conn = conn
+        self.minio_client = minio_client
+        self.bucket = bucket
+        self.max_workers = max_workers
+        self.part_size = part_size
+        self.compressao = compressao
+        self.linhas_por_fetch = linhas_por_fetch
+        self.remover_orfas = remover_orfas
+
+        # Limita partições serializadas esperando upload (memória limitada)
+        self._vagas = threading.BoundedSemaphore(max_workers * 2)
+
+    @staticmethod
+    def _prefixo(camada: str, tabela: str) -> str:
+        return f"{camada}/{tabela.split('.')[1]}/"
+
+    def _nome_objeto(self, camada: str, tabela: str, particao: Dict[str, Any]) -> str:
+        caminho = "/".join(f"{col}={_valor_particao(v)}" for col, v in particao.items())
+        return f"{self._prefixo(camada, tabela)}{caminho}/part-0000.parquet"
+
+    def _orfas(self, camada: str, tabela: str, atuais: Set[str]) -> List[str]:
+        """Objetos Parquet da tabela no bucket que esta exportação não gerou."""
+        return [
+            obj.object_name
+            for obj in self.minio_client.list_objects(self.bucket, prefix=self._prefixo(camada, tabela),
+                                                      recursive=True)
+            if obj.object_name.endswith(".parquet") and obj.object_name not in atuais
+        ]
+
+    def _serializar(self, schema: pa.Schema, linhas: List[Tuple]) -> bytes:
+        colunas = list(zip(*linhas))
+        tabela = pa.table(
+            {campo.name: pa.array(colunas[i], type=campo.type) for i, campo in enumerate(schema)},
+            schema=schema
+        )
+        buf = io.BytesIO()
+        pq.write_table(tabela, buf, compression=self.compressao)
+        return buf.getvalue()
+
+    def _enviar(self, nome: str, dados: bytes) -> bool:
+        """Envia o objeto se o conteúdo mudou. Retorna True se houve upload."""
+        try:
+            digest = hashlib.sha256(dados).hexdigest()
+            try:
+                atual = self.minio_client.stat_object(self.bucket, nome)
+                if (atual.metadata or {}).get(f"x-amz-meta-{META_HASH}") == digest:
+                    return False
+            except Exception:
+                pass  # objeto ainda não existe
+
+            self.minio_client.put_object(
+                self.bucket, nome, io.BytesIO(dados), len(dados),
+                content_type="application/vnd.apache.parquet",
+                metadata={META_HASH: digest},
+                part_size=self.part_size
+            )
+            return True
+        finally:
+            self._vagas.release()
+
+    def _particoes(self, camada: str) -> Iterable[Tuple[Dict[str, Any], List[Tuple]]]:
+        tabela, cols_particao, schema = TABELAS_EXPORTACAO[camada]
+        colunas = [campo.name for campo in schema]
+        idx = [colunas.index(c) for c in cols_particao]
+
+        # Ordem total e determinística → o mesmo conteúdo gera o mesmo Parquet
+        ordem = list(cols_particao) + [c for c in colunas if c not in cols_particao]
+
+        cur = self.conn.cursor(name=f"export_{camada}")
+        cur.itersize = self.linhas_por_fetch
+        cur.execute(f"SELECT {', '.join(colunas)} FROM {tabela} ORDER BY {', '.join(ordem)};")
+
+        chave_atual = None
+        linhas = []
+        for row in cur:
+            chave = tuple(row[i] for i in idx)
+            if chave != chave_atual and linhas:
+                yield dict(zip(cols_particao, chave_atual)), linhas
+                linhas = []
+            chave_atual = chave
+            linhas.append(row)
+
+        if linhas:
+            yield dict(zip(cols_particao, chave_atual)), linhas
+
+        cur.close()
+
+    def exportar(self, camadas: Iterable[str] = ("bronze", "silver", "gold")) -> Dict[str, Dict[str, int]]:
+        """
+        Exporta as camadas pedidas.
+
+        Returns:
+            dict: por camada, partições enviadas, puladas (sem mudança),
+            removidas (órfãs) e bytes enviados
+        """
+        resultado = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            for camada in camadas:
+                tabela, _, schema = TABELAS_EXPORTACAO[camada]
+                futuros = []
+                nomes = set()
+
+                for particao, linhas in self._particoes(camada):
+                    dados = self._serializar(schema, linhas)
+                    nome = self._nome_objeto(camada, tabela, particao)
+                    nomes.add(nome)
+                    self._vagas.acquire()
+                    futuros.append((len(dados), pool.submit(self._enviar, nome, dados)))
+
+                enviados = pulados = bytes_enviados = 0
+                for tamanho, fut in futuros:
+                    if fut.result():
+                        enviados += 1
+                        bytes_enviados += tamanho
+                    else:
+                        pulados += 1
+
+                orfas = self._orfas(camada, tabela, nomes) if self.remover_orfas and nomes else []
+                for fut in [pool.submit(self.minio_client.remove_object, self.bucket, nome) for nome in orfas]:
+                    fut.result()
+
+                resultado[camada] = {"enviados": enviados, "pulados": pulados, "removidos": len(orfas),
+                                     "bytes": bytes_enviados}
+                print(f"EXPORT {camada.upper()}: {enviados} partições enviadas, "
+                      f"{pulados} sem mudança, {len(orfas)} removidas ({bytes_enviados / 1024:.1f} KiB)")
+
+        # Cursor server-side abre transação; encerra antes das próximas etapas
+        self.conn.commit()
+        return resultado
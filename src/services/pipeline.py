@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from services.bronze_loader import BronzeLoader
+
+_FIM = object()
+ESPERA_FILA = 0.5  # s entre verificações de parada de um produtor com a fila cheia
+
+
+class StreamingPipeline:
+    def __init__(self, conn, batch_size: int = 1000, max_fila: int = 5000, upsert: bool = False,
+                 ao_gravar: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+                 metricas=None, espelho: bool = False,
+                 houve_falhas: Optional[Callable[[], bool]] = None):
+        """
+        Pipeline produtor/consumidor entre o crawl da API e a carga do bronze.
+
+        Os produtores (geradores de registros do crawl) rodam em threads e
+        alimentam uma fila limitada; o consumidor grava lotes no bronze e faz
+        commit a cada lote, então a memória fica limitada a ``max_fila`` +
+        ``batch_size`` registros e as linhas ficam duráveis durante o crawl.
+
+        :param conn: conexão psycopg2 usada pelo consumidor
+        :param batch_size: registros por lote gravado (e por commit)
+        :param max_fila: tamanho máximo da fila entre crawl e carga
+        :param upsert: grava com ON CONFLICT (modo incremental)
+        :param ao_gravar: chamado com cada lote logo após o commit (ex.: para
+            marcar as chaves como concluídas no checkpoint)
+        :param metricas: services.metrics.Metricas opcional; o tempo de
+            gravação dos lotes é acumulado na etapa "bronze"
+        :param espelho: carga completa por diferença (BronzeLoader espelho):
+            no fim, as chaves que não vieram são apagadas do bronze
+        :param houve_falhas: consultado no fim do crawl; se True, a remoção do
+            espelho é pulada. O crawl não levanta exceção em marca, modelo ou
+            preço que falhou (só registra no checkpoint), e uma falha não
+            pode ser confundida com um preço que sumiu da tabela FIPE
+        """
+        self.conn = conn
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.ao_gravar = ao_gravar
+        self.metricas = metricas
+        self.houve_falhas = houve_falhas
+        self.loader = BronzeLoader(conn, batch_size=batch_size, espelho=espelho)
+        self._fila = queue.Queue(maxsize=max_fila)
+        self._erros = []
+        self._parar = threading.Event()
+
+    def _colocar(self, item) -> bool:
+        """put na fila que desiste (False) se o consumidor parou: ninguém mais a esvazia."""
+        while not self._parar.is_set():
+            try:
+                self._fila.put(item, timeout=ESPERA_FILA)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _produzir(self, registros: Iterable[Dict[str, Any]]):
+        try:
+            for r in registros:
+                if not self._colocar(r):
+                    return
+        except Exception as e:
+            self._erros.append(e)
+        finally:
+            self._colocar(_FIM)
+
+    def _gravar(self, lote) -> Set[Tuple[str, str, str]]:
+        inicio = time.monotonic()
+        bytes_antes = self.loader.bytes_enviados
+
+        _, alterados = self.loader.carregar(lote, upsert=self.upsert)
+        self.conn.commit()
+
+        if self.metricas:
+            self.metricas.acumular(
+                "bronze", time.monotonic() - inicio,
+                linhas=len(lote), bytes_=self.loader.bytes_enviados - bytes_antes
+            )
+        if self.ao_gravar:
+            self.ao_gravar(lote)
+        return alterados
+
+    def executar(self, *produtores: Iterable[Dict[str, Any]]) -> Tuple[int, Set[Tuple[str, str, str]]]:
+        """
+        Consome todos os produtores e grava no bronze em lotes.
+
+        :return: (total de registros gravados, trios (tipo_veiculo, marca, modelo) alterados
+            ou removidos — só preenchido no upsert/espelho)
+        """
+        self._parar.clear()
+        threads = [
+            threading.Thread(target=self._produzir, args=(p,), daemon=True)
+            for p in produtores
+        ]
+        for t in threads:
+            t.start()
+
+        total = 0
+        alterados = set()
+        lote = []
+        ativos = len(threads)
+
+        try:
+            while ativos:
+                item = self._fila.get()
+                if item is _FIM:
+                    ativos -= 1
+                    continue
+
+                lote.append(item)
+                if len(lote) >= self.batch_size:
+                    alterados |= self._gravar(lote)
+                    total += len(lote)
+                    print(f"BRONZE: lote gravado ({total} registros até agora)")
+                    lote = []
+
+            if lote:
+                alterados |= self._gravar(lote)
+                total += len(lote)
+        finally:
+            # Com erro na gravação, os produtores presos na fila cheia param
+            # em vez de esperar para sempre; a exceção segue depois do join
+            self._parar.set()
+            for t in threads:
+                t.join()
+
+        if self._erros:
+            raise self._erros[0]
+
+        # Só depois de um crawl sem erro: falha no meio não pode apagar o bronze
+        if self.loader.espelho:
+            if self.houve_falhas and self.houve_falhas():
+                print("BRONZE: crawl com falhas, remoção das chaves que não vieram pulada")
+            else:
+                alterados |= self.loader.remover_nao_vistos()
+                self.conn.commit()
+
+        return total, alterados
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+import threading
+import time
+
+
+class TokenBucket:
+    def __init__(self, taxa: float, capacidade: int = 1):
+        """
+        Limitador de requisições global (token bucket), seguro entre threads.
+
+        :param taxa: quantidade de requisições liberadas por segundo
+        :param capacidade: rajada máxima de requisições acumuladas
+        """
+        if taxa <= 0:
+            raise ValueError("taxa deve ser maior que zero")
+        if capacidade < 1:
+            raise ValueError("capacidade deve ser pelo menos 1")
+
+        self.taxa = taxa
+        self.capacidade = capacidade
+        self._tokens = float(capacidade)
+        self._ultimo = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _repor(self, agora: float):
+        decorrido = agora - self._ultimo
+        self._tokens = min(self.capacidade, self._tokens + decorrido * self.taxa)
+        self._ultimo = agora
+
+    def acquire(self):
+        """Bloqueia até existir um token disponível e o consome."""
+        while True:
+            with self._lock:
+                self._repor(time.monotonic())
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                espera = (1 - self._tokens) / self.taxa
+
+            time.sleep(espera)
@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+import sys
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+
+_intern = sys.intern
+
+# Ano usado pela FIPE para veículos "zero km" (ex.: codigo_ano "32000-1")
+ANO_ZERO_KM = 32000
+
+
+@dataclass(frozen=True, slots=True)
+class RegistroFipe:
+    """
+    Um preço coletado da API, do crawl até a carga do bronze.
+
+    Com ``__slots__`` não há um dict por registro, e os textos que se repetem
+    (tipo, marca, modelo, código do ano, mês de referência) são internados:
+    todos os registros de um modelo apontam para a mesma string. Só os
+    campos usados são guardados — nada do JSON da resposta fica vivo.
+
+    Valor e mês seguem como texto da API; o parse é feito em lote por
+    services.normalizacao na hora da carga.
+    """
+    tipo_veiculo: str
+    marca: str
+    modelo: str
+    cod_marca: int
+    cod_modelo: int
+    cod_ano: str
+    valor_str: Optional[str]
+    mes_referencia: Optional[str]
+    codigo_fipe: Optional[str]
+
+    @classmethod
+    def da_api(cls, nome_marca: str, marca: Dict[str, Any], modelo: Dict[str, Any],
+               ano: Dict[str, Any], preco: Dict[str, Any], tipo_veiculo: str = "motos") -> "RegistroFipe":
+        mes = preco.get("MesReferencia")
+        return cls(
+            tipo_veiculo=_intern(tipo_veiculo),
+            marca=_intern(nome_marca),
+            modelo=_intern(modelo["nome"]),
+            cod_marca=int(marca["codigo"]),
+            cod_modelo=int(modelo["codigo"]),
+            cod_ano=_intern(str(ano["codigo"])),
+            valor_str=preco.get("Valor"),
+            mes_referencia=_intern(mes) if mes is not None else None,
+            codigo_fipe=preco.get("CodigoFipe"),
+        )
+
+    @property
+    def ano(self) -> str:
+        """Mesmo valor de cod_ano (o registro antigo guardava os dois)."""
+        return self.cod_ano
+
+    def __getitem__(self, campo: str) -> Any:
+        # Leitura no estilo do registro antigo (dict): r["marca"]
+        try:
+            return getattr(self, campo)
+        except AttributeError:
+            raise KeyError(campo) from None
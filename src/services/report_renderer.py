@@ -0,0 +1,267 @@
+# -*- coding: utf-8 -*-
+import csv
+import hashlib
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import matplotlib
+matplotlib.use("Agg")  # sem janela: roda em workers headless
+import matplotlib.pyplot as plt
+
+MANIFESTO = ".manifest.json"
+FORMATOS_PADRAO = ("png", "svg")
+
+# Muda quando o desenho dos gráficos mudar, para invalidar o cache
+VERSAO_RENDER = 1
+
+
+# ================================================================
+#   DESENHO (roda nos processos worker)
+# ================================================================
+def _salvar(fig, base: str, formatos: Sequence[str]) -> List[str]:
+    caminhos = []
+    for fmt in formatos:
+        caminho = f"{base}.{fmt}"
+        fig.savefig(caminho, format=fmt, bbox_inches="tight")
+        caminhos.append(caminho)
+    plt.close(fig)
+    return caminhos
+
+
+def _escrever_csv(base: str, cabecalho: Sequence[str], linhas: List[Tuple]) -> str:
+    caminho = f"{base}.csv"
+    with open(caminho, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(cabecalho)
+        writer.writerows(linhas)
+    return caminho
+
+
+def desenhar_top_silver(base, linhas, formatos, titulo):
+    modelos = [r[0] for r in linhas]
+    valores = [float(r[1]) for r in linhas]
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.bar(modelos, valores, edgecolor="black")
+    ax.set_title(titulo)
+    ax.set_xlabel("Modelo")
+    ax.set_ylabel("Valor (R$)")
+    ax.tick_params(axis="x", labelrotation=45)
+    for rotulo in ax.get_xticklabels():
+        rotulo.set_ha("right")
+
+    return [_escrever_csv(base, ["Modelo", "Valor"], linhas)] + _salvar(fig, base, formatos)
+
+
+def desenhar_top_por_marca(base, linhas, formatos, titulo):
+    marcas = sorted({r[0] for r in linhas})
+    fig, axes = plt.subplots(len(marcas), 1, figsize=(10, 3.5 * len(marcas)), squeeze=False)
+
+    for ax, marca in zip(axes[:, 0], marcas):
+        da_marca = [r for r in linhas if r[0] == marca]
+        ax.barh([r[1] for r in da_marca][::-1], [float(r[2]) for r in da_marca][::-1], edgecolor="black")
+        ax.set_title(marca)
+        ax.set_xlabel("Valor (R$)")
+
+    fig.suptitle(titulo)
+    return [_escrever_csv(base, ["Marca", "Modelo", "Valor"], linhas)] + _salvar(fig, base, formatos)
+
+
+def desenhar_distribuicao(base, linhas, formatos, titulo):
+    faixas = [float(r[0]) for r in linhas]
+    qtds = [r[1] for r in linhas]
+    largura = (faixas[1] - faixas[0]) if len(faixas) > 1 else 1.0
+
+    fig, ax = plt.subplots(figsize=(10, 5))
+    ax.bar(faixas, qtds, width=largura, align="edge", edgecolor="black")
+    ax.set_title(titulo)
+    ax.set_xlabel("Valor (R$)")
+    ax.set_ylabel("Quantidade de preços")
+
+    return [_escrever_csv(base, ["Faixa", "Quantidade"], linhas)] + _salvar(fig, base, formatos)
+
+
+def desenhar_resumo_gold(base, linhas, formatos, titulo):
+    rotulos = [f"{r[0]} {r[1]}" for r in linhas]
+    medias = [float(r[2]) for r in linhas]
+
+    fig, ax = plt.subplots(figsize=(10, max(4, 0.3 * len(linhas))))
+    ax.barh(rotulos[::-1], medias[::-1], edgecolor="black")
+    ax.set_title(titulo)
+    ax.set_xlabel("Média (R$)")
+
+    return [_escrever_csv(base, ["Marca", "Modelo", "Media", "Registros"], linhas)] + _salvar(fig, base, formatos)
+
+
+# ================================================================
+#   CATÁLOGO DE RELATÓRIOS
+# ================================================================
+# nome → (consulta, função de desenho, título)
+RELATORIOS: Dict[str, Tuple[str, Callable, str]] = {
+    "top10_silver": (
+        """
+        SELECT modelo, valor_numeric
+        FROM silver.fipe_limited
+        WHERE %(tipo_top10)s::text IS NULL OR tipo_veiculo = %(tipo_top10)s
+        ORDER BY valor_numeric DESC, modelo
+        LIMIT 10;
+        """,
+        desenhar_top_silver,
+        "TOP 10 FIPE{rotulo_tipo} — Faixa {faixa_min}k a {faixa_max}k",
+    ),
+    "top_por_marca": (
+        """
+        SELECT marca || ' (' || tipo_veiculo || ')', modelo, valor_numeric
+        FROM (
+            SELECT tipo_veiculo, marca, modelo, valor_numeric,
+                   ROW_NUMBER() OVER (PARTITION BY tipo_veiculo, marca
+                                      ORDER BY valor_numeric DESC, modelo) AS pos
+            FROM silver.fipe_limited
+        ) t
+        WHERE pos <= %(top_n)s
+        ORDER BY tipo_veiculo, marca, pos;
+        """,
+        desenhar_top_por_marca,
+        "TOP {top_n} por marca — Faixa {faixa_min}k a {faixa_max}k",
+    ),
+    "distribuicao_precos": (
+        """
+        SELECT FLOOR(valor_numeric / %(largura_faixa)s) * %(largura_faixa)s AS faixa, COUNT(*)
+        FROM bronze.fipe_raw
+        WHERE valor_numeric IS NOT NULL
+        GROUP BY 1
+        ORDER BY 1;
+        """,
+        desenhar_distribuicao,
+        "Distribuição de preços (bronze)",
+    ),
+    "resumo_gold": (
+        """
+        SELECT marca, modelo, media_valor, qtd_registros
+        FROM gold.fipe_summary
+        ORDER BY media_valor DESC, marca, modelo
+        LIMIT 30;
+        """,
+        desenhar_resumo_gold,
+        "Média por modelo (gold)",
+    ),
+}
+
+
+def hash_resultado(nome: str, linhas: List[Tuple], formatos: Sequence[str], titulo: str) -> str:
+    """sha256 do resultado da consulta + o que muda o desenho (título, formatos, versão)."""
+    conteudo = json.dumps([VERSAO_RENDER, nome, titulo, list(formatos), linhas], default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+class ReportRenderer:
+    def __init__(self, conn, pasta: str = "relatorios", formatos: Sequence[str] = FORMATOS_PADRAO,
+                 max_workers: int = 4, faixa: Tuple[int, int] = (18000, 30000), top_n: int = 5,
+                 largura_faixa: int = 5000, tipo_top10: Optional[str] = None):
+        """
+        Gera os relatórios (CSV + gráficos) sem backend interativo.
+
+        Cada relatório é consultado no banco e o resultado vira um sha256; se
+        bate com o manifesto da última execução e os arquivos ainda existem,
+        o relatório não é redesenhado. Os que mudaram são desenhados em
+        paralelo em processos separados (matplotlib não é thread-safe).
+
+        :param conn: conexão psycopg2 aberta
+        :param pasta: diretório de saída (o manifesto fica nele)
+        :param formatos: formatos de imagem gerados (png, svg, pdf...)
+        :param max_workers: processos de desenho simultâneos
+        :param faixa: faixa de preço do silver (só para os títulos)
+        :param top_n: modelos por marca no relatório top_por_marca
+        :param largura_faixa: largura (R$) de cada barra da distribuição
+        :param tipo_top10: limita o top10_silver a um tipo de veículo
+            (None = todos os tipos do silver)
+        """
+        self.conn = conn
+        self.pasta = pasta
+        self.formatos = tuple(formatos)
+        self.max_workers = max_workers
+        self.parametros = {
+            "top_n": top_n,
+            "largura_faixa": largura_faixa,
+            "faixa_min": faixa[0] // 1000,
+            "faixa_max": faixa[1] // 1000,
+            "tipo_top10": tipo_top10,
+            "rotulo_tipo": f" ({tipo_top10})" if tipo_top10 else "",
+        }
+
+    def _carregar_manifesto(self) -> Dict[str, Any]:
+        caminho = os.path.join(self.pasta, MANIFESTO)
+        if not os.path.exists(caminho):
+            return {}
+        try:
+            with open(caminho, encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _salvar_manifesto(self, manifesto: Dict[str, Any]):
+        caminho = os.path.join(self.pasta, MANIFESTO)
+        temp = caminho + ".tmp"
+        with open(temp, "w", encoding="utf-8") as f:
+            json.dump(manifesto, f, indent=2, sort_keys=True)
+        os.replace(temp, caminho)
+
+    def _consultar(self, sql: str) -> List[Tuple]:
+        cur = self.conn.cursor()
+        cur.execute(sql, self.parametros)
+        linhas = [tuple(r) for r in cur.fetchall()]
+        cur.close()
+        return linhas
+
+    def gerar(self, nomes: Iterable[str] = tuple(RELATORIOS)) -> Dict[str, str]:
+        """
+        Gera os relatórios pedidos.
+
+        Returns:
+            dict: artefatos novos ou alterados, {"relatorios/<arquivo>": caminho local}
+            — só esses precisam ser enviados ao MinIO
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        manifesto = self._carregar_manifesto()
+
+        pendentes = []
+        for nome in nomes:
+            sql, desenhar, titulo = RELATORIOS[nome]
+            linhas = self._consultar(sql)
+            titulo = titulo.format(**self.parametros)
+
+            if not linhas:
+                print(f"RELATÓRIO {nome}: sem dados, ignorado")
+                continue
+
+            digest = hash_resultado(nome, linhas, self.formatos, titulo)
+            anterior = manifesto.get(nome, {})
+            if anterior.get("sha256") == digest and all(os.path.exists(a) for a in anterior.get("arquivos", [])):
+                print(f"RELATÓRIO {nome}: sem mudança, reaproveitado")
+                continue
+
+            base = os.path.join(self.pasta, nome)
+            pendentes.append((nome, digest, desenhar, base, linhas, titulo))
+
+        # O commit encerra a transação aberta pelas consultas
+        self.conn.commit()
+
+        alterados = {}
+        if pendentes:
+            with ProcessPoolExecutor(max_workers=min(self.max_workers, len(pendentes))) as pool:
+                futuros = [
+                    (nome, digest, pool.submit(desenhar, base, linhas, self.formatos, titulo))
+                    for nome, digest, desenhar, base, linhas, titulo in pendentes
+                ]
+                for nome, digest, fut in futuros:
+                    arquivos = fut.result()
+                    manifesto[nome] = {"sha256": digest, "arquivos": arquivos}
+                    for caminho in arquivos:
+                        alterados[f"relatorios/{os.path.basename(caminho)}"] = caminho
+                    print(f"RELATÓRIO {nome}: gerado ({', '.join(os.path.basename(a) for a in arquivos)})")
+
+            self._salvar_manifesto(manifesto)
+
+        return alterados
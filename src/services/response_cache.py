@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Optional
+
+# TTL padrão (segundos) por endpoint do catálogo. A tabela FIPE muda no
+# máximo uma vez por mês, então o catálogo pode ficar alguns dias em cache;
+# depois disso ele é revalidado (ETag / Last-Modified) em vez de baixado de novo.
+TTL_PADRAO = {
+    "marcas": 7 * 24 * 3600,
+    "modelos": 7 * 24 * 3600,
+    "anos": 7 * 24 * 3600,
+}
+
+
+class ResponseCache:
+    def __init__(self, caminho: str = ".cache/fipe_http.sqlite",
+                 ttl_por_endpoint: Optional[Dict[str, int]] = None,
+                 max_bytes: int = 50 * 1024 * 1024):
+        """
+        Cache persistente em disco (SQLite) das respostas da API, chaveado pela URL.
+
+        :param caminho: arquivo SQLite do cache
+        :param ttl_por_endpoint: TTL em segundos por endpoint; endpoints fora
+            do dicionário não são cacheados
+        :param max_bytes: tamanho máximo das respostas armazenadas; acima disso
+            as entradas menos acessadas são removidas
+        """
+        self.caminho = caminho
+        self.ttl_por_endpoint = dict(TTL_PADRAO if ttl_por_endpoint is None else ttl_por_endpoint)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+        pasta = os.path.dirname(caminho)
+        if pasta:
+            os.makedirs(pasta, exist_ok=True)
+
+        self._conn = sqlite3.connect(caminho, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS respostas (
+                url TEXT PRIMARY KEY,
+                endpoint TEXT NOT NULL,
+                corpo TEXT NOT NULL,
+                tamanho INTEGER NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                salvo_em REAL NOT NULL,
+                acessado_em REAL NOT NULL
+            )
+        """)
+        self._conn.commit()
+
+    def cacheavel(self, endpoint: Optional[str]) -> bool:
+        return endpoint is not None and endpoint in self.ttl_por_endpoint
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """
+        Retorna a entrada do cache para a URL (ou None).
+
+        A chave ``fresca`` indica se a entrada ainda está dentro do TTL; quando
+        não está, ``etag``/``last_modified`` servem para a revalidação.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT endpoint, corpo, etag, last_modified, salvo_em FROM respostas WHERE url = ?",
+                (url,)
+            ).fetchone()
+
+            if not row:
+                return None
+
+            endpoint, corpo, etag, last_modified, salvo_em = row
+            agora = time.time()
+            self._conn.execute("UPDATE respostas SET acessado_em = ? WHERE url = ?", (agora, url))
+            self._conn.commit()
+
+        ttl = self.ttl_por_endpoint.get(endpoint, 0)
+        return {
+            "dados": json.loads(corpo),
+            "etag": etag,
+            "last_modified": last_modified,
+            "fresca": agora - salvo_em < ttl,
+        }
+
+    def put(self, url: str, endpoint: str, dados: Any,
+            etag: Optional[str] = None, last_modified: Optional[str] = None):
+        corpo = json.dumps(dados, ensure_ascii=False)
+        agora = time.time()
+
+        with self._lock:
+            self._conn.execute("""
+                INSERT OR REPLACE INTO respostas
+                (url, endpoint, corpo, tamanho, etag, last_modified, salvo_em, acessado_em)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """, (url, endpoint, corpo, len(corpo.encode("utf-8")), etag, last_modified, agora, agora))
+            self._evict()
+            self._conn.commit()
+
+    def renovar(self, url: str):
+        """Marca a entrada como fresca novamente (resposta 304 do servidor)."""
+        agora = time.time()
+        with self._lock:
+            self._conn.execute(
+                "UPDATE respostas SET salvo_em = ?, acessado_em = ? WHERE url = ?",
+                (agora, agora, url)
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(tamanho), 0) FROM respostas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        # Remove as entradas menos acessadas até voltar ao limite
+        excedente = total - self.max_bytes
+        for url, tamanho in self._conn.execute(
+                "SELECT url, tamanho FROM respostas ORDER BY acessado_em ASC").fetchall():
+            if excedente <= 0:
+                break
+            self._conn.execute("DELETE FROM respostas WHERE url = ?", (url,))
+            excedente -= tamanho
+
+    def limpar(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM respostas")
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,138 @@
+# -*- coding: utf-8 -*-
+import json
+import re
+import zlib
+from dataclasses import dataclass, field, replace
+from typing import Any, Dict, FrozenSet, Optional, Tuple
+
+from services.fipe_api_client import parse_valor_fipe
+from services.registro import ANO_ZERO_KM
+
+
+def shard_da_chave(codigo_marca: Any, codigo_modelo: Any, total_shards: int) -> int:
+    """
+    Shard de um par (marca, modelo). Usa crc32 (e não ``hash``, que muda a
+    cada processo) para que todas as máquinas cheguem à mesma divisão.
+    """
+    return zlib.crc32(f"{int(codigo_marca)}:{int(codigo_modelo)}".encode()) % total_shards
+
+
+@dataclass(frozen=True)
+class SelecaoCrawl:
+    """
+    O que coletar da API, aplicado o mais cedo possível na árvore do crawl:
+
+    - marcas: antes de buscar os modelos da marca
+    - modelos (regex) e shard: antes de buscar os anos do modelo
+    - ano_min/ano_max: antes de buscar o preço de cada ano
+    - faixa_preco: depois do preço (a API não filtra por valor), antes do bronze
+
+    Campos vazios/None não filtram nada.
+
+    max_modelos é o limite de modelos com preço por marca somando todos os
+    shards: cada shard coleta a sua parte (``max_modelos_do_shard``), contada
+    só entre os modelos que são dele.
+    """
+    marcas: Optional[FrozenSet[str]] = None
+    modelos: Tuple[str, ...] = ()
+    ano_min: Optional[int] = None
+    ano_max: Optional[int] = None
+    incluir_zero_km: bool = True
+    faixa_preco: Optional[Tuple[float, float]] = None
+    max_modelos: Optional[int] = None
+    shard: int = 0
+    total_shards: int = 1
+    _regex: Tuple[re.Pattern, ...] = field(default=(), init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.marcas is not None:
+            object.__setattr__(self, "marcas", frozenset(m.upper() for m in self.marcas))
+        object.__setattr__(self, "modelos", tuple(self.modelos))
+        object.__setattr__(self, "_regex", tuple(re.compile(p, re.IGNORECASE) for p in self.modelos))
+        if self.faixa_preco is not None:
+            object.__setattr__(self, "faixa_preco", tuple(self.faixa_preco))
+
+        if self.total_shards < 1 or not 0 <= self.shard < self.total_shards:
+            raise ValueError(f"shard {self.shard} inválido para {self.total_shards} shards")
+        if self.ano_min is not None and self.ano_max is not None and self.ano_min > self.ano_max:
+            raise ValueError("ano_min maior que ano_max")
+
+    # ------------------------------------------------------------
+    #   CONSTRUÇÃO
+    # ------------------------------------------------------------
+    @classmethod
+    def from_dict(cls, dados: Dict[str, Any]) -> "SelecaoCrawl":
+        conhecidos = {"marcas", "modelos", "ano_min", "ano_max", "incluir_zero_km",
+                      "faixa_preco", "max_modelos", "shard", "total_shards"}
+        desconhecidos = set(dados) - conhecidos
+        if desconhecidos:
+            raise ValueError(f"Campos desconhecidos na seleção: {sorted(desconhecidos)}")
+        return cls(**dados)
+
+    @classmethod
+    def carregar(cls, caminho: str) -> "SelecaoCrawl":
+        """Lê a seleção de um arquivo JSON (mesmos campos da dataclass)."""
+        with open(caminho, encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+    def com_shard(self, shard: int, total_shards: int) -> "SelecaoCrawl":
+        return replace(self, shard=shard, total_shards=total_shards)
+
+    @property
+    def fragmentada(self) -> bool:
+        return self.total_shards > 1
+
+    @property
+    def max_modelos_do_shard(self) -> Optional[int]:
+        """Parte de max_modelos deste shard (os primeiros shards levam o resto da divisão)."""
+        if self.max_modelos is None:
+            return None
+        parte, resto = divmod(self.max_modelos, self.total_shards)
+        return parte + (1 if self.shard < resto else 0)
+
+    def descricao(self) -> str:
+        partes = [", ".join(sorted(self.marcas)) if self.marcas else "todas as marcas"]
+        if self.max_modelos is not None:
+            neste = f", {self.max_modelos_do_shard} neste shard" if self.fragmentada else ""
+            partes.append(f"{self.max_modelos} modelos cada{neste}")
+        if self.modelos:
+            partes.append(f"modelos ~ {' | '.join(self.modelos)}")
+        if self.ano_min is not None or self.ano_max is not None:
+            partes.append(f"anos {self.ano_min or '...'}–{self.ano_max or '...'}")
+        if self.faixa_preco:
+            partes.append(f"R$ {self.faixa_preco[0]:,.0f}–{self.faixa_preco[1]:,.0f}")
+        if self.fragmentada:
+            partes.append(f"shard {self.shard + 1}/{self.total_shards}")
+        return " — ".join(partes)
+
+    # ------------------------------------------------------------
+    #   FILTROS (do mais barato/alto da árvore para o mais baixo)
+    # ------------------------------------------------------------
+    def aceita_marca(self, nome: str) -> bool:
+        return self.marcas is None or nome.upper() in self.marcas
+
+    def aceita_modelo(self, codigo_marca: Any, modelo: Dict[str, Any]) -> bool:
+        if self._regex and not any(r.search(modelo["nome"]) for r in self._regex):
+            return False
+        if self.fragmentada:
+            return shard_da_chave(codigo_marca, modelo["codigo"], self.total_shards) == self.shard
+        return True
+
+    def aceita_ano(self, codigo_ano: str) -> bool:
+        ano_txt = str(codigo_ano).split("-", 1)[0]
+        if not ano_txt.isdigit():
+            return True
+        ano = int(ano_txt)
+        if ano == ANO_ZERO_KM:
+            return self.incluir_zero_km
+        if self.ano_min is not None and ano < self.ano_min:
+            return False
+        if self.ano_max is not None and ano > self.ano_max:
+            return False
+        return True
+
+    def aceita_preco(self, preco: Dict[str, Any]) -> bool:
+        if not self.faixa_preco:
+            return True
+        valor = parse_valor_fipe(preco.get("Valor"))
+        return valor is not None and self.faixa_preco[0] <= valor <= self.faixa_preco[1]
@@ -0,0 +1,317 @@
+# -*- coding: utf-8 -*-
+import os
+import shutil
+import time
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from services.parquet_export import TABELAS_EXPORTACAO
+
+SNAPSHOT_DIR = "snapshots"
+ARQUIVO_ATUAL = "ATUAL"       # nome da pasta do último snapshot completo
+MANTER_SNAPSHOTS = 3          # execuções guardadas (leitores antigos seguem válidos)
+CARENCIA_SNAPSHOTS = 600      # segundos que um snapshot substituído ainda fica em disco
+TENTATIVAS_ABERTURA = 3       # releituras do ATUAL se o snapshot sumir ao abrir
+LINHAS_POR_LOTE = 65536       # linhas máximas por record batch
+
+# Camada → (tabela, colunas do SELECT, schema Arrow, coluna de ano, coluna de valor).
+# O silver ganha o ano numérico (de ano_modelo "2020-1") para o filtro por ano;
+# o gold não tem ano.
+_SCHEMA_SILVER = TABELAS_EXPORTACAO["silver"][2].append(pa.field("ano", pa.int32()))
+CAMADAS_SNAPSHOT = {
+    "bronze": (
+        "bronze.fipe_raw",
+        [campo.name for campo in TABELAS_EXPORTACAO["bronze"][2]],
+        TABELAS_EXPORTACAO["bronze"][2],
+        "ano",
+        "valor_numeric",
+    ),
+    "silver": (
+        "silver.fipe_limited",
+        [campo.name for campo in TABELAS_EXPORTACAO["silver"][2]]
+        + ["NULLIF(split_part(ano_modelo, '-', 1), '')::int AS ano"],
+        _SCHEMA_SILVER,
+        "ano",
+        "valor_numeric",
+    ),
+    "gold": (
+        "gold.fipe_summary",
+        [campo.name for campo in TABELAS_EXPORTACAO["gold"][2]],
+        TABELAS_EXPORTACAO["gold"][2],
+        None,
+        "media_valor",
+    ),
+}
+
+
+def _texto(v: Any) -> str:
+    return "" if v is None else str(v)
+
+
+def _estatisticas(lote: pa.RecordBatch, col_ano: Optional[str], col_valor: str) -> Dict[str, str]:
+    """Metadados do lote usados para pulá-lo sem olhar as linhas."""
+    meta = {
+        "tipo_veiculo": lote["tipo_veiculo"][0].as_py(),
+        "marca": lote["marca"][0].as_py(),
+    }
+    for nome, col in (("ano", col_ano), ("valor", col_valor)):
+        if col is None:
+            continue
+        extremos = pc.min_max(lote[col])
+        meta[f"{nome}_min"] = _texto(extremos["min"].as_py())
+        meta[f"{nome}_max"] = _texto(extremos["max"].as_py())
+    return meta
+
+
+# ================================================================
+#   GRAVAÇÃO — UM SNAPSHOT POR EXECUÇÃO
+# ================================================================
+class SnapshotWriter:
+    def __init__(self, conn, pasta: str = SNAPSHOT_DIR, manter: int = MANTER_SNAPSHOTS,
+                 carencia: float = CARENCIA_SNAPSHOTS, linhas_por_fetch: int = 10000):
+        """
+        Grava bronze/silver/gold em arquivos Arrow IPC (``<camada>.arrow``)
+        para análise local, sem consultar o Postgres de produção.
+
+        Cada execução grava numa pasta nova e só no fim troca o ponteiro
+        ``ATUAL``: quem está lendo o snapshot anterior não vê arquivos pela
+        metade. Os arquivos vão sem compressão para poderem ser mapeados em
+        memória e lidos sem cópia.
+
+        Cada record batch tem uma só (tipo_veiculo, marca) e leva nos
+        metadados os mínimos e máximos de ano e valor; é o que a leitura usa
+        para pular lotes inteiros (SnapshotFipe.ler).
+
+        :param conn: conexão psycopg2 aberta
+        :param pasta: raiz dos snapshots
+        :param manter: snapshots mantidos (os mais antigos são apagados)
+        :param carencia: segundos desde a troca do ATUAL antes de um snapshot
+            excedente ser apagado (leitores que acabaram de resolver o
+            ponteiro ainda conseguem abri-lo)
+        :param linhas_por_fetch: linhas buscadas por round trip do cursor
+        """
+        self.conn = conn
+        self.pasta = pasta
+        self.manter = manter
+        self.carencia = carencia
+        self.linhas_por_fetch = linhas_por_fetch
+
+    def _lotes(self, camada: str) -> Iterable[pa.RecordBatch]:
+        tabela, colunas, schema, _, _ = CAMADAS_SNAPSHOT[camada]
+
+        cur = self.conn.cursor(name=f"snapshot_{camada}")
+        cur.itersize = self.linhas_por_fetch
+        cur.execute(f"SELECT {', '.join(colunas)} FROM {tabela} ORDER BY tipo_veiculo, marca, modelo;")
+
+        chave_atual = None
+        linhas: List[Tuple] = []
+        for row in cur:
+            chave = (row[0], row[1])
+            if linhas and (chave != chave_atual or len(linhas) >= LINHAS_POR_LOTE):
+                yield self._lote(schema, linhas)
+                linhas = []
+            chave_atual = chave
+            linhas.append(row)
+
+        if linhas:
+            yield self._lote(schema, linhas)
+        cur.close()
+
+    @staticmethod
+    def _lote(schema: pa.Schema, linhas: List[Tuple]) -> pa.RecordBatch:
+        colunas = list(zip(*linhas))
+        return pa.record_batch(
+            [pa.array(colunas[i], type=campo.type) for i, campo in enumerate(schema)],
+            schema=schema
+        )
+
+    def _nova_pasta(self) -> str:
+        nome = time.strftime("%Y%m%dT%H%M%S")
+        sufixo = 1
+        while os.path.exists(os.path.join(self.pasta, nome)):
+            nome = f"{time.strftime('%Y%m%dT%H%M%S')}_{sufixo}"
+            sufixo += 1
+        return nome
+
+    def _apagar_antigos(self, atual: str):
+        """
+        Apaga os snapshots além dos ``manter`` mais novos, mas só os que
+        deixaram de ser o atual há mais de ``carencia`` segundos (o momento
+        em que o seguinte terminou de ser gravado).
+        """
+        execucoes = sorted(
+            d for d in os.listdir(self.pasta)
+            if os.path.isdir(os.path.join(self.pasta, d))
+        )
+        excedentes = execucoes[:max(len(execucoes) - self.manter, 0)]
+        limite = time.time() - self.carencia
+        for nome, seguinte in zip(excedentes, execucoes[1:]):
+            if os.path.getmtime(os.path.join(self.pasta, seguinte)) <= limite:
+                shutil.rmtree(os.path.join(self.pasta, nome), ignore_errors=True)
+
+    def gravar(self, camadas: Iterable[str] = ("bronze", "silver", "gold")) -> Dict[str, Dict[str, int]]:
+        """
+        Grava o snapshot das camadas pedidas e o torna o atual.
+
+        Returns:
+            dict: por camada, linhas, record batches e bytes gravados
+        """
+        os.makedirs(self.pasta, exist_ok=True)
+        nome = self._nova_pasta()
+        destino = os.path.join(self.pasta, nome)
+        os.makedirs(destino)
+
+        resultado = {}
+        for camada in camadas:
+            _, _, schema, col_ano, col_valor = CAMADAS_SNAPSHOT[camada]
+            caminho = os.path.join(destino, f"{camada}.arrow")
+            linhas = lotes = 0
+
+            with pa.OSFile(caminho, "wb") as arquivo, pa.ipc.new_file(arquivo, schema) as writer:
+                for lote in self._lotes(camada):
+                    writer.write_batch(lote, custom_metadata=_estatisticas(lote, col_ano, col_valor))
+                    linhas += lote.num_rows
+                    lotes += 1
+
+            resultado[camada] = {"linhas": linhas, "lotes": lotes, "bytes": os.path.getsize(caminho)}
+            print(f"SNAPSHOT {camada.upper()}: {linhas} linhas em {lotes} lotes "
+                  f"({resultado[camada]['bytes'] / 1024:.1f} KiB)")
+
+        # Cursores server-side abrem transação; encerra antes das próximas etapas
+        self.conn.commit()
+
+        # Troca atômica do ponteiro: leitores passam a abrir o snapshot novo
+        tmp = os.path.join(self.pasta, f".{ARQUIVO_ATUAL}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(nome)
+        os.replace(tmp, os.path.join(self.pasta, ARQUIVO_ATUAL))
+
+        self._apagar_antigos(nome)
+        print(f"SNAPSHOT OK! {destino}/")
+        return resultado
+
+
+# ================================================================
+#   LEITURA — MAPEADA EM MEMÓRIA, COM PODA POR LOTE
+# ================================================================
+class SnapshotFipe:
+    def __init__(self, pasta: str = SNAPSHOT_DIR):
+        """
+        Leitura do último snapshot gravado por SnapshotWriter.
+
+        Os arquivos são mapeados em memória: abrir é imediato e as colunas
+        lidas apontam direto para o arquivo (sem cópia). Todas as camadas
+        são mapeadas já na abertura, então a retenção do SnapshotWriter pode
+        apagar a pasta depois sem afetar a leitura; se ela sumir entre ler o
+        ATUAL e mapear os arquivos, o ponteiro é lido de novo. Os filtros por
+        marca, ano e valor primeiro descartam lotes inteiros pelos metadados
+        e só depois filtram as linhas dos lotes que sobraram.
+
+        Exemplo:
+            snap = SnapshotFipe()
+            df = snap.ler("silver", marcas=["HONDA"], ano_min=2020, valor_max=25000).to_pandas()
+
+        :param pasta: raiz dos snapshots
+        """
+        for tentativa in range(TENTATIVAS_ABERTURA):
+            with open(os.path.join(pasta, ARQUIVO_ATUAL), encoding="utf-8") as f:
+                self.execucao = f.read().strip()
+            self.caminho = os.path.join(pasta, self.execucao)
+            try:
+                self._leitores: Dict[str, pa.ipc.RecordBatchFileReader] = {
+                    camada: self._abrir(camada)
+                    for camada in CAMADAS_SNAPSHOT
+                    if os.path.exists(os.path.join(self.caminho, f"{camada}.arrow"))
+                }
+                break
+            except FileNotFoundError:
+                # Apagado pela retenção entre a leitura do ponteiro e o mmap
+                if tentativa == TENTATIVAS_ABERTURA - 1:
+                    raise
+
+    def _abrir(self, camada: str) -> pa.ipc.RecordBatchFileReader:
+        return pa.ipc.open_file(pa.memory_map(os.path.join(self.caminho, f"{camada}.arrow"), "r"))
+
+    def _leitor(self, camada: str) -> pa.ipc.RecordBatchFileReader:
+        if camada not in self._leitores:
+            self._leitores[camada] = self._abrir(camada)
+        return self._leitores[camada]
+
+    def schema(self, camada: str) -> pa.Schema:
+        return self._leitor(camada).schema
+
+    def ler(self, camada: str, tipo_veiculo: Optional[str] = None, marcas: Optional[Iterable[str]] = None,
+            ano_min: Optional[int] = None, ano_max: Optional[int] = None,
+            valor_min: Optional[float] = None, valor_max: Optional[float] = None,
+            colunas: Optional[List[str]] = None) -> pa.Table:
+        """
+        Linhas da camada que passam em todos os filtros informados.
+
+        :param camada: "bronze", "silver" ou "gold"
+        :param tipo_veiculo: carros, motos ou caminhoes
+        :param marcas: nomes das marcas (sem diferenciar maiúsculas)
+        :param ano_min: ano-modelo mínimo (bronze e silver; 32000 é zero km)
+        :param ano_max: ano-modelo máximo
+        :param valor_min: preço mínimo (no gold, a média)
+        :param valor_max: preço máximo
+        :param colunas: colunas devolvidas (padrão: todas)
+        :return: pyarrow.Table
+        """
+        _, _, _, col_ano, col_valor = CAMADAS_SNAPSHOT[camada]
+        if col_ano is None and (ano_min is not None or ano_max is not None):
+            raise ValueError(f"a camada {camada} não tem ano")
+
+        leitor = self._leitor(camada)
+        marcas = {m.upper() for m in marcas} if marcas is not None else None
+        faixas = [
+            (nome, col, minimo, maximo)
+            for nome, col, minimo, maximo in (("ano", col_ano, ano_min, ano_max),
+                                              ("valor", col_valor, valor_min, valor_max))
+            if minimo is not None or maximo is not None
+        ]
+
+        lotes = []
+        for i in range(leitor.num_record_batches):
+            lote, meta = leitor.get_batch_with_custom_metadata(i)
+            meta = {k.decode(): v.decode() for k, v in meta.items()}
+            if tipo_veiculo is not None and meta["tipo_veiculo"] != tipo_veiculo:
+                continue
+            if marcas is not None and meta["marca"].upper() not in marcas:
+                continue
+
+            mascara = None
+            descartar = False
+            for nome, col, minimo, maximo in faixas:
+                menor, maior = meta[f"{nome}_min"], meta[f"{nome}_max"]
+                if not menor:  # coluna toda nula no lote
+                    descartar = True
+                    break
+                menor, maior = Decimal(menor), Decimal(maior)
+                if ((minimo is not None and maior < Decimal(str(minimo)))
+                        or (maximo is not None and menor > Decimal(str(maximo)))):
+                    descartar = True
+                    break
+                # Lote inteiro dentro da faixa (e sem nulos): nada a filtrar
+                if ((minimo is None or menor >= Decimal(str(minimo)))
+                        and (maximo is None or maior <= Decimal(str(maximo)))
+                        and lote[col].null_count == 0):
+                    continue
+                cond = pc.and_kleene(
+                    pc.greater_equal(lote[col], minimo) if minimo is not None else pa.scalar(True),
+                    pc.less_equal(lote[col], maximo) if maximo is not None else pa.scalar(True),
+                )
+                mascara = cond if mascara is None else pc.and_kleene(mascara, cond)
+            if descartar:
+                continue
+
+            if mascara is not None:
+                lote = lote.filter(mascara)
+            if colunas is not None:
+                lote = lote.select(colunas)
+            lotes.append(lote)
+
+        schema = leitor.schema if colunas is None else pa.schema([leitor.schema.field(c) for c in colunas])
+        return pa.Table.from_batches(lotes, schema=schema)
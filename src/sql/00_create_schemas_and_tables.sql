@@ -8,9 +8,11 @@ CREATE SCHEMA IF NOT EXISTS gold;
 -- =====================================================
 -- BRONZE — DADOS CRUDOS DA API FIPE
 -- (EXATAMENTE COMO O PYTHON INSERE)
+-- Uma partição por tipo de veículo (carros, motos, caminhões)
 -- =====================================================
 CREATE TABLE IF NOT EXISTS bronze.fipe_raw (
-    id SERIAL PRIMARY KEY,
+    id BIGSERIAL,
+    tipo_veiculo VARCHAR(10) NOT NULL,
 
     marca VARCHAR(50) NOT NULL,
     modelo VARCHAR(100) NOT NULL,
@@ -21,8 +23,33 @@ CREATE TABLE IF NOT EXISTS bronze.fipe_raw (
     codigo_ano VARCHAR(20) NOT NULL,
 
     valor VARCHAR(30),
-    valor_numeric NUMERIC(12,2)
-);
+    valor_numeric NUMERIC(12,2),
+
+    mes_referencia DATE,
+    codigo_fipe VARCHAR(20),
+
+    ano INTEGER,
+    combustivel SMALLINT,
+    zero_km BOOLEAN NOT NULL DEFAULT FALSE,
+
+    -- Hash da linha normalizada: o upsert pula preços idênticos
+    hash_conteudo BIGINT,
+
+    PRIMARY KEY (tipo_veiculo, id)
+) PARTITION BY LIST (tipo_veiculo);
+
+CREATE TABLE IF NOT EXISTS bronze.fipe_raw_carros
+    PARTITION OF bronze.fipe_raw FOR VALUES IN ('carros');
+CREATE TABLE IF NOT EXISTS bronze.fipe_raw_motos
+    PARTITION OF bronze.fipe_raw FOR VALUES IN ('motos');
+CREATE TABLE IF NOT EXISTS bronze.fipe_raw_caminhoes
+    PARTITION OF bronze.fipe_raw FOR VALUES IN ('caminhoes');
+
+-- Chave natural do modo incremental (upsert por mês de referência). Mês nulo
+-- também conflita (Postgres 15+), senão cada carga duplicaria a chave
+CREATE UNIQUE INDEX IF NOT EXISTS uq_bronze_chave_mes
+    ON bronze.fipe_raw(tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia)
+    NULLS NOT DISTINCT;
 
 CREATE INDEX IF NOT EXISTS idx_bronze_marca
     ON bronze.fipe_raw(marca);
@@ -39,6 +66,7 @@ CREATE INDEX IF NOT EXISTS idx_bronze_valor
 CREATE TABLE IF NOT EXISTS silver.fipe_limited (
     id SERIAL PRIMARY KEY,
 
+    tipo_veiculo VARCHAR(10) NOT NULL,
     marca VARCHAR(50) NOT NULL,
     modelo VARCHAR(100) NOT NULL,
     ano_modelo VARCHAR(10) NOT NULL,
@@ -49,12 +77,17 @@ CREATE TABLE IF NOT EXISTS silver.fipe_limited (
 CREATE INDEX IF NOT EXISTS idx_silver_valor
     ON silver.fipe_limited(valor_numeric);
 
+CREATE INDEX IF NOT EXISTS idx_silver_chave
+    ON silver.fipe_limited(tipo_veiculo, marca, modelo)
+    INCLUDE (ano_modelo, valor_numeric);
+
 -- =====================================================
 -- GOLD — VISÃO ANALÍTICA (MÉDIAS POR MODELO)
 -- =====================================================
 CREATE TABLE IF NOT EXISTS gold.fipe_summary (
     id SERIAL PRIMARY KEY,
 
+    tipo_veiculo VARCHAR(10) NOT NULL,
     marca VARCHAR(50) NOT NULL,
     modelo VARCHAR(100) NOT NULL,
 
@@ -65,6 +98,142 @@ CREATE TABLE IF NOT EXISTS gold.fipe_summary (
 CREATE INDEX IF NOT EXISTS idx_gold_media
     ON gold.fipe_summary(media_valor);
 
+-- Chave natural estável: o refresh aplica só a diferença (ids mantidos).
+-- Bancos com o índice antigo, sem INCLUDE, têm o índice recriado por
+-- services/medallion_refresh.criar_tabelas_medallion
+CREATE UNIQUE INDEX IF NOT EXISTS uq_gold_chave
+    ON gold.fipe_summary(tipo_veiculo, marca, modelo)
+    INCLUDE (media_valor, qtd_registros);
+
+-- =====================================================
+-- GOLD — FEED DE MUDANÇAS (SÓ INSERT)
+-- Um lote por refresh; consumidores aplicam os lotes novos
+-- =====================================================
+CREATE SEQUENCE IF NOT EXISTS gold.fipe_summary_lote_seq;
+
+CREATE TABLE IF NOT EXISTS gold.fipe_summary_changes (
+    id BIGSERIAL PRIMARY KEY,
+    lote BIGINT NOT NULL,
+    operacao VARCHAR(6) NOT NULL CHECK (operacao IN ('insert', 'update', 'delete')),
+
+    tipo_veiculo VARCHAR(10) NOT NULL,
+    marca VARCHAR(50) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+
+    media_valor NUMERIC(12,2),
+    qtd_registros INTEGER,
+    media_anterior NUMERIC(12,2),
+    qtd_anterior INTEGER,
+
+    registrado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_gold_changes_lote
+    ON gold.fipe_summary_changes(lote);
+
+-- Lotes já publicados no MinIO por destino (um a um: com refreshes
+-- concorrentes um lote menor pode ter commit depois de um maior)
+CREATE TABLE IF NOT EXISTS gold.fipe_summary_lotes_exportados (
+    destino TEXT NOT NULL,
+    lote BIGINT NOT NULL,
+    exportado_em TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (destino, lote)
+);
+
+-- Digest de cada camada e digest de entrada da última execução de cada etapa
+-- (services/digest.py); etapas com a mesma entrada são puladas
+CREATE TABLE IF NOT EXISTS gold.fipe_digests (
+    nome TEXT PRIMARY KEY,
+    digest TEXT NOT NULL,
+    linhas BIGINT,
+    atualizado_em TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- =====================================================
+-- GOLD — CAMADA DE CONSULTA (services/consulta_fipe.py)
+-- Preço vigente de cada modelo-ano (todas as faixas) e histograma de preços
+-- =====================================================
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE TABLE IF NOT EXISTS gold.fipe_precos_vigentes (
+    tipo_veiculo VARCHAR(10) NOT NULL,
+    marca VARCHAR(50) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    ano_modelo VARCHAR(10) NOT NULL,
+
+    codigo_fipe VARCHAR(20),
+    valor_numeric NUMERIC(12,2) NOT NULL,
+    mes_referencia DATE
+);
+
+CREATE INDEX IF NOT EXISTS idx_vigentes_chave
+    ON gold.fipe_precos_vigentes (tipo_veiculo, marca, modelo, ano_modelo)
+    INCLUDE (valor_numeric, codigo_fipe, mes_referencia);
+
+CREATE INDEX IF NOT EXISTS idx_vigentes_valor
+    ON gold.fipe_precos_vigentes (tipo_veiculo, valor_numeric)
+    INCLUDE (marca, modelo, ano_modelo);
+
+CREATE INDEX IF NOT EXISTS idx_vigentes_modelo_trgm
+    ON gold.fipe_precos_vigentes USING gin (modelo gin_trgm_ops);
+
+CREATE TABLE IF NOT EXISTS gold.fipe_faixas_preco (
+    tipo_veiculo VARCHAR(10) NOT NULL,
+    faixa_inicio NUMERIC(12,2) NOT NULL,
+    faixa_fim NUMERIC(12,2) NOT NULL,
+
+    qtd_precos INTEGER NOT NULL,
+    qtd_modelos INTEGER NOT NULL,
+    preco_min NUMERIC(12,2),
+    preco_max NUMERIC(12,2),
+
+    PRIMARY KEY (tipo_veiculo, faixa_inicio)
+);
+
+-- =====================================================
+-- BRONZE — HISTÓRICO PARTICIONADO POR MÊS DE REFERÊNCIA
+-- (as partições mensais fipe_history_pAAAA_MM são criadas pelo Python)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS bronze.fipe_history (
+    tipo_veiculo VARCHAR(10) NOT NULL,
+    marca VARCHAR(50) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    ano_modelo VARCHAR(10) NOT NULL,
+
+    codigo_marca INTEGER NOT NULL,
+    codigo_modelo INTEGER NOT NULL,
+    codigo_ano VARCHAR(20) NOT NULL,
+
+    valor VARCHAR(30),
+    valor_numeric NUMERIC(12,2),
+
+    mes_referencia DATE NOT NULL,
+    codigo_fipe VARCHAR(20),
+    carregado_em TIMESTAMP NOT NULL DEFAULT NOW(),
+
+    PRIMARY KEY (tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia)
+) PARTITION BY RANGE (mes_referencia);
+
+CREATE INDEX IF NOT EXISTS idx_history_ultimo_preco
+    ON bronze.fipe_history (tipo_veiculo, marca, modelo, ano_modelo, mes_referencia DESC)
+    INCLUDE (valor_numeric);
+
+-- =====================================================
+-- GOLD — DEPRECIAÇÃO MÊS A MÊS (A PARTIR DO HISTÓRICO)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS gold.fipe_depreciacao (
+    tipo_veiculo VARCHAR(10) NOT NULL,
+    marca VARCHAR(50) NOT NULL,
+    modelo VARCHAR(100) NOT NULL,
+    mes_referencia DATE NOT NULL,
+
+    media_valor NUMERIC(12,2),
+    variacao_media_pct NUMERIC(8,2),
+    qtd_registros INTEGER,
+
+    PRIMARY KEY (tipo_veiculo, marca, modelo, mes_referencia)
+);
+
 -- =====================================================
 -- ANALYZE (OTIMIZAÇÃO)
 -- =====================================================
@@ -0,0 +1,163 @@
+# conftest.py
+import contextlib
+import uuid
+
+import pytest
+
+from services.db_connection import DBConnection
+
+SCHEMAS_MEDALLION = ("bronze", "silver", "gold")
+
+
+# ================================================================
+#   BANCO FALSO — SÓ PARA TESTES SEM SQL (CACHE, RELATÓRIOS, SNAPSHOT)
+# ================================================================
+class CursorFalso:
+    """
+    Cursor em memória. Cada execute procura, em ``conn.respostas``, o
+    primeiro trecho de SQL contido no comando e devolve as linhas dele (ou
+    o retorno da função, chamada com sql e params). Sem trecho, nada.
+    """
+
+    def __init__(self, conn, nome=None):
+        self.conn = conn
+        self.nome = nome
+        self.itersize = None
+        self.resultado = []
+        self.rowcount = 0
+
+    def execute(self, sql, params=None):
+        self.conn.executados.append((self.nome, sql, params))
+        self.resultado = []
+        for trecho, resposta in self.conn.respostas.items():
+            if trecho in sql:
+                self.resultado = list((resposta(sql, params) if callable(resposta) else resposta) or [])
+                break
+        self.rowcount = len(self.resultado)
+
+    def fetchone(self):
+        return self.resultado[0] if self.resultado else None
+
+    def fetchall(self):
+        return self.resultado
+
+    def __iter__(self):
+        return iter(self.resultado)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class ConexaoFalsa:
+    def __init__(self, respostas=None):
+        self.respostas = dict(respostas or {})
+        self.executados = []
+
+    def cursor(self, name=None):
+        return CursorFalso(self, name)
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+
+class BancoFalso:
+    """No lugar de DBConnection: ``conexao()`` empresta sempre a mesma ConexaoFalsa."""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    @contextlib.contextmanager
+    def conexao(self):
+        yield self.conn
+
+    def closeall(self):
+        pass
+
+
+@pytest.fixture
+def conexao_falsa():
+    """Fábrica: ``conexao_falsa({"trecho do SQL": linhas ou função})``."""
+    return ConexaoFalsa
+
+
+@pytest.fixture
+def banco_falso():
+    """Fábrica: ``banco_falso(conexao_falsa(...))``."""
+    return BancoFalso
+
+
+# ================================================================
+#   POSTGRES DE VERDADE (O SERVIÇO DO CI, VIA DB_HOST/DB_*)
+# ================================================================
+@pytest.fixture(scope="session")
+def _banco_sessao():
+    """
+    Cria um banco descartável no servidor das variáveis DB_* e o apaga no
+    fim; nada é gravado no banco configurado. Sem servidor, os testes que
+    dependem dele são pulados.
+    """
+    conn = DBConnection.from_env(connect_timeout=3).connect()
+    if conn is None:
+        pytest.skip("Postgres indisponível (DB_HOST/DB_*)")
+
+    nome = f"fipe_teste_{uuid.uuid4().hex[:8]}"
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE DATABASE {nome};")
+
+    banco = DBConnection.from_env(dbname=nome, maxconn=8, connect_timeout=3)
+    try:
+        yield banco
+    finally:
+        banco.closeall()
+        with conn.cursor() as cur:
+            cur.execute(f"DROP DATABASE IF EXISTS {nome} WITH (FORCE);")
+        conn.close()
+
+
+@pytest.fixture
+def banco(_banco_sessao):
+    """DBConnection do banco de teste; cada teste começa sem bronze/silver/gold."""
+    yield _banco_sessao
+    with _banco_sessao.conexao() as conn:
+        cur = conn.cursor()
+        cur.execute(f"DROP SCHEMA IF EXISTS {', '.join(SCHEMAS_MEDALLION)} CASCADE;")
+        conn.commit()
+
+
+@pytest.fixture
+def conn(banco):
+    """Uma conexão do pool do banco de teste."""
+    with banco.conexao() as c:
+        yield c
+
+
+def _registro(marca, modelo, cod_ano, valor, mes="outubro de 2026 ", tipo="motos",
+              cod_marca=None, cod_modelo=None):
+    return {
+        "tipo_veiculo": tipo,
+        "marca": marca,
+        "modelo": modelo,
+        "ano": cod_ano,
+        "cod_marca": cod_marca if cod_marca is not None else sum(map(ord, marca)),
+        "cod_modelo": cod_modelo if cod_modelo is not None else sum(map(ord, modelo)),
+        "cod_ano": cod_ano,
+        "valor_str": valor,
+        "mes_referencia": mes,
+        "codigo_fipe": "811179-0",
+    }
+
+
+@pytest.fixture
+def registro():
+    """Fábrica de registros do crawl: ``registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00")``."""
+    return _registro
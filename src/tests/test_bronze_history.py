@@ -0,0 +1,101 @@
+# test_bronze_history.py
+import contextlib
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+
+from services.bronze_history import BronzeHistory
+from services.bronze_loader import BronzeLoader, criar_tabela_bronze
+
+SETEMBRO = "setembro de 2026 "
+OUTUBRO = "outubro de 2026 "
+NOVEMBRO = "novembro de 2026 "
+
+
+def _silenciar():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+@pytest.fixture
+def arquivar(conn):
+    """Grava registros no bronze e os copia para o histórico."""
+    with _silenciar():
+        criar_tabela_bronze(conn.cursor())
+    conn.commit()
+
+    def _arquivar(registros, retencao_meses=24):
+        historico = BronzeHistory(conn, retencao_meses=retencao_meses)
+        with _silenciar():
+            BronzeLoader(conn).carregar(registros, upsert=True)
+            conn.commit()
+            historico.arquivar()
+        return historico
+
+    return _arquivar
+
+
+def _meses_no_historico(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT DISTINCT mes_referencia FROM bronze.fipe_history ORDER BY 1;")
+    return [row[0] for row in cur.fetchall()]
+
+
+def test_mes_novo_ganha_particao_propria(conn, arquivar, registro):
+    historico = arquivar([
+        registro("HONDA", "CG 160", "2024-1", "R$ 20.000,00", mes=SETEMBRO),
+        registro("HONDA", "CG 160", "2024-1", "R$ 19.000,00", mes=OUTUBRO),
+    ])
+    assert historico.particoes(conn.cursor()) == [date(2026, 9, 1), date(2026, 10, 1)]
+
+    arquivar([registro("HONDA", "CG 160", "2024-1", "R$ 18.500,00", mes=NOVEMBRO)])
+
+    assert historico.particoes(conn.cursor()) == [date(2026, 9, 1), date(2026, 10, 1), date(2026, 11, 1)]
+    cur = conn.cursor()
+    cur.execute("SELECT tableoid::regclass::text, valor_numeric FROM bronze.fipe_history WHERE mes_referencia = '2026-11-01';")
+    assert cur.fetchall() == [("bronze.fipe_history_p2026_11", Decimal("18500.00"))]
+
+
+def test_retencao_apaga_so_particoes_fora_da_janela(conn, arquivar, registro):
+    historico = arquivar([
+        registro("HONDA", "CG 160", "2024-1", "R$ 20.000,00", mes=SETEMBRO),
+        registro("HONDA", "CG 160", "2024-1", "R$ 19.000,00", mes=OUTUBRO),
+    ], retencao_meses=1)
+
+    # Janela de um mês em outubro ainda cobre setembro
+    with _silenciar():
+        assert historico.aplicar_retencao(hoje=date(2026, 10, 18)) == []
+        assert historico.aplicar_retencao(hoje=date(2026, 11, 1)) == ["fipe_history_p2026_09"]
+
+    assert historico.particoes(conn.cursor()) == [date(2026, 10, 1)]
+    assert _meses_no_historico(conn) == [date(2026, 10, 1)]
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass('bronze.fipe_history_p2026_09');")
+    assert cur.fetchone() == (None,)
+
+
+def test_depreciacao_compara_cada_modelo_ano_com_o_mes_anterior(conn, arquivar, registro):
+    historico = arquivar([
+        registro("HONDA", "CG 160", "2024-1", "R$ 20.000,00", mes=SETEMBRO),
+        registro("HONDA", "CG 160", "2024-1", "R$ 19.000,00", mes=OUTUBRO),   # -5%
+        registro("HONDA", "CG 160", "2023-1", "R$ 18.000,00", mes=SETEMBRO),
+        registro("HONDA", "CG 160", "2023-1", "R$ 18.000,00", mes=OUTUBRO),   # 0%
+        registro("YAMAHA", "FAZER 250", "2024-1", "R$ 22.000,00", mes=OUTUBRO),  # sem mês anterior
+        registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00", mes=OUTUBRO, tipo="carros"),
+    ])
+    with _silenciar():
+        assert historico.refresh_depreciacao(meses=2, hoje=date(2026, 10, 18)) == 4
+
+    cur = conn.cursor()
+    cur.execute("""
+        SELECT tipo_veiculo, marca, modelo, mes_referencia, media_valor, variacao_media_pct, qtd_registros
+        FROM gold.fipe_depreciacao
+        ORDER BY 1, 2, 3, 4;
+    """)
+    assert cur.fetchall() == [
+        ("carros", "HONDA", "CG 160", date(2026, 10, 1), Decimal("21000.00"), None, 1),
+        ("motos", "HONDA", "CG 160", date(2026, 9, 1), Decimal("19000.00"), None, 2),
+        ("motos", "HONDA", "CG 160", date(2026, 10, 1), Decimal("18500.00"), Decimal("-2.50"), 2),
+        ("motos", "YAMAHA", "FAZER 250", date(2026, 10, 1), Decimal("22000.00"), None, 1),
+    ]
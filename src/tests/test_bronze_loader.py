@@ -0,0 +1,88 @@
+# test_bronze_loader.py
+import contextlib
+import io
+
+import pytest
+
+from services.bronze_loader import BronzeLoader, criar_tabela_bronze
+
+
+def _carregar(conn, registros, **kwargs):
+    upsert = kwargs.pop("upsert", True)
+    with contextlib.redirect_stdout(io.StringIO()):
+        loader = BronzeLoader(conn, **kwargs)
+        total, alterados = loader.carregar(registros, upsert=upsert)
+        removidos = loader.remover_nao_vistos() if loader.espelho else set()
+    conn.commit()
+    return total, alterados, removidos
+
+
+def _bronze(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT marca, modelo, codigo_ano, valor FROM bronze.fipe_raw ORDER BY 1, 2, 3;")
+    return cur.fetchall()
+
+
+@pytest.fixture
+def bronze(conn):
+    with contextlib.redirect_stdout(io.StringIO()):
+        criar_tabela_bronze(conn.cursor())
+    conn.commit()
+    return conn
+
+
+@pytest.mark.parametrize("metodo", ["copy", "values"])
+def test_chave_repetida_no_lote_fica_com_a_ultima_copia(bronze, registro, metodo):
+    _, alterados, _ = _carregar(bronze, [
+        registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00"),
+        registro("HONDA", "CG 160", "2024-1", "R$ 21.500,00"),
+    ], metodo=metodo)
+
+    assert alterados == {("motos", "HONDA", "CG 160")}
+    assert _bronze(bronze) == [("HONDA", "CG 160", "2024-1", "R$ 21.500,00")]
+
+
+def test_mes_nulo_nao_duplica_a_chave(bronze, registro):
+    sem_mes = [registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00", mes=None)]
+    _carregar(bronze, sem_mes)
+    _carregar(bronze, sem_mes)
+
+    assert len(_bronze(bronze)) == 1
+
+
+def test_indice_antigo_e_recriado_sem_as_copias(bronze, registro):
+    cur = bronze.cursor()
+    cur.execute("DROP INDEX bronze.uq_bronze_chave_mes;")
+    cur.execute("""
+        CREATE UNIQUE INDEX uq_bronze_chave_mes
+            ON bronze.fipe_raw(tipo_veiculo, codigo_marca, codigo_modelo, codigo_ano, mes_referencia);
+    """)
+    bronze.commit()
+    sem_mes = [registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00", mes=None)]
+    _carregar(bronze, sem_mes)
+    _carregar(bronze, sem_mes)
+    assert len(_bronze(bronze)) == 2
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        criar_tabela_bronze(cur)
+    bronze.commit()
+    assert len(_bronze(bronze)) == 1
+    _carregar(bronze, sem_mes)
+    assert len(_bronze(bronze)) == 1
+
+
+def test_espelho_pula_iguais_e_remove_so_o_que_sumiu(bronze, registro):
+    cg = registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00")
+    biz = registro("HONDA", "BIZ 125", "2024-1", "R$ 19.000,00")
+    sem_mes = registro("YAMAHA", "FAZER 250", "2023-1", "R$ 22.000,00", mes=None)
+    _carregar(bronze, [cg, biz, sem_mes], espelho=True)
+
+    # Mesma carga: nada regravado, nada removido
+    total, alterados, removidos = _carregar(bronze, [cg, biz, sem_mes], espelho=True)
+    assert (total, alterados, removidos) == (3, set(), set())
+
+    mais_caro = registro("HONDA", "CG 160", "2024-1", "R$ 21.300,00")
+    _, alterados, removidos = _carregar(bronze, [mais_caro, sem_mes], espelho=True)
+    assert alterados == {("motos", "HONDA", "CG 160")}
+    assert removidos == {("motos", "HONDA", "BIZ 125")}
+    assert [linha[1] for linha in _bronze(bronze)] == ["CG 160", "FAZER 250"]
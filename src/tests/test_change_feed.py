@@ -0,0 +1,80 @@
+# test_change_feed.py
+import contextlib
+import io
+import json
+
+import pytest
+
+from services.change_feed import ChangeFeedExporter
+from services.medallion_refresh import criar_tabelas_medallion
+
+
+class _Minio:
+    def __init__(self):
+        self.objetos = {}
+
+    def put_object(self, bucket, nome, dados, tamanho, content_type=None):
+        self.objetos[nome] = dados.read(tamanho)
+
+
+def _novo_lote(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT nextval('gold.fipe_summary_lote_seq');")
+    return cur.fetchone()[0]
+
+
+def _registrar(conn, operacao, modelo, media, lote=None):
+    """Um refresh: lote da sequence + a mudança, sem commit."""
+    lote = lote or _novo_lote(conn)
+    conn.cursor().execute("""
+        INSERT INTO gold.fipe_summary_changes
+            (lote, operacao, tipo_veiculo, marca, modelo, media_valor, qtd_registros)
+        VALUES (%s, %s, 'motos', 'HONDA', %s, %s, 3);
+    """, (lote, operacao, modelo, media))
+    return lote
+
+
+@pytest.fixture
+def exportar(conn):
+    criar_tabelas_medallion(conn.cursor())
+    conn.commit()
+    minio = _Minio()
+    exporter = ChangeFeedExporter(conn, minio)
+
+    def _exportar():
+        with contextlib.redirect_stdout(io.StringIO()):
+            return exporter.exportar()
+
+    _exportar.objetos = minio.objetos
+    return _exportar
+
+
+def test_feed_envia_um_ndjson_por_lote_e_so_o_que_e_novo(conn, exportar):
+    _registrar(conn, "insert", "CG 160", "21000.00")
+    lote = _registrar(conn, "insert", "BIZ 125", "19500.50")
+    conn.commit()
+
+    resultado = exportar()
+    assert resultado == {"lotes": 2, "mudancas": 2, "bytes": sum(len(v) for v in exportar.objetos.values())}
+    linhas = exportar.objetos[f"gold/fipe_summary_changes/lote={lote:012d}.ndjson"].splitlines()
+    assert json.loads(linhas[0])["media_valor"] == "19500.50"
+
+    assert exportar()["lotes"] == 0
+    _registrar(conn, "update", "CG 160", "20000.00")
+    conn.commit()
+    assert exportar()["lotes"] == 1
+
+
+def test_lote_menor_com_commit_depois_de_um_maior_nao_se_perde(banco, conn, exportar):
+    # Dois refreshes concorrentes: o primeiro pega o lote menor e comita por último
+    with banco.conexao() as lento:
+        menor = _novo_lote(lento)
+        maior = _registrar(conn, "insert", "BIZ 125", "19000.00")
+        conn.commit()
+        assert exportar()["lotes"] == 1
+        _registrar(lento, "insert", "CG 160", "21000.00", lote=menor)
+        lento.commit()
+
+    assert exportar()["lotes"] == 1
+    assert f"gold/fipe_summary_changes/lote={menor:012d}.ndjson" in exportar.objetos
+    assert menor < maior
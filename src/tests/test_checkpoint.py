@@ -0,0 +1,23 @@
+# test_checkpoint.py
+from services.checkpoint import CrawlCheckpoint, NIVEL_MODELO, NIVEL_PRECO
+
+
+def test_checkpoint_retoma_execucao_interrompida(tmp_path):
+    caminho = str(tmp_path / "cp.sqlite")
+
+    cp = CrawlCheckpoint(caminho)
+    assert cp.iniciar() is False
+    cp.registrar_pendentes(NIVEL_PRECO, [(80, 1, "2020-1"), (80, 1, "2021-1")], {"marca": "HONDA"})
+    cp.marcar_concluidos(NIVEL_PRECO, [(80, 1, "2020-1")])
+    cp.registrar_falha(NIVEL_MODELO, (80, 2), {"marca": "HONDA", "modelo": "CG"})
+    cp.close()
+
+    # Processo "morreu" sem finalizar → a próxima execução retoma
+    cp = CrawlCheckpoint(caminho)
+    assert cp.iniciar() is True
+    assert cp.concluidos(NIVEL_PRECO) == {(80, 1, "2020-1")}
+    assert cp.falhas()[0]["chave"] == (80, 2)
+
+    cp.finalizar()
+    assert cp.iniciar() is False
+    assert cp.concluidos(NIVEL_PRECO) == set()
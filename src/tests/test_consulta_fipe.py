@@ -0,0 +1,64 @@
+# test_consulta_fipe.py
+import contextlib
+import io
+
+from services.bronze_loader import BronzeLoader, criar_tabela_bronze
+from services.consulta_fipe import CacheTTL, ConsultaFipe, atualizar_tabelas_consulta
+
+
+class _Relogio:
+    def __init__(self):
+        self.agora = 0.0
+
+    def __call__(self):
+        return self.agora
+
+
+def test_cache_expira_pelo_ttl_e_descarta_o_menos_usado():
+    relogio = _Relogio()
+    cache = CacheTTL(max_entradas=2, ttl=10, relogio=relogio)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1          # "a" passa a ser o mais recente
+    cache.put("c", 3)                   # sai "b"
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    relogio.agora = 11
+    assert cache.get("a") is None and len(cache) == 1
+
+
+def test_consulta_repetida_vem_do_cache(conexao_falsa, banco_falso):
+    conn = conexao_falsa({"FROM gold.fipe_precos_vigentes": [(21000, "811179-0", None)]})
+    consulta = ConsultaFipe(banco_falso(conn), cache=CacheTTL())
+
+    primeira = consulta.preco("HONDA", "CG 160", "2024", "motos")
+    segunda = consulta.preco("HONDA", "CG 160", "2024", "motos")
+
+    assert primeira == segunda and primeira["valor"] == 21000
+    assert len(conn.executados) == 1
+    assert consulta.cache.acertos == 1
+
+
+def test_tabelas_de_consulta_no_postgres(banco, conn, registro):
+    with contextlib.redirect_stdout(io.StringIO()):
+        criar_tabela_bronze(conn.cursor())
+        BronzeLoader(conn).carregar([
+            registro("HONDA", "CG 160", "2024-1", "R$ 20.000,00", mes="setembro de 2026"),
+            registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00", mes="outubro de 2026"),
+            registro("HONDA", "CB 1000", "2024-1", "R$ 61.000,00"),
+        ], upsert=True)
+        conn.commit()
+        atualizar_tabelas_consulta(conn)
+
+        # Quem está lendo não impede a próxima atualização (nem fica bloqueado por ela)
+        with banco.conexao() as leitor:
+            leitor.cursor().execute("SELECT COUNT(*) FROM gold.fipe_precos_vigentes;")
+            conn.cursor().execute("SET lock_timeout = '1s';")
+            assert atualizar_tabelas_consulta(conn) == (2, 2)
+            leitor.rollback()
+
+    consulta = ConsultaFipe(banco)
+    assert consulta.preco("HONDA", "CG 160", "2024-1")["valor"] == 21000
+    assert [m["modelo"] for m in consulta.modelos_na_faixa(15000, 30000)] == ["CG 160"]
+    assert [(f["inicio"], f["precos"]) for f in consulta.histograma()] == [(20000, 1), (60000, 1)]
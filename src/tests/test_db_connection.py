@@ -1,50 +1,76 @@
-# -*- coding: utf-8 -*-
+# test_db_connection.py
 import psycopg2
+import pytest
+from psycopg2 import extensions
 
+from services.db_connection import DBConnection
 
-class DBConnection:
-    def __init__(self, host, port, dbname, user, password):
-        self.host = host
-        self.port = port
-        self.dbname = dbname
-        self.user = user
-        self.password = password
-        self.connection = None
-
-    def connect(self):
-        try:
-            self.connection = psycopg2.connect(
-                host=self.host,
-                port=self.port,
-                dbname=self.dbname,
-                user=self.user,
-                password=self.password
-            )
-            print(f"Conectado ao banco '{self.dbname}' com sucesso!")
-            return self.connection
-        except Exception as e:
-            print(f"[ERRO] Falha ao conectar: {e}")
-            return None
-
-    def disconnect(self):
-        if self.connection:
-            self.connection.close()
-            print("Conexão encerrada.")
-
-    def get_cursor(self):
-        if self.connection:
-            return self.connection.cursor()
-        return None
-
-
-if __name__ == "__main__":
-    # Teste da conexão
-    db = DBConnection("localhost", 5432, "api_fipe", "postgres", "postgres")
-    conn = db.connect()
-
-    if conn:
-        # Teste simples
-        cur = conn.cursor()
-        cur.execute("SELECT version();")
-
-        db.disconnect()
\ No newline at end of file
+
+class _Cursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, sql, params=None):
+        if not self.conn.viva:
+            raise psycopg2.OperationalError("server closed the connection unexpectedly")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+class _Conexao:
+    def __init__(self, viva):
+        self.viva = viva
+        self.closed = 0
+
+    def cursor(self):
+        return _Cursor(self)
+
+    def rollback(self):
+        pass
+
+    def get_transaction_status(self):
+        return extensions.TRANSACTION_STATUS_IDLE
+
+
+class _Pool:
+    """Entrega as conexões na ordem dada; as descartadas ficam registradas."""
+
+    def __init__(self, conexoes):
+        self.conexoes = list(conexoes)
+        self.descartadas = []
+
+    def getconn(self):
+        return self.conexoes.pop(0)
+
+    def putconn(self, conn, close=False):
+        if close:
+            self.descartadas.append(conn)
+
+
+def _banco(pool):
+    banco = DBConnection("localhost", 5432, "fipe_banco", "postgres", "postgres", maxconn=3)
+    banco._get_pool = lambda: pool
+    return banco
+
+
+def test_descarta_conexoes_mortas_em_sequencia():
+    mortas = [_Conexao(viva=False), _Conexao(viva=False)]
+    boa = _Conexao(viva=True)
+    pool = _Pool(mortas + [boa])
+
+    with _banco(pool).conexao() as conn:
+        assert conn is boa
+    assert pool.descartadas == mortas
+
+
+def test_sem_conexao_saudavel_levanta_erro():
+    pool = _Pool(_Conexao(viva=False) for _ in range(4))
+
+    with pytest.raises(psycopg2.OperationalError):
+        with _banco(pool).conexao():
+            pass
+    assert len(pool.descartadas) == 4
@@ -0,0 +1,41 @@
+# test_delete_table.py
+import contextlib
+import io
+
+from services.delete_table import TABELAS_RESET, DatabaseCleaner
+
+
+def _reset(conexao_falsa, banco_falso, **kwargs):
+    conn = conexao_falsa({
+        "to_regclass(t.nome)": [(tabela, True, 10) for tabela in TABELAS_RESET],
+        "to_regclass('gold.fipe_summary_changes')": [(True,)],
+        "nextval('gold.fipe_summary_lote_seq')": [(7,)],
+    })
+    with contextlib.redirect_stdout(io.StringIO()):
+        relatorio = DatabaseCleaner(banco_falso(conn)).reset_rapido(**kwargs)
+    return relatorio, [(sql.strip(), params) for _, sql, params in conn.executados]
+
+
+def test_reset_zera_derivadas_e_registra_o_gold_no_feed(conexao_falsa, banco_falso):
+    relatorio, executados = _reset(conexao_falsa, banco_falso)
+
+    assert [item["tabela"] for item in relatorio] == TABELAS_RESET
+    exclusoes = [i for i, (sql, _) in enumerate(executados) if sql.startswith("INSERT INTO gold.fipe_summary_changes")]
+    assert len(exclusoes) == 1 and executados[exclusoes[0]][1] == (7,)
+    # Um TRUNCATE só, depois do feed, com todas as tabelas (inclusive o digest)
+    assert executados[-1] == (f"TRUNCATE {', '.join(TABELAS_RESET)} RESTART IDENTITY;", None)
+    assert exclusoes[0] < len(executados) - 1
+
+
+def test_keep_gold_preserva_o_gold_mas_zera_o_digest(conexao_falsa, banco_falso):
+    _, executados = _reset(conexao_falsa, banco_falso, manter=("gold.fipe_summary",))
+
+    truncate = executados[-1][0]
+    assert "gold.fipe_summary," not in truncate and "gold.fipe_digests" in truncate
+    assert not any("fipe_summary_changes" in sql for sql, _ in executados)
+
+
+def test_dry_run_so_inspeciona(conexao_falsa, banco_falso):
+    _, executados = _reset(conexao_falsa, banco_falso, dry_run=True)
+
+    assert len(executados) == 1 and "to_regclass(t.nome)" in executados[0][0]
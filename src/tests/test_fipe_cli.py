@@ -0,0 +1,88 @@
+# test_fipe_cli.py
+import os
+import subprocess
+import sys
+
+import pytest
+
+import fipe_cli
+from services.fipe_api_client import TIPOS_VEICULO
+
+SRC = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Como o ``fipe`` instalado: só src no path (sem a raiz do projeto)
+ENV_SO_SRC = {**os.environ, "PYTHONPATH": SRC}
+
+
+def _modulos_carregados(codigo):
+    """Módulos pesados presentes em sys.modules depois de rodar ``codigo`` num processo novo."""
+    saida = subprocess.run(
+        [sys.executable, "-c", codigo + "\nimport sys\n"
+         "print('MODULOS=' + ','.join(m for m in ('pandas', 'pyarrow', 'matplotlib', 'minio', 'insert_api_automacao')"
+         " if m in sys.modules))"],
+        env=ENV_SO_SRC, cwd=SRC, capture_output=True, text=True, check=True
+    )
+    linha = saida.stdout.strip().splitlines()[-1]
+    return set(filter(None, linha.removeprefix("MODULOS=").split(",")))
+
+
+def test_etapas_e_tipos_espelham_o_pipeline():
+    from insert_api_automacao import ETAPAS
+
+    assert fipe_cli.ETAPAS == ETAPAS
+    assert fipe_cli.TIPOS == TIPOS_VEICULO
+
+
+def test_dry_run_nao_importa_o_pipeline(capsys):
+    codigo = "import fipe_cli; fipe_cli.main(['run', '--stages', 'gold', '--since', '2026-09', '--dry-run'])"
+    assert _modulos_carregados(codigo) == set()
+
+    fipe_cli.main(["run", "--stages", "silver,gold,export", "--since", "2026-09", "--dry-run"])
+    saida = capsys.readouterr().out
+    assert "coleta: pulada" in saida
+    assert "modelos com preço desde 2026-09" in saida
+    assert "relatórios: " not in saida
+
+    fipe_cli.main(["run", "--stages", "report", "--force", "--dry-run"])
+    assert "pulado" not in capsys.readouterr().out
+
+
+def test_pipeline_importa_dependencias_pesadas_so_nas_etapas():
+    assert _modulos_carregados("import insert_api_automacao") == {"insert_api_automacao"}
+
+
+def test_script_antigo_delega_para_o_cli():
+    saida = subprocess.run(
+        [sys.executable, os.path.join(SRC, "insert_api_automacao.py"), "--stages", "gold", "--dry-run"],
+        env=ENV_SO_SRC, cwd=SRC, capture_output=True, text=True, check=True
+    )
+    assert "fipe run (dry-run):" in saida.stdout
+    assert "etapas: gold" in saida.stdout
+
+
+def test_reset_preserva_o_gold_com_keep_gold(monkeypatch):
+    from services import db_connection, delete_table
+
+    chamadas = []
+    monkeypatch.setattr(db_connection.DBConnection, "closeall", lambda self: None)
+    monkeypatch.setattr(delete_table.DatabaseCleaner, "reset_rapido",
+                        lambda self, dry_run=False, manter=(): chamadas.append((dry_run, manter)))
+
+    assert fipe_cli.main(["reset", "--keep-gold", "--dry-run"]) == 0
+    assert fipe_cli.main(["reset"]) == 0
+    assert chamadas == [(True, ("gold.fipe_summary",)), (False, ())]
+
+
+def test_argumentos_invalidos():
+    with pytest.raises(SystemExit):
+        fipe_cli.main(["run", "--stages", "gold,deploy"])
+    with pytest.raises(SystemExit):
+        fipe_cli.main(["run", "--since", "setembro"])
+
+
+def test_run_sem_banco_sai_com_erro(monkeypatch, tmp_path, capsys):
+    # Sem servidor no diretório do socket: a conexão falha na hora
+    monkeypatch.setenv("DB_HOST", str(tmp_path))
+    monkeypatch.chdir(tmp_path)  # métricas da execução ficam no tmp
+
+    assert fipe_cli.main(["run", "--stages", "gold"]) == 1
+    assert "ERRO no banco de dados" in capsys.readouterr().out
@@ -0,0 +1,122 @@
+# test_medallion_refresh.py
+import contextlib
+import io
+import threading
+
+import pytest
+
+from services.bronze_loader import BronzeLoader, criar_tabela_bronze
+from services.medallion_refresh import LOCK_CLASSE, MedallionRefresher
+
+
+def _silenciar():
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+@pytest.fixture
+def carregar(conn):
+    """Grava registros no bronze (upsert) e devolve os modelos alterados."""
+    with _silenciar():
+        criar_tabela_bronze(conn.cursor())
+    conn.commit()
+
+    def _carregar(registros):
+        with _silenciar():
+            _, alterados = BronzeLoader(conn).carregar(registros, upsert=True)
+        conn.commit()
+        return alterados
+
+    return _carregar
+
+
+def _gold(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT marca, modelo, media_valor, qtd_registros FROM gold.fipe_summary ORDER BY 1, 2;")
+    return [(marca, modelo, float(media), qtd) for marca, modelo, media, qtd in cur.fetchall()]
+
+
+def _lotes(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT lote, operacao, modelo FROM gold.fipe_summary_changes ORDER BY lote, id;")
+    return cur.fetchall()
+
+
+def test_refresh_completo_e_incremental_aplicam_so_a_diferenca(conn, carregar, registro):
+    carregar([
+        registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00"),
+        registro("HONDA", "CG 160", "2023-1", "R$ 19.000,00"),
+        registro("HONDA", "CB 1000", "2024-1", "R$ 61.000,00"),  # fora da faixa do silver
+        registro("YAMAHA", "FAZER 250", "2024-1", "R$ 22.000,00"),
+    ])
+    refresher = MedallionRefresher(conn)
+    with _silenciar():
+        assert refresher.refresh() == (3, 2)
+    assert _gold(conn) == [("HONDA", "CG 160", 20000.0, 2), ("YAMAHA", "FAZER 250", 22000.0, 1)]
+
+    cur = conn.cursor()
+    cur.execute("SELECT id FROM gold.fipe_summary WHERE modelo = 'FAZER 250';")
+    id_fazer = cur.fetchone()[0]
+
+    alterados = carregar([registro("HONDA", "CG 160", "2024-1", "R$ 23.000,00")])
+    with _silenciar():
+        refresher.refresh_incremental(alterados)
+    assert _gold(conn)[0] == ("HONDA", "CG 160", 21000.0, 2)
+
+    # Só a CG mudou: um update no lote novo, e a Fazer manteve o id
+    assert _lotes(conn)[-1][1:] == ("update", "CG 160")
+    cur.execute("SELECT id FROM gold.fipe_summary WHERE modelo = 'FAZER 250';")
+    assert cur.fetchone()[0] == id_fazer
+
+
+def test_refresh_por_marca_pula_fatia_ocupada_e_apaga_marca_que_saiu(banco, conn, carregar, registro):
+    carregar([
+        registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00"),
+        registro("YAMAHA", "FAZER 250", "2024-1", "R$ 22.000,00"),
+        registro("FIAT", "UNO", "2020-1", "R$ 25.000,00", tipo="carros"),
+    ])
+    refresher = MedallionRefresher(conn)
+    with _silenciar():
+        refresher.refresh()
+
+    # A Fiat sumiu do bronze; a Yamaha está sendo atualizada por outra execução
+    cur = conn.cursor()
+    cur.execute("DELETE FROM bronze.fipe_raw WHERE marca = 'FIAT';")
+    conn.commit()
+    with banco.conexao() as outra:
+        outro = outra.cursor()
+        outro.execute("SELECT pg_advisory_xact_lock(hashtext(%s), hashtext('motos/YAMAHA'));", (LOCK_CLASSE,))
+        with _silenciar():
+            resultado = refresher.refresh_por_marca(banco, max_workers=2)
+        outra.rollback()
+
+    assert resultado["ocupadas"] == [("motos", "YAMAHA")]
+    assert resultado["atualizadas"] == [("carros", "FIAT"), ("motos", "HONDA")]
+    # Um lote por fatia atualizada, o maior no refresher; a Fiat virou 'delete'
+    assert len(resultado["lotes"]) == 2 and refresher.ultimo_lote == resultado["lotes"][-1]
+    assert ("delete", "UNO") in {linha[1:] for linha in _lotes(conn) if linha[0] in resultado["lotes"]}
+    assert [linha[0] for linha in _gold(conn)] == ["HONDA", "YAMAHA"]
+    cur.execute("SELECT COUNT(*) FROM silver.fipe_limited WHERE marca = 'FIAT';")
+    assert cur.fetchone()[0] == 0
+
+
+def test_refresh_incremental_espera_o_lock_da_marca(banco, conn, carregar, registro):
+    carregar([registro("HONDA", "CG 160", "2024-1", "R$ 21.000,00")])
+    refresher = MedallionRefresher(conn)
+    with _silenciar():
+        refresher.refresh()
+    alterados = carregar([registro("HONDA", "CG 160", "2024-1", "R$ 23.000,00")])
+
+    with banco.conexao() as outra:
+        outra.cursor().execute(
+            "SELECT pg_advisory_xact_lock(hashtext(%s), hashtext('motos/HONDA'));", (LOCK_CLASSE,)
+        )
+        with _silenciar():
+            incremental = threading.Thread(target=refresher.refresh_incremental, args=(alterados,))
+            incremental.start()
+            incremental.join(0.5)
+            assert incremental.is_alive()  # esperando a fatia
+            outra.rollback()
+            incremental.join(10)
+
+    assert not incremental.is_alive()
+    assert _gold(conn) == [("HONDA", "CG 160", 23000.0, 1)]
@@ -0,0 +1,34 @@
+# test_metrics.py
+import json
+
+from services.fipe_api_client import EstatisticasHttp
+from services.metrics import Metricas
+
+
+def test_metricas_gera_log_json_e_prometheus(tmp_path):
+    log = tmp_path / "metrics.jsonl"
+    prom = tmp_path / "fipe.prom"
+    metricas = Metricas(str(log), str(prom))
+
+    with metricas.etapa("bronze") as etapa:
+        etapa.linhas = 100
+        etapa.bytes = 2048
+
+    http = EstatisticasHttp()
+    http.registrar("preco", latencia=0.07)
+    http.registrar("preco", latencia=3.0)
+    http.registrar("preco", retry=True)
+    metricas.registrar_http(http)
+    metricas.finalizar()
+
+    eventos = [json.loads(linha) for linha in log.read_text(encoding="utf-8").splitlines()]
+    assert eventos[0]["evento"] == "etapa"
+    assert eventos[0]["etapa"] == "bronze"
+    assert eventos[0]["linhas"] == 100
+    assert eventos[-1]["evento"] == "resumo"
+
+    texto = prom.read_text(encoding="utf-8")
+    assert 'fipe_etapa_linhas{etapa="bronze"} 100' in texto
+    assert 'fipe_http_latencia_segundos_bucket{endpoint="preco",le="0.1"} 1' in texto
+    assert 'fipe_http_latencia_segundos_bucket{endpoint="preco",le="+Inf"} 2' in texto
+    assert 'fipe_http_retries{endpoint="preco"} 1' in texto
@@ -0,0 +1,80 @@
+# test_mock_fipe_server.py
+import contextlib
+import io
+import time
+
+from benchmarks.mock_fipe_server import CatalogoSintetico, MockFipeServer, catalogos_sinteticos
+from services.fipe_api_client import EstatisticasHttp, FipeApiClient
+from services.response_cache import ResponseCache
+
+
+def _crawl_com_erros(catalogo, seed):
+    with MockFipeServer(catalogo, taxa_erro=0.1, seed=seed) as servidor:
+        api = FipeApiClient(retries=5, delay=0.0, base_url=servidor.base_url)
+        with contextlib.redirect_stdout(io.StringIO()):
+            registros = list(api.crawl(max_modelos=None, max_workers=2))
+    return servidor, api, registros
+
+
+def test_crawl_contra_api_local_com_erros_injetados():
+    catalogo = CatalogoSintetico(marcas=2, modelos_por_marca=3, anos_por_modelo=2)
+    servidor, api, registros = _crawl_com_erros(catalogo, seed=1)
+
+    assert len(registros) == catalogo.total_precos
+    assert 0 < servidor.erros_injetados < servidor.requisicoes
+    retries = sum(e["retries"] for e in api.estatisticas.resumo().values())
+    assert 0 < retries <= servidor.erros_injetados
+    assert any(r["cod_ano"].startswith("32000-") for r in registros)
+
+
+def test_erros_injetados_nao_dependem_da_ordem_das_threads():
+    catalogo = CatalogoSintetico(marcas=2, modelos_por_marca=3, anos_por_modelo=2)
+    primeiro, _, _ = _crawl_com_erros(catalogo, seed=1)
+    segundo, _, _ = _crawl_com_erros(catalogo, seed=1)
+
+    assert primeiro.erros_injetados == segundo.erros_injetados
+
+
+def test_crawl_de_varios_tipos_com_estatisticas_compartilhadas():
+    catalogos = catalogos_sinteticos(("carros", "caminhoes"), marcas=1, modelos_por_marca=2, anos_por_modelo=2)
+    estatisticas = EstatisticasHttp()
+
+    with MockFipeServer(catalogos) as servidor:
+        apis = [FipeApiClient(delay=0.0, base_url=servidor.base_url, tipo_veiculo=tipo, estatisticas=estatisticas)
+                for tipo in catalogos]
+        with contextlib.redirect_stdout(io.StringIO()):
+            registros = [r for api in apis for r in api.crawl(max_modelos=None, max_workers=2)]
+
+    por_tipo = {tipo: [r for r in registros if r["tipo_veiculo"] == tipo] for tipo in catalogos}
+    assert {tipo: len(rs) for tipo, rs in por_tipo.items()} == {t: c.total_precos for t, c in catalogos.items()}
+    assert por_tipo["carros"][0]["marca"] == "FIAT"
+    assert sum(e["requisicoes"] for e in estatisticas.resumo().values()) == servidor.requisicoes
+
+
+def test_cache_vencido_e_usado_quando_a_api_falha(tmp_path):
+    catalogo = CatalogoSintetico(marcas=2, modelos_por_marca=1, anos_por_modelo=1)
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl_por_endpoint={"marcas": 0})
+
+    with MockFipeServer(catalogo) as servidor:
+        api = FipeApiClient(retries=2, delay=0.0, base_url=servidor.base_url, cache=cache)
+        marcas = api.get_marcas()
+        servidor.taxa_erro = 1.0
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert api.get_marcas() == marcas
+            assert api.get_modelos(marcas[0]["codigo"]) == []  # sem cache: nada a devolver
+
+    assert len(marcas) == 2
+    assert api.estatisticas.resumo()["marcas"]["erros"] == 1
+
+
+def test_retry_after_longo_fica_limitado_ao_backoff_max():
+    catalogo = CatalogoSintetico(marcas=1, modelos_por_marca=1, anos_por_modelo=1)
+
+    with MockFipeServer(catalogo, taxa_erro=1.0, retry_after="3600") as servidor:
+        api = FipeApiClient(retries=3, delay=0.0, backoff_max=0.05, base_url=servidor.base_url)
+        inicio = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert api.get_marcas() == []
+
+    assert time.perf_counter() - inicio < 5
+    assert servidor.requisicoes == 3
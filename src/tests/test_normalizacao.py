@@ -0,0 +1,87 @@
+# test_normalizacao.py
+import pandas as pd
+
+from services.normalizacao import normalizar_registros
+from services.registro import RegistroFipe
+
+
+def _registro(cod_ano, valor="R$ 24.510,00", mes="outubro de 2026 "):
+    return {
+        "tipo_veiculo": "motos",
+        "marca": "HONDA",
+        "modelo": "ADV 150",
+        "ano": cod_ano,
+        "cod_marca": "80",
+        "cod_modelo": 9071,
+        "cod_ano": cod_ano,
+        "valor_str": valor,
+        "mes_referencia": mes,
+        "codigo_fipe": "811179-0",
+    }
+
+
+def test_normalizar_registros_converte_em_lote():
+    df = normalizar_registros([
+        _registro("2021-1"),
+        _registro("32000-3", valor="R$ 1.024.510,50"),
+        _registro("2019-1", valor=None, mes=None),
+    ])
+
+    assert df["valor_numeric"].iloc[0] == 24510.0
+    assert df["valor_numeric"].iloc[1] == 1024510.5
+    assert pd.isna(df["valor_numeric"].iloc[2])
+
+    assert df["mes_referencia"].iloc[0] == pd.Timestamp(2026, 10, 1)
+    assert pd.isna(df["mes_referencia"].iloc[2])
+
+    assert df["ano"].tolist() == [2021, 32000, 2019]
+    assert df["combustivel"].tolist() == [1, 3, 1]
+    assert df["zero_km"].tolist() == [False, True, False]
+    assert df["codigo_marca"].dtype == "int32"
+    assert df["tipo_veiculo"].tolist() == ["motos"] * 3
+
+
+def test_normalizar_registros_vazio_mantem_schema():
+    df = normalizar_registros([])
+
+    assert df.empty
+    assert "zero_km" in df.columns
+
+
+def test_registro_compacto_normaliza_igual_ao_dict():
+    marca, modelo, preco = {"codigo": "80"}, {"codigo": 9071, "nome": "ADV 150"}, {
+        "Valor": "R$ 24.510,00", "MesReferencia": "outubro de 2026 ", "CodigoFipe": "811179-0"}
+    registros = [RegistroFipe.da_api("HONDA", marca, dict(modelo), {"codigo": c}, dict(preco))
+                 for c in ("2021-1", "32000-3")]
+
+    assert registros[0].modelo is registros[1].modelo  # strings internadas
+    assert registros[0]["cod_ano"] == registros[0].ano == "2021-1"
+    pd.testing.assert_frame_equal(
+        normalizar_registros(registros),
+        normalizar_registros([_registro("2021-1"), _registro("32000-3")])
+    )
+
+
+def test_lote_misturando_registro_compacto_e_dict():
+    marca, modelo, preco = {"codigo": "80"}, {"codigo": 9071, "nome": "ADV 150"}, {
+        "Valor": "R$ 24.510,00", "MesReferencia": "outubro de 2026 ", "CodigoFipe": "811179-0"}
+    compacto = RegistroFipe.da_api("HONDA", marca, modelo, {"codigo": "2021-1"}, preco)
+
+    pd.testing.assert_frame_equal(
+        normalizar_registros([compacto, _registro("32000-3")]),
+        normalizar_registros([_registro("2021-1"), _registro("32000-3")])
+    )
+
+
+def test_hash_conteudo_igual_para_o_mesmo_preco_em_qualquer_lote():
+    sozinho = normalizar_registros([_registro("2021-1")])
+    lote = normalizar_registros([
+        _registro("2019-1"),
+        _registro("2021-1"),
+        _registro("2021-1", valor="R$ 24.610,00"),
+    ])
+
+    assert lote["hash_conteudo"].dtype == "int64"
+    assert lote["hash_conteudo"].iloc[1] == sozinho["hash_conteudo"].iloc[0]
+    # Outro ano (chave) ou outro valor → outro hash
+    assert lote["hash_conteudo"].nunique() == 3
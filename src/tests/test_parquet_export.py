@@ -0,0 +1,36 @@
+# test_parquet_export.py
+import contextlib
+import io
+from decimal import Decimal
+
+from benchmarks.bench_pipeline import DiretorioObjetos
+from services.parquet_export import ParquetExporter
+
+GOLD = [
+    ("motos", "HONDA", "CG 160", Decimal("21000.00"), 2),
+    ("motos", "YAMAHA", "FAZER 250", Decimal("22000.00"), 1),
+]
+
+
+def _objetos(cliente):
+    return sorted(obj.object_name for obj in cliente.list_objects("fipe", prefix="gold/", recursive=True))
+
+
+def test_particao_que_sumiu_do_banco_e_apagada_do_bucket(conexao_falsa, tmp_path):
+    conn = conexao_falsa({"FROM gold.fipe_summary": GOLD})
+    cliente = DiretorioObjetos(str(tmp_path))
+    exporter = ParquetExporter(conn, cliente, max_workers=2)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert exporter.exportar(["gold"])["gold"]["enviados"] == 2
+        conn.respostas["FROM gold.fipe_summary"] = GOLD[:1]
+        resultado = exporter.exportar(["gold"])["gold"]
+
+    assert (resultado["enviados"], resultado["pulados"], resultado["removidos"]) == (0, 1, 1)
+    assert _objetos(cliente) == ["gold/fipe_summary/tipo_veiculo=motos/marca=HONDA/part-0000.parquet"]
+
+    # Camada vazia (ex.: refresh que falhou) não esvazia o bucket
+    conn.respostas["FROM gold.fipe_summary"] = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert exporter.exportar(["gold"])["gold"]["removidos"] == 0
+    assert len(_objetos(cliente)) == 1
@@ -0,0 +1,72 @@
+# test_pipeline.py
+import contextlib
+import io
+import threading
+
+from benchmarks.mock_fipe_server import CatalogoSintetico, MockFipeServer
+from services.bronze_loader import criar_tabela_bronze
+from services.checkpoint import CrawlCheckpoint
+from services.fipe_api_client import FipeApiClient
+from services.pipeline import StreamingPipeline
+
+
+def _carga_completa(conn, servidor, caminho_checkpoint):
+    checkpoint = CrawlCheckpoint(caminho_checkpoint)
+    checkpoint.iniciar()
+    api = FipeApiClient(retries=2, delay=0.0, base_url=servidor.base_url)
+    pipeline = StreamingPipeline(conn, batch_size=10, espelho=True,
+                                 houve_falhas=lambda: bool(checkpoint.falhas()))
+    with contextlib.redirect_stdout(io.StringIO()):
+        pipeline.executar(api.crawl(max_modelos=None, max_workers=2, checkpoint=checkpoint))
+    checkpoint.close()
+
+
+def _por_marca(conn):
+    cur = conn.cursor()
+    cur.execute("SELECT marca, COUNT(*) FROM bronze.fipe_raw GROUP BY 1 ORDER BY 1;")
+    return dict(cur.fetchall())
+
+
+def test_marca_que_falhou_no_crawl_nao_e_apagada_do_bronze(conn, tmp_path):
+    with contextlib.redirect_stdout(io.StringIO()):
+        criar_tabela_bronze(conn.cursor())
+    conn.commit()
+    catalogo = CatalogoSintetico(marcas=2, modelos_por_marca=2, anos_por_modelo=2)
+    caminho = str(tmp_path / "checkpoint.sqlite")
+
+    with MockFipeServer(catalogo) as servidor:
+        _carga_completa(conn, servidor, caminho)
+    antes = _por_marca(conn)
+    assert set(antes) == {"HONDA", "YAMAHA"}
+
+    # 503 em todos os modelos da YAMAHA: falha, não marca que sumiu
+    with MockFipeServer(catalogo, erro_em=("/marcas/101/",)) as servidor:
+        _carga_completa(conn, servidor, caminho)
+
+    assert _por_marca(conn) == antes
+
+
+def test_erro_na_gravacao_para_os_produtores_em_vez_de_travar(conexao_falsa, monkeypatch):
+    pipeline = StreamingPipeline(conexao_falsa(), batch_size=2, max_fila=2)
+
+    def _falhar(lote):
+        raise RuntimeError("COPY falhou")
+
+    monkeypatch.setattr(pipeline, "_gravar", _falhar)
+    erros = []
+    threads_antes = threading.active_count()
+
+    def _executar():
+        try:
+            pipeline.executar(({"n": i} for i in range(1000)), ({"n": i} for i in range(1000)))
+        except RuntimeError as e:
+            erros.append(e)
+
+    execucao = threading.Thread(target=_executar, daemon=True)
+    execucao.start()
+    execucao.join(10)
+
+    assert not execucao.is_alive()
+    assert [str(e) for e in erros] == ["COPY falhou"]
+    # Nenhum produtor ficou preso na fila cheia
+    assert threading.active_count() == threads_antes
@@ -0,0 +1,16 @@
+# test_rate_limiter.py
+import time
+
+from services.rate_limiter import TokenBucket
+
+
+def test_token_bucket_respeita_taxa():
+    bucket = TokenBucket(taxa=50, capacidade=1)
+
+    inicio = time.monotonic()
+    for _ in range(6):
+        bucket.acquire()
+    decorrido = time.monotonic() - inicio
+
+    # 1 token inicial + 5 repostos a 50/s → pelo menos ~0.1s
+    assert decorrido >= 0.09
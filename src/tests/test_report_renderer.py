@@ -0,0 +1,30 @@
+# test_report_renderer.py
+import os
+
+from services.report_renderer import ReportRenderer
+
+
+def test_relatorio_inalterado_nao_e_redesenhado(conexao_falsa, tmp_path):
+    conn = conexao_falsa({"FROM silver.fipe_limited": [("CG 160", 21000), ("BIZ 125", 19000)]})
+    pasta = str(tmp_path)
+
+    primeiro = ReportRenderer(conn, pasta=pasta, formatos=("png",), max_workers=1).gerar(["top10_silver"])
+    assert set(primeiro) == {"relatorios/top10_silver.csv", "relatorios/top10_silver.png"}
+    assert os.path.exists(os.path.join(pasta, "top10_silver.png"))
+
+    segundo = ReportRenderer(conn, pasta=pasta, formatos=("png",), max_workers=1).gerar(["top10_silver"])
+    assert segundo == {}
+
+    conn.respostas["FROM silver.fipe_limited"] = [("CG 160", 22000)]
+    terceiro = ReportRenderer(conn, pasta=pasta, formatos=("png",), max_workers=1).gerar(["top10_silver"])
+    assert "relatorios/top10_silver.png" in terceiro
+
+
+def test_top10_cobre_todos_os_tipos_salvo_se_pedido(conexao_falsa, tmp_path):
+    conn = conexao_falsa({"FROM silver.fipe_limited": [("CG 160", 21000)]})
+
+    ReportRenderer(conn, pasta=str(tmp_path / "todos"), formatos=("png",), max_workers=1).gerar(["top10_silver"])
+    ReportRenderer(conn, pasta=str(tmp_path / "motos"), formatos=("png",), max_workers=1,
+                   tipo_top10="motos").gerar(["top10_silver"])
+
+    assert [params["tipo_top10"] for _, _, params in conn.executados] == [None, "motos"]
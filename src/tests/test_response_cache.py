@@ -0,0 +1,27 @@
+# test_response_cache.py
+from services.response_cache import ResponseCache
+
+
+def test_cache_ttl_e_revalidacao(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), ttl_por_endpoint={"marcas": 3600, "anos": 0})
+
+    cache.put("u/marcas", "marcas", [{"codigo": "80", "nome": "Honda"}], etag='"abc"')
+    cache.put("u/anos", "anos", [{"codigo": "2020-1"}])
+
+    assert cache.get("u/marcas")["fresca"] is True
+    assert cache.get("u/marcas")["dados"][0]["nome"] == "Honda"
+
+    expirada = cache.get("u/anos")
+    assert expirada["fresca"] is False
+    assert cache.get("inexistente") is None
+    assert not cache.cacheavel("preco")
+
+
+def test_cache_evicao_por_tamanho(tmp_path):
+    cache = ResponseCache(str(tmp_path / "cache.sqlite"), max_bytes=60)
+
+    cache.put("u/1", "modelos", "x" * 40)
+    cache.put("u/2", "modelos", "y" * 40)
+
+    assert cache.get("u/1") is None
+    assert cache.get("u/2") is not None
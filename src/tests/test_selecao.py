@@ -0,0 +1,63 @@
+# test_selecao.py
+import contextlib
+import io
+
+from benchmarks.mock_fipe_server import CatalogoSintetico, MockFipeServer
+from services.fipe_api_client import FipeApiClient
+from services.selecao import SelecaoCrawl, shard_da_chave
+
+
+def _crawl(servidor, selecao):
+    api = FipeApiClient(delay=0.0, base_url=servidor.base_url)
+    with contextlib.redirect_stdout(io.StringIO()):
+        return list(api.crawl(max_workers=2, selecao=selecao))
+
+
+def test_shards_dividem_o_catalogo_sem_sobreposicao():
+    chaves = [(m, mod) for m in range(1, 20) for mod in range(1000, 1100)]
+    por_shard = [{c for c in chaves if shard_da_chave(*c, 4) == s} for s in range(4)]
+
+    assert set().union(*por_shard) == set(chaves)
+    assert sum(len(p) for p in por_shard) == len(chaves)
+    assert all(por_shard)
+
+
+def test_selecao_poda_o_crawl_antes_das_requisicoes():
+    catalogo = CatalogoSintetico(marcas=3, modelos_por_marca=6, anos_por_modelo=3)
+    selecao = SelecaoCrawl(marcas={"honda"}, modelos=(r"MODELO [0-2]$",), ano_min=2025, incluir_zero_km=False)
+
+    with MockFipeServer(catalogo) as servidor:
+        registros = _crawl(servidor, selecao)
+        # 1 marcas + 1 modelos + 3 anos + preços só dos anos aceitos
+        assert servidor.requisicoes == 1 + 1 + 3 + len(registros)
+
+    assert {r["marca"] for r in registros} == {"HONDA"}
+    assert {r["modelo"] for r in registros} <= {"HONDA MODELO 0", "HONDA MODELO 1", "HONDA MODELO 2"}
+    assert all(int(r["cod_ano"].split("-")[0]) in (2025, 2026) for r in registros)
+
+
+def test_shards_juntos_cobrem_o_crawl_completo():
+    catalogo = CatalogoSintetico(marcas=2, modelos_por_marca=5, anos_por_modelo=2)
+
+    with MockFipeServer(catalogo) as servidor:
+        completo = _crawl(servidor, SelecaoCrawl())
+        shards = [_crawl(servidor, SelecaoCrawl().com_shard(s, 3)) for s in range(3)]
+
+    chave = lambda r: (r["cod_marca"], r["cod_modelo"], r["cod_ano"])
+    juntos = [chave(r) for parte in shards for r in parte]
+    assert sorted(juntos) == sorted(chave(r) for r in completo)
+
+
+def test_max_modelos_e_o_total_somando_os_shards():
+    catalogo = CatalogoSintetico(marcas=2, modelos_por_marca=8, anos_por_modelo=1)
+    selecao = SelecaoCrawl(max_modelos=4)
+    assert [selecao.com_shard(s, 3).max_modelos_do_shard for s in range(3)] == [2, 1, 1]
+
+    with MockFipeServer(catalogo) as servidor:
+        shards = [_crawl(servidor, selecao.com_shard(s, 3)) for s in range(3)]
+
+    por_marca = {}
+    for parte in shards:
+        for r in parte:
+            por_marca.setdefault(r["marca"], set()).add(r["cod_modelo"])
+    assert all(len(modelos) == 4 for modelos in por_marca.values())
@@ -0,0 +1,66 @@
+# test_snapshot_store.py
+import contextlib
+import io
+from decimal import Decimal
+
+from services.snapshot_store import SnapshotFipe, SnapshotWriter
+
+SILVER = [
+    ("motos", "HONDA", "CB 300", "2020-1", Decimal("21000.00"), 2020),
+    ("motos", "HONDA", "CB 500", "2024-1", Decimal("29500.00"), 2024),
+    ("motos", "YAMAHA", "FAZER 250", "2019-1", Decimal("18500.00"), 2019),
+    ("motos", "YAMAHA", "MT-03", "32000-1", Decimal("28900.00"), 32000),
+]
+GOLD = [
+    ("motos", "HONDA", "CB 300", Decimal("21000.00"), 1),
+    ("motos", "YAMAHA", "MT-03", Decimal("28900.00"), 1),
+]
+
+
+def _gravar(conexao_falsa, pasta, **kwargs):
+    conn = conexao_falsa({"FROM silver.fipe_limited": SILVER, "FROM gold.fipe_summary": GOLD})
+    with contextlib.redirect_stdout(io.StringIO()):
+        return SnapshotWriter(conn, pasta=str(pasta), **kwargs).gravar(("silver", "gold"))
+
+
+def test_snapshot_filtra_por_marca_ano_e_valor(conexao_falsa, tmp_path):
+    resultado = _gravar(conexao_falsa, tmp_path)
+    assert (resultado["silver"]["linhas"], resultado["silver"]["lotes"]) == (4, 2)
+
+    snap = SnapshotFipe(str(tmp_path))
+    assert snap.ler("silver").num_rows == 4
+    assert snap.ler("silver", marcas=["honda"]).column("modelo").to_pylist() == ["CB 300", "CB 500"]
+
+    recentes = snap.ler("silver", ano_min=2020, ano_max=2026, valor_max=25000, colunas=["modelo", "ano"])
+    assert recentes.to_pylist() == [{"modelo": "CB 300", "ano": 2020}]
+
+    # Faixa fora dos extremos dos dois lotes: nenhum é lido
+    assert snap.ler("silver", valor_min=40000).num_rows == 0
+    assert snap.ler("gold", valor_min=25000).column("marca").to_pylist() == ["YAMAHA"]
+
+
+def _pastas(tmp_path):
+    return len([p for p in tmp_path.iterdir() if p.is_dir()])
+
+
+def test_novo_snapshot_troca_o_atual_e_apaga_os_antigos(conexao_falsa, tmp_path):
+    _gravar(conexao_falsa, tmp_path, manter=2, carencia=0)
+    primeiro = SnapshotFipe(str(tmp_path))
+    _gravar(conexao_falsa, tmp_path, manter=2, carencia=0)
+    _gravar(conexao_falsa, tmp_path, manter=2, carencia=0)
+
+    atual = SnapshotFipe(str(tmp_path))
+    assert atual.execucao != primeiro.execucao
+    assert _pastas(tmp_path) == 2
+    # Quem já tinha aberto continua lendo: as camadas foram mapeadas na abertura
+    assert primeiro.ler("gold").num_rows == 2
+    assert primeiro.ler("silver").num_rows == 4
+
+
+def test_snapshot_substituido_ha_pouco_nao_e_apagado(conexao_falsa, tmp_path):
+    for _ in range(3):
+        _gravar(conexao_falsa, tmp_path, manter=1)
+
+    assert _pastas(tmp_path) == 3
+    _gravar(conexao_falsa, tmp_path, manter=1, carencia=0)
+    assert _pastas(tmp_path) == 1